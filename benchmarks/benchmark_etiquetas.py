@@ -0,0 +1,290 @@
+"""
+Benchmark da geração de etiquetas.
+
+Gera produtos sintéticos (EAN-13, EAN-8, Code128 e códigos inválidos, com
+descrições longas), usa um banco simulado para os códigos de barras e mede,
+para cada modo de saída, etiquetas/segundo, pico de memória (RSS) e bytes
+por etiqueta. Cada modo roda em um processo separado para que o pico de RSS
+seja do próprio modo.
+
+Uso:
+    python benchmarks/benchmark_etiquetas.py
+    python benchmarks/benchmark_etiquetas.py --quantidade 5000 --modos pdf zpl
+    python benchmarks/benchmark_etiquetas.py --sem-limites
+
+Sai com código 1 quando algum resultado viola os limites de
+benchmarks/limites_etiquetas.json.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+ARQUIVO_LIMITES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "limites_etiquetas.json")
+MODOS = ("pdf", "pdf-folha", "zpl", "epl")
+
+PALAVRAS = [
+    "ARROZ", "FEIJÃO", "CAFÉ", "AÇÚCAR", "REFRIGERANTE", "BISCOITO", "RECHEADO",
+    "CHOCOLATE", "INTEGRAL", "TRADICIONAL", "PACOTE", "GARRAFA", "PET", "LATA",
+    "5KG", "1KG", "500G", "2L", "350ML", "SABOR", "MORANGO", "LIMÃO", "ZERO",
+]
+
+
+def digito_ean(codigo):
+    soma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(reversed(codigo), start=1))
+    return str((10 - soma % 10) % 10)
+
+
+def gerar_codigo_barras(rnd):
+    tipo = rnd.random()
+    if tipo < 0.55:
+        base = "789" + "".join(rnd.choice("0123456789") for _ in range(9))
+        return base + digito_ean(base)
+    if tipo < 0.70:
+        base = "".join(rnd.choice("0123456789") for _ in range(7))
+        return base + digito_ean(base)
+    if tipo < 0.90:
+        return "".join(rnd.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(rnd.randint(4, 16)))
+    # Inválidos: curto demais, vazio ou EAN com letras
+    return rnd.choice(["", "12", "78912345ABCDE"])
+
+
+def gerar_produtos(quantidade, semente=42):
+    from model.produto import Produto
+
+    rnd = random.Random(semente)
+    produtos = []
+    codigos_barras = {}
+
+    for i in range(quantidade):
+        codigo = str(100000 + i)
+        descricao = " ".join(rnd.choice(PALAVRAS) for _ in range(rnd.randint(3, 18)))
+        preco = round(rnd.uniform(0.5, 2500.0), 2)
+
+        produto = Produto(codigo, descricao, preco * 0.7, preco, preco)
+        produto.preco_venda_novo = preco
+        produtos.append(produto)
+        codigos_barras[codigo] = gerar_codigo_barras(rnd)
+
+    return produtos, codigos_barras
+
+
+class _Linha:
+    def __init__(self, codigo_barras, codigo_produto):
+        self.CodigoBarras = codigo_barras
+        self.CodigoProduto = codigo_produto
+
+
+class _CursorSimulado:
+    def __init__(self, codigos_barras):
+        self.codigos_barras = codigos_barras
+        self._linha = None
+
+    def execute(self, query, params=()):
+        codigo = params[0] if params else None
+        if codigo in self.codigos_barras:
+            self._linha = _Linha(self.codigos_barras[codigo], codigo)
+        else:
+            self._linha = None
+        return self
+
+    def fetchone(self):
+        return self._linha
+
+    def close(self):
+        pass
+
+
+class _ConexaoSimulada:
+    def __init__(self, codigos_barras):
+        self.codigos_barras = codigos_barras
+
+    def cursor(self):
+        return _CursorSimulado(self.codigos_barras)
+
+
+class BancoSimulado:
+    """Substitui Database apenas no que EtiquetaGenerator usa: cadastro_produtos
+    e, para códigos não encontrados, connection.cursor()."""
+
+    def __init__(self, codigos_barras):
+        self.codigos_barras = codigos_barras
+        self.connection = _ConexaoSimulada(codigos_barras)
+
+    def connect(self):
+        return True
+
+    def cadastro_produtos(self, codigos):
+        return {
+            codigo: {"codigo_barras": self.codigos_barras[codigo]}
+            for codigo in codigos if codigo in self.codigos_barras
+        }
+
+
+def pico_rss_mb():
+    try:
+        import resource
+
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB, macOS em bytes
+        return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+    except ImportError:
+        pass
+
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        contadores = PROCESS_MEMORY_COUNTERS()
+        contadores.cb = ctypes.sizeof(contadores)
+        processo = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(contadores), contadores.cb)
+        return contadores.PeakWorkingSetSize / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+def executar_modo(modo, quantidade, semente, fila):
+    try:
+        from controller.etiqueta_generator import EtiquetaGenerator
+        from controller.historico_etiquetas import HistoricoEtiquetasManager
+
+        produtos, codigos_barras = gerar_produtos(quantidade, semente)
+        pasta = tempfile.mkdtemp(prefix="bench_etiquetas_")
+
+        gerador = EtiquetaGenerator(BancoSimulado(codigos_barras))
+        gerador.historico = HistoricoEtiquetasManager(os.path.join(pasta, "historico"))
+        gerador.folha = None
+
+        if modo == "pdf-folha":
+            gerador.folha = {
+                "largura_mm": 210.0,
+                "altura_mm": 297.0,
+                "margem_esquerda_mm": 0.0,
+                "margem_topo_mm": 0.0,
+                "espaco_horizontal_mm": 0.0,
+                "espaco_vertical_mm": 0.0,
+                "colunas": max(1, int(210 // gerador.etiqueta_width_mm)),
+                "linhas": max(1, int(297 // gerador.etiqueta_height_mm)),
+            }
+
+        inicio = time.perf_counter()
+
+        if modo in ("pdf", "pdf-folha"):
+            caminho = gerador.gerar_pdf(produtos, output_path=os.path.join(pasta, "etiquetas.pdf"))
+            tamanho = os.path.getsize(caminho)
+        else:
+            tamanho = len(gerador.gerar_comandos(produtos, modo))
+
+        duracao = time.perf_counter() - inicio
+        shutil.rmtree(pasta, ignore_errors=True)
+
+        fila.put({
+            "modo": modo,
+            "etiquetas": quantidade,
+            "segundos": round(duracao, 3),
+            "etiquetas_por_segundo": round(quantidade / duracao, 1) if duracao else 0.0,
+            "pico_rss_mb": round(pico_rss_mb(), 1),
+            "bytes_por_etiqueta": round(tamanho / quantidade, 1),
+        })
+    except Exception as e:
+        fila.put({"modo": modo, "erro": str(e)})
+
+
+def verificar_limites(resultados, limites):
+    falhas = []
+    for resultado in resultados:
+        limite = limites.get(resultado["modo"], {})
+        if "erro" in resultado:
+            falhas.append(f"{resultado['modo']}: {resultado['erro']}")
+            continue
+        minimo = limite.get("min_etiquetas_por_segundo")
+        if minimo is not None and resultado["etiquetas_por_segundo"] < minimo:
+            falhas.append(
+                f"{resultado['modo']}: {resultado['etiquetas_por_segundo']} etiquetas/s "
+                f"abaixo do mínimo {minimo}"
+            )
+        maximo_rss = limite.get("max_pico_rss_mb")
+        if maximo_rss is not None and resultado["pico_rss_mb"] > maximo_rss:
+            falhas.append(f"{resultado['modo']}: pico RSS {resultado['pico_rss_mb']} MB acima de {maximo_rss} MB")
+        maximo_bytes = limite.get("max_bytes_por_etiqueta")
+        if maximo_bytes is not None and resultado["bytes_por_etiqueta"] > maximo_bytes:
+            falhas.append(
+                f"{resultado['modo']}: {resultado['bytes_por_etiqueta']} bytes/etiqueta "
+                f"acima de {maximo_bytes}"
+            )
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da geração de etiquetas")
+    parser.add_argument("--quantidade", type=int, default=2000, help="Etiquetas por modo")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--limites", default=ARQUIVO_LIMITES, help="Arquivo JSON com os limites")
+    parser.add_argument("--sem-limites", action="store_true", help="Apenas mede, sem verificar limites")
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON")
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context("spawn")
+    resultados = []
+
+    for modo in args.modos:
+        fila = contexto.Queue()
+        processo = contexto.Process(target=executar_modo, args=(modo, args.quantidade, args.semente, fila))
+        processo.start()
+        resultados.append(fila.get())
+        processo.join()
+
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    else:
+        print(f"{'Modo':<10} {'Etiq.':>7} {'Tempo (s)':>10} {'Etiq./s':>10} {'Pico RSS (MB)':>14} {'Bytes/etiq.':>12}")
+        for r in resultados:
+            if "erro" in r:
+                print(f"{r['modo']:<10} ERRO: {r['erro']}")
+                continue
+            print(
+                f"{r['modo']:<10} {r['etiquetas']:>7} {r['segundos']:>10} {r['etiquetas_por_segundo']:>10} "
+                f"{r['pico_rss_mb']:>14} {r['bytes_por_etiqueta']:>12}"
+            )
+
+    if args.sem_limites:
+        return 0
+
+    limites = {}
+    if os.path.exists(args.limites):
+        with open(args.limites, "r", encoding="utf-8") as f:
+            limites = json.load(f)
+
+    falhas = verificar_limites(resultados, limites)
+    for falha in falhas:
+        print(f"REGRESSÃO: {falha}")
+
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
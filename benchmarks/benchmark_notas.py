@@ -0,0 +1,149 @@
+"""
+Benchmark do armazenamento de notas processadas.
+
+Para cada backend e tamanho de histórico, mede o tempo de abertura
+(carregamento), gravações por segundo (adicionar_nota) e consultas por
+segundo, uma a uma (verificar_nota) e em lote (verificar_notas).
+
+Uso:
+    python benchmarks/benchmark_notas.py
+    python benchmarks/benchmark_notas.py --tamanhos 10000 100000 --gravacoes 200
+    python benchmarks/benchmark_notas.py --backends json --agrupar-ms 0 50 --tamanhos 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from controller.notas_backends import BACKENDS  # noqa: E402
+from controller.notas_processadas import NotasProcessadasManager  # noqa: E402
+
+
+def registro_sintetico(i, rnd):
+    fornecedor = str(rnd.randint(1, 2000)).zfill(5)
+    nota = str(i).zfill(6)
+    return fornecedor, nota, {
+        "fornecedor": fornecedor,
+        "nota": nota,
+        "serie": "1",
+        "data": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        "hora": "10:00:00",
+        "usuario": "2",
+        "produtos_editados": 20,
+        "codigos_produtos": [str(rnd.randint(1, 30000)) for _ in range(20)],
+    }
+
+
+def popular(manager, tamanho, rnd):
+    """Preenche o histórico diretamente nos arquivos, sem medir."""
+    armazenamento = manager.armazenamento
+    registros = {}
+    for i in range(tamanho):
+        fornecedor, nota, registro = registro_sintetico(i, rnd)
+        registros[manager._gerar_chave(fornecedor, nota, "1")] = registro
+
+    if hasattr(armazenamento, "conexao"):
+        with armazenamento.conexao:
+            for chave, registro in registros.items():
+                armazenamento._inserir(chave, registro)
+    else:
+        # Snapshot no formato do notas_processadas.json (json e jsonl)
+        with open(manager.arquivo_json, "w", encoding="utf-8") as f:
+            json.dump(registros, f, ensure_ascii=False, indent=2)
+
+    return list(registros.values())
+
+
+def medir(backend, tamanho, gravacoes, consultas, semente, agrupar_ms=0):
+    pasta = tempfile.mkdtemp(prefix="bench_notas_")
+    arquivo = os.path.join(pasta, "notas_processadas.json")
+    config = os.path.join(pasta, "config.ini")
+    rnd = random.Random(semente)
+
+    with open(config, "w", encoding="utf-8") as f:
+        f.write(f"[NotasProcessadas]\nagrupar_ms = {agrupar_ms}\n")
+
+    try:
+        manager = NotasProcessadasManager(arquivo, backend=backend, config_file=config)
+        registros = popular(manager, tamanho, rnd)
+        manager.armazenamento.fechar()
+
+        inicio = time.perf_counter()
+        manager = NotasProcessadasManager(arquivo, backend=backend, config_file=config)
+        tempo_carga = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for i in range(gravacoes):
+            manager.adicionar_nota(
+                str(rnd.randint(1, 2000)), str(tamanho + i), "1", "2", 20,
+                [str(rnd.randint(1, 30000)) for _ in range(20)],
+            )
+        # Com gravação agrupada, o tempo inclui a escrita final pendente
+        if hasattr(manager.armazenamento, "descarregar"):
+            manager.armazenamento.descarregar()
+        tempo_gravacao = time.perf_counter() - inicio
+
+        amostra = [rnd.choice(registros) for _ in range(consultas)]
+        inicio = time.perf_counter()
+        for registro in amostra:
+            manager.verificar_nota(registro["fornecedor"], registro["nota"], "1")
+        tempo_consulta = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        manager.verificar_notas((registro["fornecedor"], registro["nota"], "1") for registro in amostra)
+        tempo_lote = time.perf_counter() - inicio
+
+        manager.armazenamento.fechar()
+
+        return {
+            "backend": backend if not agrupar_ms else f"{backend}+{agrupar_ms}ms",
+            "historico": tamanho,
+            "carga_ms": round(tempo_carga * 1000, 1),
+            "gravacoes_por_segundo": round(gravacoes / tempo_gravacao, 1),
+            "consultas_por_segundo": round(consultas / tempo_consulta, 1),
+            "consultas_lote_por_segundo": round(consultas / tempo_lote, 1),
+        }
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das notas processadas")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--tamanhos", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--gravacoes", type=int, default=100)
+    parser.add_argument("--consultas", type=int, default=10000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument(
+        "--agrupar-ms", nargs="+", type=int, default=[0],
+        help="Janelas de gravação agrupada do backend json (0 = desligada)",
+    )
+    args = parser.parse_args()
+
+    print(f"{'Backend':<13} {'Histórico':>10} {'Carga (ms)':>11} {'Gravações/s':>12} {'Consultas/s':>12} {'Em lote/s':>12}")
+    execucoes = [
+        (backend, agrupar_ms)
+        for backend in args.backends
+        for agrupar_ms in (args.agrupar_ms if backend == "json" else [0])
+    ]
+    for backend, agrupar_ms in execucoes:
+        for tamanho in args.tamanhos:
+            r = medir(backend, tamanho, args.gravacoes, args.consultas, args.semente, agrupar_ms)
+            print(
+                f"{r['backend']:<13} {r['historico']:>10} {r['carga_ms']:>11} "
+                f"{r['gravacoes_por_segundo']:>12} {r['consultas_por_segundo']:>12} "
+                f"{r['consultas_lote_por_segundo']:>12}"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
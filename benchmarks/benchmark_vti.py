@@ -0,0 +1,331 @@
+"""
+Benchmark de ponta a ponta sobre o banco do VTi simulado.
+
+Gera um banco simulado (benchmarks/gerar_vti_simulado.py) em uma pasta
+temporária e mede:
+
+- cada método público de Database (mediana de --repeticoes execuções);
+  métodos sem medição são listados ao final, seguidos das estatísticas de
+  cada instrução SQL (Database.estatisticas_instrucoes)
+- o ciclo completo por tamanho de nota: carregar, precificar (margem),
+  gravar e gerar as etiquetas (ZPL e, com ReportLab instalado, PDF)
+- o armazenamento de notas processadas em tamanhos realistas
+  (benchmarks/benchmark_notas.py)
+
+Uso:
+    python benchmarks/benchmark_vti.py
+    python benchmarks/benchmark_vti.py --tamanhos 10 100 1000 10000 --repeticoes 5
+    python benchmarks/benchmark_vti.py --sem-notas --json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmark_notas import medir as medir_notas  # noqa: E402
+from gerar_vti_simulado import gerar  # noqa: E402
+
+CONFIG = """[Database]
+server = simulado
+database = simulado
+username =
+password =
+driver =
+usuario_evolucao = 2
+simulado = {arquivo}
+
+[NotasProcessadas]
+backend = json
+
+[Replica]
+ativo = {replica}
+arquivo = {arquivo_replica}
+intervalo_segundos = 600
+"""
+
+
+class Medicoes:
+    def __init__(self, repeticoes):
+        self.repeticoes = repeticoes
+        self.resultados = []
+        self.metodos = set()
+
+    def medir(self, metodo, funcao, detalhe="", repeticoes=None):
+        """Executa `funcao` e guarda a mediana; retorna o último resultado."""
+        tempos = []
+        resultado = None
+        for _ in range(repeticoes or self.repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        self.metodos.add(metodo)
+        self.resultados.append({
+            "metodo": metodo,
+            "detalhe": detalhe,
+            "mediana_ms": round(statistics.median(tempos), 2),
+            "min_ms": round(min(tempos), 2),
+        })
+        return resultado
+
+
+def escrever_config(pasta, nome, arquivo, replica):
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(CONFIG.format(
+            arquivo=arquivo,
+            replica=1 if replica else 0,
+            arquivo_replica=os.path.join(pasta, "replica_produtos.db"),
+        ))
+    return caminho
+
+
+def precificar(produtos, margem=35.0):
+    for produto in produtos:
+        produto.set_preco_venda_novo(round(produto.calcular_preco_por_margem_venda(margem), 2))
+    return produtos
+
+
+def gravado(produtos):
+    """Após gravar, o preço gravado passa a ser o carregado (como ao recarregar a nota)."""
+    for produto in produtos:
+        produto.preco_venda_min = produto.preco_venda_max = produto.preco_venda_novo
+
+
+def medir_database(m, pasta, arquivo, fixas):
+    from controller.database import Database
+
+    db = Database(escrever_config(pasta, "config.ini", arquivo, replica=False))
+    m.medir("criar_conexao", lambda: db.criar_conexao().close())
+    m.medir("connect", db.connect)
+    m.medir("carregar_perfil_empresa", db.carregar_perfil_empresa)
+    m.medir("buscar_nome_empresa", db.buscar_nome_empresa, "cache")
+    m.medir("buscar_regime_tributario", db.buscar_regime_tributario, "cache")
+    m.medir("carregar_fornecedores", db.carregar_fornecedores)
+    m.medir("buscar_informacoes_fornecedor", lambda: db.buscar_informacoes_fornecedor("1"), "cache")
+    m.medir("buscar_todas_notas", lambda: db.buscar_todas_notas(limite=500), "500 notas")
+    m.medir("buscar_notas_periodo", lambda: db.buscar_notas_periodo("2000-01-01", "2100-12-31"), "todas")
+
+    qualquer = next(iter(fixas.values()))
+    m.medir("verificar_nota_existe", lambda: db.verificar_nota_existe(qualquer[1]))
+
+    for tamanho, (fornecedor, nota, serie) in fixas.items():
+        produtos = m.medir(
+            "buscar_produtos_por_nota",
+            lambda: db.buscar_produtos_por_nota(nota, serie, fornecedor),
+            f"{tamanho} itens",
+        )
+        precificar(produtos)
+        m.medir(
+            "atualizar_precos",
+            lambda: (db.atualizar_precos(produtos, fornecedor, nota, serie), gravado(produtos)),
+            f"{tamanho} itens",
+        )
+
+    notas = list(fixas.values())
+    total_itens = sum(fixas)
+    produtos = m.medir("buscar_produtos_por_notas", lambda: db.buscar_produtos_por_notas(notas), f"{total_itens} itens")
+    precificar(produtos)
+    m.medir(
+        "atualizar_precos_notas",
+        lambda: (db.atualizar_precos_notas(produtos, notas), gravado(produtos)),
+        f"{len(produtos)} produtos",
+    )
+    m.medir(
+        "atualizar_precos_notas",
+        lambda: (db.atualizar_precos_notas(produtos, notas, verificar_conflitos=False), gravado(produtos)),
+        f"{len(produtos)} produtos, sem conferir",
+    )
+
+    codigos = [produto.codigo for produto in produtos[:1000]]
+    m.medir("cadastro_produtos", lambda: db.cadastro_produtos(codigos), f"{len(codigos)} códigos, sem réplica")
+
+    # Reajuste no servidor de todo o catálogo (sem carregar os produtos)
+    previa = m.medir("simular_reajuste", lambda: db.simular_reajuste("margem", 33.0, limite=100), "catálogo")
+    m.medir(
+        "aplicar_reajuste",
+        lambda: db.aplicar_reajuste("margem", 33.0),
+        f"{previa['quantidade']} produtos",
+        repeticoes=1,
+    )
+
+    # Intenções pendentes, como após uma queda entre o commit e o registro
+    from controller.notas_processadas import obter_notas_manager
+
+    def reconciliar():
+        fornecedor, nota, serie = notas[0]
+        obter_notas_manager().intencoes.registrar(
+            fornecedor, nota, serie, db.usuario_evolucao,
+            [(produto.codigo, produto.preco_venda_novo) for produto in produtos[:50]],
+        )
+        return db.reconciliar_notas_pendentes()
+
+    m.medir("reconciliar_notas_pendentes", reconciliar, "1 intenção")
+    instrucoes = m.medir("estatisticas_instrucoes", db.estatisticas_instrucoes)
+    m.medir("disconnect", db.disconnect, repeticoes=1)
+
+    # Réplica local do cadastro
+    db_replica = Database(escrever_config(pasta, "config_replica.ini", arquivo, replica=True))
+    m.medir("sincronizar_replica", lambda: db_replica.sincronizar_replica(), "completa", repeticoes=1)
+    m.medir("sincronizar_replica", lambda: db_replica.sincronizar_replica(), "sem alterações")
+    m.medir("cadastro_produtos", lambda: db_replica.cadastro_produtos(codigos), f"{len(codigos)} códigos, réplica")
+    db_replica.disconnect()
+
+    publicos = {
+        nome for nome in dir(Database)
+        if not nome.startswith("_") and callable(getattr(Database, nome))
+    }
+    return sorted(publicos - m.metodos), instrucoes
+
+
+def medir_ciclo(pasta, arquivo, fixas):
+    from controller.database import Database
+
+    try:
+        from controller.etiqueta_generator import EtiquetaGenerator
+        from controller.historico_etiquetas import HistoricoEtiquetasManager
+    except ImportError as e:
+        EtiquetaGenerator = None
+        print(f"Aviso: Etiquetas fora do ciclo ({e})")
+
+    try:
+        import reportlab.pdfgen.canvas  # noqa: F401
+        gerar_pdf = True
+    except ImportError:
+        gerar_pdf = False
+
+    db = Database(os.path.join(pasta, "config.ini"))
+    ciclos = []
+    for tamanho, (fornecedor, nota, serie) in fixas.items():
+        etapas = {}
+
+        inicio = time.perf_counter()
+        produtos = db.buscar_produtos_por_nota(nota, serie, fornecedor)
+        etapas["carregar"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        precificar(produtos, margem=40.0)
+        etapas["precificar"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        db.atualizar_precos(produtos, fornecedor, nota, serie)
+        etapas["gravar"] = time.perf_counter() - inicio
+
+        if EtiquetaGenerator is not None:
+            gerador = EtiquetaGenerator(db)
+            gerador.historico = HistoricoEtiquetasManager(os.path.join(pasta, "historico"))
+            gerador.folha = None
+
+            inicio = time.perf_counter()
+            gerador.gerar_comandos(produtos, "zpl")
+            etapas["etiquetas_zpl"] = time.perf_counter() - inicio
+
+            if gerar_pdf:
+                inicio = time.perf_counter()
+                gerador.gerar_pdf(produtos, output_path=os.path.join(pasta, f"etiquetas_{tamanho}.pdf"))
+                etapas["etiquetas_pdf"] = time.perf_counter() - inicio
+
+        total = sum(etapas.values())
+        ciclos.append({
+            "itens": tamanho,
+            **{f"{etapa}_ms": round(duracao * 1000, 1) for etapa, duracao in etapas.items()},
+            "total_ms": round(total * 1000, 1),
+            "itens_por_segundo": round(tamanho / total, 1) if total else 0.0,
+        })
+
+    db.disconnect()
+    return ciclos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de ponta a ponta sobre o VTi simulado")
+    parser.add_argument("--tamanhos", nargs="+", type=int, default=[10, 100, 1000, 10000])
+    parser.add_argument("--produtos", type=int, default=20000)
+    parser.add_argument("--notas", type=int, default=500)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--historicos", nargs="+", type=int, default=[1000, 10000],
+                        help="Tamanhos do histórico de notas processadas")
+    parser.add_argument("--sem-notas", action="store_true", help="Não mede o armazenamento de notas processadas")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON")
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix="bench_vti_")
+    diretorio_original = os.getcwd()
+    try:
+        arquivo = os.path.join(pasta, "vti_simulado.db")
+        inicio = time.perf_counter()
+        fixas = gerar(arquivo, args.produtos, notas=args.notas, tamanhos=args.tamanhos, semente=args.semente)
+        tempo_geracao = time.perf_counter() - inicio
+
+        # Notas processadas, intenções e config.ini ficam na pasta temporária
+        os.chdir(pasta)
+        m = Medicoes(args.repeticoes)
+        sem_medicao, instrucoes = medir_database(m, pasta, arquivo, fixas)
+        ciclos = medir_ciclo(pasta, arquivo, fixas)
+
+        notas = []
+        if not args.sem_notas:
+            for backend in ("json", "jsonl", "sqlite"):
+                for tamanho in args.historicos:
+                    notas.append(medir_notas(backend, tamanho, 100, 10000, args.semente))
+    finally:
+        os.chdir(diretorio_original)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({
+            "geracao_s": round(tempo_geracao, 2),
+            "database": m.resultados,
+            "sem_medicao": sem_medicao,
+            "instrucoes": instrucoes,
+            "ciclo": ciclos,
+            "notas_processadas": notas,
+        }, indent=2, ensure_ascii=False))
+        return 0
+
+    print(f"Banco simulado gerado em {tempo_geracao:.1f} s ({args.produtos} produtos, {args.notas} notas)\n")
+    print(f"{'Método':<32} {'Detalhe':<28} {'Mediana (ms)':>13} {'Mín. (ms)':>10}")
+    for r in m.resultados:
+        print(f"{r['metodo']:<32} {r['detalhe']:<28} {r['mediana_ms']:>13} {r['min_ms']:>10}")
+    if sem_medicao:
+        print(f"\nMétodos sem medição: {', '.join(sem_medicao)}")
+
+    print("\nInstruções SQL (conexão principal)")
+    print(f"{'Instrução':<22} {'Execuções':>10} {'Linhas':>9} {'Total (ms)':>11} {'Média (ms)':>11} {'Máx. (ms)':>10} {'Preparações':>12}")
+    for r in instrucoes:
+        print(
+            f"{r['nome']:<22} {r['execucoes']:>10} {r['linhas']:>9} {r['tempo_total_ms']:>11} "
+            f"{r['tempo_medio_ms']:>11} {r['tempo_maximo_ms']:>10} {r['preparacoes']:>12}"
+        )
+
+    etapas = [chave for chave in ciclos[0] if chave.endswith("_ms")] if ciclos else []
+    print("\nCiclo carregar → precificar → gravar → etiquetas")
+    print(f"{'Itens':>7} " + " ".join(f"{etapa:>18}" for etapa in etapas) + f" {'Itens/s':>10}")
+    for ciclo in ciclos:
+        print(
+            f"{ciclo['itens']:>7} " + " ".join(f"{ciclo[etapa]:>18}" for etapa in etapas)
+            + f" {ciclo['itens_por_segundo']:>10}"
+        )
+
+    if notas:
+        print("\nNotas processadas")
+        print(f"{'Backend':<10} {'Histórico':>10} {'Carga (ms)':>11} {'Gravações/s':>12} {'Consultas/s':>12} {'Em lote/s':>12}")
+        for r in notas:
+            print(
+                f"{r['backend']:<10} {r['historico']:>10} {r['carga_ms']:>11} "
+                f"{r['gravacoes_por_segundo']:>12} {r['consultas_por_segundo']:>12} "
+                f"{r['consultas_lote_por_segundo']:>12}"
+            )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Gera um banco do VTi simulado (controller/vti_simulado.py) com dados
+sintéticos: empresa, fornecedores, produtos com preços e códigos de barras
+e notas de entrada com 10 a 10.000 itens.
+
+Uso:
+    python benchmarks/gerar_vti_simulado.py vti_simulado.db
+    python benchmarks/gerar_vti_simulado.py vti_simulado.db --produtos 50000 --notas 2000 --tamanhos 10 100 1000 10000
+
+Depois, informe o arquivo em `simulado` na seção [Database] do config.ini
+para abrir o sistema com esses dados.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from controller import vti_simulado  # noqa: E402
+
+PALAVRAS = [
+    "ARROZ", "FEIJÃO", "CAFÉ", "AÇÚCAR", "REFRIGERANTE", "BISCOITO", "RECHEADO",
+    "CHOCOLATE", "INTEGRAL", "TRADICIONAL", "PACOTE", "GARRAFA", "PET", "LATA",
+    "5KG", "1KG", "500G", "2L", "350ML", "SABOR", "MORANGO", "LIMÃO", "ZERO",
+]
+
+
+def digito_ean(codigo):
+    soma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(reversed(codigo), start=1))
+    return str((10 - soma % 10) % 10)
+
+
+def gerar(
+    arquivo,
+    produtos=20000,
+    fornecedores=300,
+    notas=500,
+    tamanhos=(10, 100, 1000, 10000),
+    regime=1,
+    semente=42,
+):
+    """
+    Cria (ou recria) o banco simulado.
+
+    Args:
+        produtos: Produtos no cadastro (no mínimo o maior tamanho de nota)
+        notas: Notas comuns, com 10 a 60 itens
+        tamanhos: Uma nota adicional com exatamente cada quantidade de itens
+        regime: Regime tributário da empresa (3 = Regime Normal)
+
+    Returns:
+        dict: tamanho -> (fornecedor, nota, serie) das notas com tamanho fixo
+    """
+    if os.path.exists(arquivo):
+        os.remove(arquivo)
+
+    rnd = random.Random(semente)
+    produtos = max(produtos, max(tamanhos, default=0))
+    hoje = date.today()
+
+    conexao = vti_simulado.connect(arquivo)
+    banco = conexao.cursor()
+
+    banco.execute("INSERT INTO AEMPREGE (BC_EMP, CODRGT_EMP) VALUES (?, ?)", ("MERCADO SIMULADO LTDA", regime))
+    banco.executemany(
+        "INSERT INTO ATIPNFCE (AA_TIP, AB_TIP) VALUES (?, ?)",
+        [("01", "COMPRA PARA REVENDA"), ("02", "DEVOLUCAO")],
+    )
+
+    codigos_fornecedores = [str(i).zfill(5) for i in range(1, fornecedores + 1)]
+    banco.executemany(
+        "INSERT INTO AFORNEGE (CODIGO_FOR, NOME_FOR, CGCCPF_FOR, ESTADO_FOR, CLASSI_FOR) VALUES (?, ?, ?, ?, ?)",
+        [
+            (codigo, f"FORNECEDOR {codigo} DISTRIBUIDORA", f"{rnd.randint(10**13, 10**14 - 1)}",
+             rnd.choice(["SP", "MG", "PR", "SC", "RS", "GO"]), "1")
+            for codigo in codigos_fornecedores
+        ],
+    )
+
+    custos = {}
+    cadastro = []
+    precos = []
+    for i in range(produtos):
+        codigo = str(10000 + i)
+        custo = round(rnd.uniform(0.5, 400.0), 2)
+        preco = round(custo * rnd.uniform(1.2, 1.8), 2)
+        custos[codigo] = custo
+        base = "789" + str(rnd.randint(10**8, 10**9 - 1))
+        codigo_barras = base + digito_ean(base) if rnd.random() < 0.9 else ""
+        descricao = " ".join(rnd.choice(PALAVRAS) for _ in range(rnd.randint(2, 8)))
+        cadastro.append((codigo, descricao, codigo_barras))
+        precos.append((codigo, preco, preco))
+    banco.executemany("INSERT INTO CE_PRODUTO (AU_ITE, AB_ITE, BO_ITE) VALUES (?, ?, ?)", cadastro)
+    banco.executemany(
+        "INSERT INTO ce_produtos_adicionais (CodReduzido, PrecoVendaMin, PrecoVendaMax) VALUES (?, ?, ?)",
+        precos,
+    )
+
+    codigos_produtos = list(custos)
+    fixas = {}
+    numero = 0
+
+    def inserir_nota(quantidade_itens, dias_atras):
+        nonlocal numero
+        numero += 1
+        fornecedor = rnd.choice(codigos_fornecedores)
+        nota = str(numero).zfill(6)
+        entrada = hoje - timedelta(days=dias_atras)
+        emissao = entrada - timedelta(days=rnd.randint(0, 5))
+
+        itens = []
+        total = 0.0
+        for sequencia, codigo in enumerate(rnd.sample(codigos_produtos, quantidade_itens), start=1):
+            quantidade = float(rnd.randint(1, 48))
+            custo = round(custos[codigo] * rnd.uniform(0.9, 1.1), 4)
+            icms = round(custo * quantidade * 0.12, 2) if rnd.random() < 0.3 else 0.0
+            tipo_calculo = rnd.choice([1, 1, 1, 2, 3])
+            valor = round(custo * quantidade, 2)
+            total += valor
+            itens.append((
+                fornecedor, nota, "1", codigo, tipo_calculo, sequencia, quantidade,
+                round((valor + icms) / quantidade, 4), valor, icms,
+            ))
+        banco.executemany(
+            """
+            INSERT INTO APECENCE (AA_PEN, AB_PEN, AC_PEN, AE_PEN, AG_PEN, AH_PEN, AI_PEN, AJ_PEN, AO_PEN, AR_PEN)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            itens,
+        )
+        banco.execute(
+            """
+            INSERT INTO ANOTENCE (AA_NEN, AB_NEN, AC_NEN, AD_NEN, AE_NEN, AF_NEN, BD_NEN, BE_NEN, BR_NEN, CHVNFE_NEN)
+            VALUES (?, ?, ?, ?, ?, ?, '01', '3', 'T', ?)
+            """,
+            (fornecedor, nota, "1", emissao.isoformat(), entrada.isoformat(), round(total, 2),
+             "".join(rnd.choice("0123456789") for _ in range(44))),
+        )
+        return fornecedor, nota, "1"
+
+    for _ in range(notas):
+        inserir_nota(rnd.randint(10, 60), rnd.randint(1, 365))
+    for tamanho in tamanhos:
+        fixas[tamanho] = inserir_nota(tamanho, 0)
+
+    conexao.commit()
+    conexao.close()
+    return fixas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um banco do VTi simulado")
+    parser.add_argument("arquivo", nargs="?", default="vti_simulado.db")
+    parser.add_argument("--produtos", type=int, default=20000)
+    parser.add_argument("--fornecedores", type=int, default=300)
+    parser.add_argument("--notas", type=int, default=500, help="Notas comuns (10 a 60 itens)")
+    parser.add_argument("--tamanhos", nargs="*", type=int, default=[10, 100, 1000, 10000],
+                        help="Notas adicionais com exatamente estas quantidades de itens")
+    parser.add_argument("--regime", type=int, default=1, help="Regime tributário (3 = Regime Normal)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    fixas = gerar(
+        args.arquivo, args.produtos, args.fornecedores, args.notas, args.tamanhos, args.regime, args.semente
+    )
+    print(f"{args.arquivo} gerado em {time.perf_counter() - inicio:.1f} s")
+    for tamanho, (fornecedor, nota, serie) in fixas.items():
+        print(f"  nota {nota} série {serie} fornecedor {fornecedor}: {tamanho} itens")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Teste de estresse de gravação concorrente das notas processadas.
+
+Simula várias estações: cada processo abre o próprio NotasProcessadasManager
+sobre a mesma pasta e registra notas distintas ao mesmo tempo. Ao final,
+confere em um manager novo se todas as notas estão presentes e mostra a
+vazão total.
+
+Uso:
+    python benchmarks/stress_notas_concorrencia.py
+    python benchmarks/stress_notas_concorrencia.py --processos 8 --notas 300 --backends json jsonl
+    python benchmarks/stress_notas_concorrencia.py --pasta "\\\\servidor\\ajusta-preco\\teste"
+
+Sai com código 1 se alguma nota for perdida ou algum processo falhar.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from controller.notas_backends import BACKENDS  # noqa: E402
+
+
+def estacao(backend, arquivo, indice, quantidade, largada, fila):
+    try:
+        from controller.notas_processadas import NotasProcessadasManager
+
+        manager = NotasProcessadasManager(arquivo, backend=backend)
+        largada.wait()
+
+        for i in range(quantidade):
+            manager.adicionar_nota(
+                str(indice + 1), str(i + 1), "1", str(indice), 3,
+                [str(indice * 100000 + i), "1", "2"],
+            )
+
+        manager.armazenamento.fechar()
+        fila.put((indice, None))
+    except Exception as e:
+        fila.put((indice, str(e)))
+
+
+def executar(backend, pasta, processos, quantidade):
+    from controller.notas_processadas import NotasProcessadasManager
+
+    arquivo = os.path.join(pasta, f"stress_{backend}.json")
+    contexto = multiprocessing.get_context("spawn")
+    fila = contexto.Queue()
+    largada = contexto.Event()
+
+    estacoes = [
+        contexto.Process(target=estacao, args=(backend, arquivo, i, quantidade, largada, fila))
+        for i in range(processos)
+    ]
+    for processo in estacoes:
+        processo.start()
+
+    # Dá tempo de todos abrirem o manager antes de começar a gravar
+    time.sleep(1.0)
+    inicio = time.perf_counter()
+    largada.set()
+
+    erros = []
+    for _ in estacoes:
+        indice, erro = fila.get()
+        if erro:
+            erros.append(f"estação {indice}: {erro}")
+    duracao = time.perf_counter() - inicio
+
+    for processo in estacoes:
+        processo.join()
+
+    manager = NotasProcessadasManager(arquivo, backend=backend)
+    perdidas = sum(
+        1
+        for indice in range(processos)
+        for i in range(quantidade)
+        if not manager.verificar_nota(str(indice + 1), str(i + 1), "1")
+    )
+    manager.armazenamento.fechar()
+
+    total = processos * quantidade
+    return {
+        "backend": backend,
+        "notas": total,
+        "perdidas": perdidas,
+        "segundos": round(duracao, 2),
+        "notas_por_segundo": round(total / duracao, 1) if duracao else 0.0,
+        "erros": erros,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estresse de gravação concorrente das notas processadas")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--processos", type=int, default=6, help="Estações simuladas")
+    parser.add_argument("--notas", type=int, default=200, help="Notas registradas por estação")
+    parser.add_argument("--pasta", help="Pasta (pode ser compartilhada); padrão: temporária")
+    args = parser.parse_args()
+
+    pasta = args.pasta or tempfile.mkdtemp(prefix="stress_notas_")
+    os.makedirs(pasta, exist_ok=True)
+
+    falhou = False
+    try:
+        print(f"{'Backend':<10} {'Notas':>7} {'Perdidas':>9} {'Tempo (s)':>10} {'Notas/s':>9}")
+        for backend in args.backends:
+            r = executar(backend, pasta, args.processos, args.notas)
+            print(
+                f"{r['backend']:<10} {r['notas']:>7} {r['perdidas']:>9} "
+                f"{r['segundos']:>10} {r['notas_por_segundo']:>9}"
+            )
+            for erro in r["erros"]:
+                print(f"  ERRO: {erro}")
+            falhou = falhou or bool(r["perdidas"] or r["erros"])
+    finally:
+        if not args.pasta:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Tempo de importação dos módulos do caminho de abertura do sistema.
+
+Cada módulo é importado em um processo Python novo (sem cache de módulos
+já carregados) e o script confere que nenhum módulo pesado (pyodbc,
+ReportLab, python-barcode, Pillow) é carregado junto. Para os tempos da
+abertura completa (primeira pintura, nome da empresa), rode o sistema com
+--tempos, pelo Python ou pelo executável.
+
+Uso:
+    python benchmarks/tempos_importacao.py
+    python benchmarks/tempos_importacao.py --repeticoes 5 --modulos controller.database
+
+Sai com código 1 se algum módulo pesado for carregado na importação.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from controller.tempos_inicializacao import MODULOS_PESADOS  # noqa: E402
+
+MODULOS = (
+    "view.main_window",
+    "controller.database",
+    "controller.notas_processadas",
+    "controller.etiqueta_termica",
+)
+
+CODIGO = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+duracao = (time.perf_counter() - inicio) * 1000
+print(json.dumps({{"ms": duracao, "pesados": [m for m in {pesados!r} if m in sys.modules]}}))
+"""
+
+
+def medir(modulo, repeticoes):
+    tempos = []
+    pesados = []
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", CODIGO.format(modulo=modulo, pesados=MODULOS_PESADOS)],
+            cwd=RAIZ, capture_output=True, text=True,
+        )
+        if saida.returncode != 0:
+            erro = (saida.stderr.strip().splitlines() or ["erro desconhecido"])[-1]
+            return {"modulo": modulo, "erro": erro}
+        resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+        tempos.append(resultado["ms"])
+        pesados = resultado["pesados"]
+
+    return {
+        "modulo": modulo,
+        "mediana_ms": round(sorted(tempos)[len(tempos) // 2], 1),
+        "pesados": pesados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de importação do caminho de abertura")
+    parser.add_argument("--modulos", nargs="+", default=list(MODULOS))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    falhou = False
+    print(f"{'Módulo':<32} {'Mediana (ms)':>13}  Módulos pesados carregados")
+    for modulo in args.modulos:
+        r = medir(modulo, args.repeticoes)
+        if "erro" in r:
+            print(f"{modulo:<32} ERRO: {r['erro']}")
+            continue
+        print(f"{modulo:<32} {r['mediana_ms']:>13}  {', '.join(r['pesados']) or '-'}")
+        falhou = falhou or bool(r["pesados"])
+
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
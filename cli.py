@@ -0,0 +1,310 @@
+"""
+Modo linha de comando (sem janela) para reajustar os preços de várias notas.
+
+Cada nota é carregada, recebe a regra de preço informada (margem sobre a
+venda ou markup sobre o custo), é gravada pelo mesmo caminho da tela
+principal (Database.atualizar_precos, que registra a nota como processada)
+e, opcionalmente, todas as etiquetas saem em um único arquivo.
+
+Uso:
+    python cli.py --notas 123:4567 123:4568:2 --margem 30
+    python cli.py --de 2026-10-01 --ate 2026-10-15 --markup 45 --custo-total --etiquetas
+    python cli.py --notas 123:4567 --margem 30 --simular
+    python cli.py --catalogo 123 --margem 32 --simular
+
+Notas são informadas como FORNECEDOR:NOTA[:SERIE] (série padrão "1").
+Notas já processadas são ignoradas, a menos que --incluir-processadas seja usado.
+
+Com --catalogo o reajuste é feito direto no servidor, em uma única
+transação, para todos os produtos (ou os comprados do fornecedor informado)
+pelo custo da compra mais recente, sem carregar os produtos: mostra antes a
+prévia com os produtos alterados e o impacto total.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+
+from controller.database import Database
+from controller.notas_processadas import configurar_notas_manager, obter_notas_manager
+from controller.perfil import perfil
+
+
+def interpretar_nota(texto):
+    partes = texto.strip().split(":")
+    if len(partes) not in (2, 3) or not all(partes):
+        raise argparse.ArgumentTypeError(f"Nota inválida: {texto} (use FORNECEDOR:NOTA[:SERIE])")
+    serie = partes[2] if len(partes) == 3 else "1"
+    # Mesmo formato gravado no banco e nas notas processadas
+    return partes[0].zfill(5), partes[1].zfill(6), serie
+
+
+def interpretar_data(texto):
+    try:
+        return datetime.strptime(texto, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Data inválida: {texto} (use AAAA-MM-DD)")
+
+
+def aplicar_regra(produto, regra, valor, usar_custo_total):
+    """
+    Aplica a regra ao produto usando os mesmos cálculos da tela principal.
+
+    Returns:
+        True se o preço novo é diferente do atual
+    """
+    produto.usar_custo_total = usar_custo_total
+    custo_base = produto.custo_total if usar_custo_total else produto.custo_reposicao
+    if custo_base <= 0:
+        return False
+
+    if regra == "margem":
+        preco = produto.calcular_preco_por_margem_venda(valor)
+    else:
+        preco = produto.calcular_preco_por_porcentagem_custo(valor)
+
+    produto.set_preco_venda_novo(round(preco, 2))
+    return abs(produto.preco_venda_novo - produto.preco_venda_min) >= 0.005
+
+
+def reprecificar_nota(db, nota, args, regime_tributario):
+    """
+    Reprecifica uma nota.
+
+    Returns:
+        Lista dos produtos com preço alterado
+    """
+    codigo_fornecedor, numero_nota, serie = nota
+    produtos = db.buscar_produtos_por_nota(numero_nota, serie, codigo_fornecedor)
+    if not produtos:
+        raise ValueError("nenhum produto encontrado")
+
+    # Mesma validação da tela principal (apenas Regime Normal)
+    produtos_com_erro = [p for p in produtos if p.ar_pen > 0 and p.ag_pen not in [2, 3]]
+    if produtos_com_erro and regime_tributario == 3:
+        raise ValueError("nota lançada incorretamente (Campo Aproveita ICMS)")
+
+    alterados = [
+        produto for produto in produtos
+        if aplicar_regra(produto, args.regra, args.valor, args.custo_total)
+    ]
+
+    if args.detalhar or args.simular:
+        for produto in alterados:
+            print(
+                f"    {str(produto.codigo):>8}  {produto.descricao[:40]:<40} "
+                f"R$ {produto.preco_venda_min:>9.2f} -> R$ {produto.preco_venda_novo:>9.2f}"
+            )
+
+    if alterados and not args.simular:
+        db.atualizar_precos(
+            alterados,
+            codigo_fornecedor=codigo_fornecedor,
+            numero_nota=numero_nota,
+            serie=serie,
+        )
+
+    return alterados
+
+
+def confirmar_reajuste(quantidade, args):
+    """
+    O reajuste de catálogo não pode ser desfeito: exige --confirmar ou a
+    confirmação no terminal.
+    """
+    if args.confirmar:
+        return True
+    if not sys.stdin.isatty():
+        print("Reajuste não aplicado: use --confirmar para gravar sem perguntar.")
+        return False
+    resposta = input(f"\nAplicar o reajuste em {quantidade} produto(s)? Não pode ser desfeito. [s/N] ")
+    return resposta.strip().lower() in ("s", "sim")
+
+
+def reajustar_catalogo(db, args):
+    """Prévia e, sem --simular, aplicação do reajuste no servidor (--catalogo)."""
+    inicio = time.perf_counter()
+    fornecedor = args.catalogo or None
+    previa = db.simular_reajuste(
+        args.regra, args.valor, fornecedor, args.custo_total, limite=None if args.detalhar else 20
+    )
+
+    for produto in previa["produtos"]:
+        print(
+            f"    {produto['codigo']:>8}  {produto['descricao'][:40]:<40} "
+            f"R$ {produto['preco_atual']:>9.2f} -> R$ {produto['preco_novo']:>9.2f}"
+        )
+    if previa["quantidade"] > len(previa["produtos"]):
+        print(f"    ... e mais {previa['quantidade'] - len(previa['produtos'])} (use --detalhar para listar todos)")
+
+    variacao = previa["variacao_percentual"]
+    print(
+        f"\n{previa['quantidade']} produto(s) a alterar: {previa['aumentos']} aumento(s), "
+        f"{previa['reducoes']} redução(ões); soma dos preços R$ {previa['soma_atual']:.2f} -> "
+        f"R$ {previa['soma_nova']:.2f}" + (f" ({variacao:+.2f}%)" if variacao is not None else "")
+    )
+
+    if db.buscar_regime_tributario() == 3:
+        print("Regime Normal: produtos com a última compra lançada incorretamente (Campo Aproveita ICMS) ficam de fora.")
+
+    if args.simular or not previa["quantidade"]:
+        return 0
+    if not confirmar_reajuste(previa["quantidade"], args):
+        return 1
+
+    alterados = db.aplicar_reajuste(
+        args.regra, args.valor, fornecedor, args.custo_total, quantidade_prevista=previa["quantidade"]
+    )
+    print(f"{alterados} produto(s) alterado(s) em {time.perf_counter() - inicio:.1f} s")
+    return 0
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Reajuste de preços de várias notas, sem abrir a janela",
+    )
+    origem = parser.add_argument_group("notas")
+    origem.add_argument("--notas", nargs="+", type=interpretar_nota, default=[], metavar="FORN:NOTA[:SERIE]")
+    origem.add_argument("--de", type=interpretar_data, help="Data de entrada inicial (AAAA-MM-DD)")
+    origem.add_argument("--ate", type=interpretar_data, help="Data de entrada final (AAAA-MM-DD)")
+    origem.add_argument(
+        "--incluir-processadas", action="store_true", help="Reprecifica também notas já processadas"
+    )
+    origem.add_argument(
+        "--catalogo", nargs="?", const="", metavar="FORNECEDOR",
+        help="Reajusta no servidor todos os produtos (ou os comprados do fornecedor), sem usar notas",
+    )
+
+    regra = parser.add_mutually_exclusive_group(required=True)
+    regra.add_argument("--margem", type=float, help="Margem sobre o preço de venda (%%)")
+    regra.add_argument("--markup", type=float, help="Acréscimo sobre o custo (%%)")
+    parser.add_argument("--custo-total", action="store_true", help="Usa o custo total em vez do custo de reposição")
+
+    parser.add_argument("--simular", action="store_true", help="Apenas mostra os preços, sem gravar")
+    parser.add_argument(
+        "--confirmar", action="store_true", help="Aplica o reajuste de catálogo sem perguntar (--catalogo)"
+    )
+    parser.add_argument("--detalhar", action="store_true", help="Lista os produtos alterados de cada nota")
+    parser.add_argument("--etiquetas", action="store_true", help="Gera um único arquivo de etiquetas ao final")
+    parser.add_argument("--formato", choices=("pdf", "zpl", "epl"), help="Formato das etiquetas (padrão: config.ini)")
+    parser.add_argument("--destino", help="Arquivo ou impressora das etiquetas (padrão: pasta etiquetas)")
+    parser.add_argument("--config", default="config.ini")
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+
+    if args.margem is not None:
+        args.regra, args.valor = "margem", args.margem
+        if args.valor >= 100:
+            parser.error("a margem sobre a venda deve ser menor que 100%")
+    else:
+        args.regra, args.valor = "markup", args.markup
+
+    if bool(args.de) != bool(args.ate):
+        parser.error("informe --de e --ate juntos")
+    if args.catalogo is not None:
+        if args.notas or args.de:
+            parser.error("--catalogo não é usado com --notas ou --de/--ate")
+        if args.etiquetas:
+            parser.error("--etiquetas não é usado com --catalogo")
+    elif args.confirmar:
+        parser.error("--confirmar só é usado com --catalogo")
+    elif not args.notas and not args.de:
+        parser.error("informe --notas, o período (--de/--ate) ou --catalogo")
+
+    perfil.configurar(args.config)
+    # Notas processadas e etiquetas também seguem o --config
+    configurar_notas_manager(args.config)
+    db = Database(args.config)
+    if db.replica:
+        # Leituras usam a réplica como está: sincroniza uma vez no início
+        try:
+            db.sincronizar_replica()
+        except Exception as e:
+            print(f"Aviso: {e}")
+    if args.catalogo is not None:
+        try:
+            return reajustar_catalogo(db, args)
+        except Exception as e:
+            print(f"ERRO: {e}")
+            return 1
+        finally:
+            db.disconnect()
+
+    inicio = time.perf_counter()
+
+    try:
+        notas = list(args.notas)
+        if args.de:
+            notas.extend(db.buscar_notas_periodo(args.de, args.ate))
+        # Remove repetidas mantendo a ordem
+        notas = list(dict.fromkeys(notas))
+
+        if not args.incluir_processadas:
+            processadas = obter_notas_manager().verificar_notas(notas)
+            ignoradas = [nota for nota, processada in zip(notas, processadas) if processada]
+            notas = [nota for nota, processada in zip(notas, processadas) if not processada]
+            for fornecedor, numero, serie in ignoradas:
+                print(f"Ignorada (já processada): fornecedor {fornecedor} nota {numero} série {serie}")
+
+        if not notas:
+            print("Nenhuma nota para reprecificar.")
+            return 0
+
+        regime_tributario = db.buscar_regime_tributario()
+        todos_alterados = []
+        falhas = 0
+
+        for nota in notas:
+            fornecedor, numero, serie = nota
+            try:
+                alterados = reprecificar_nota(db, nota, args, regime_tributario)
+                todos_alterados.extend(alterados)
+                acao = "a alterar" if args.simular else "alterado(s)"
+                print(f"Nota {numero} série {serie} (fornecedor {fornecedor}): {len(alterados)} produto(s) {acao}")
+            except Exception as e:
+                falhas += 1
+                print(f"ERRO na nota {numero} série {serie} (fornecedor {fornecedor}): {e}")
+
+        duracao = time.perf_counter() - inicio
+        concluidas = len(notas) - falhas
+        print(
+            f"\n{concluidas} nota(s), {len(todos_alterados)} produto(s) em {duracao:.1f} s "
+            f"({concluidas / duracao * 60:.1f} notas/min, "
+            f"{len(todos_alterados) / duracao:.1f} produtos/s)"
+        )
+
+        if args.etiquetas and todos_alterados and not args.simular:
+            # Importação tardia, como na tela principal
+            from controller.etiqueta_generator import EtiquetaGenerator
+
+            # Produto presente em mais de uma nota: uma etiqueta, com o último preço
+            etiquetas = list({str(produto.codigo): produto for produto in todos_alterados}.values())
+
+            inicio_etiquetas = time.perf_counter()
+            gerador = EtiquetaGenerator(db, args.config)
+            formato = (args.formato or gerador.modo).lower()
+            if formato == "pdf":
+                destino = gerador.gerar_pdf(etiquetas, output_path=args.destino)
+            else:
+                destino = gerador.gerar_termica(etiquetas, formato, destino=args.destino)
+            print(
+                f"{len(etiquetas)} etiqueta(s) {formato.upper()} em "
+                f"{time.perf_counter() - inicio_etiquetas:.1f} s: {destino}"
+            )
+
+        return 1 if falhas else 0
+
+    except Exception as e:
+        print(f"ERRO: {e}")
+        return 1
+
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,44 @@
-import pyodbc
 import configparser
 import os
 from model.produto import Produto
-from controller.notas_processadas import NotasProcessadasManager
+from controller.notas_processadas import obter_notas_manager
+from controller.perfil import perfilado
+from controller.instrucoes_sql import Instrucao, RegistroInstrucoes, driver_suporta_fast_executemany
+
+
+class ConflitoPrecosError(Exception):
+    """
+    Preços alterados no servidor (por outra estação ou pelo VTi) desde que
+    os produtos foram carregados. Nada foi gravado.
+
+    Attributes:
+        conflitos: Lista de {codigo, preco_min_carregado, preco_max_carregado,
+            preco_min_atual, preco_max_atual}, apenas dos produtos em conflito
+    """
+
+    def __init__(self, conflitos):
+        self.conflitos = conflitos
+        codigos = ", ".join(conflito["codigo"] for conflito in conflitos[:10])
+        if len(conflitos) > 10:
+            codigos += ", ..."
+        super().__init__(
+            f"{len(conflitos)} produto(s) com preço alterado por outra estação "
+            f"desde o carregamento: {codigos}"
+        )
 
 
 class Database:
     def __init__(self, config_file="config.ini"):
         self.config_file = config_file
         self.connection = None
+        # Perfil da empresa e fornecedores não mudam durante a sessão
+        self.nome_empresa = None
+        self.regime_tributario = None
+        self._fornecedores = {}
+        # Cópia local do cadastro de produtos ([Replica] no config.ini)
+        self.replica = None
+        # Instruções SQL com cursor reaproveitado na conexão principal
+        self.instrucoes = RegistroInstrucoes(self.INSTRUCOES)
         self._load_config()
 
     def _load_config(self):
@@ -22,8 +52,48 @@ class Database:
         self.driver = config.get("Database", "driver")
         self.usuario_evolucao = config.get("Database", "usuario_evolucao", fallback="2")
         self.tipo_margem = int(config.get("Database", "tipo_margem", fallback="1"))
+        # Arquivo do banco simulado (controller/vti_simulado.py), em vez do SQL Server
+        self.simulado = config.get("Database", "simulado", fallback="").strip()
+
+        # auto = só com ODBC Driver 17 ou mais novo (nunca no banco simulado)
+        fast_executemany = config.get("Database", "fast_executemany", fallback="auto").strip().lower()
+        if fast_executemany == "auto":
+            self.instrucoes.fast_executemany = not self.simulado and driver_suporta_fast_executemany(self.driver)
+        else:
+            self.instrucoes.fast_executemany = fast_executemany == "1"
+
+        if config.get("Replica", "ativo", fallback="0").strip() == "1":
+            try:
+                from controller.replica_produtos import ReplicaProdutos
+
+                self.replica = ReplicaProdutos(
+                    config.get("Replica", "arquivo", fallback="replica_produtos.db"),
+                    origem=f"{self.server}/{self.database}",
+                    intervalo_segundos=float(config.get("Replica", "intervalo_segundos", fallback="60")),
+                    completa_horas=float(config.get("Replica", "completa_horas", fallback="24")),
+                )
+            except Exception as e:
+                print(f"Aviso: Réplica de produtos desativada: {e}")
+                self.replica = None
 
     def connect(self):
+        self.connection = self.criar_conexao()
+        return True
+
+    def criar_conexao(self):
+        """Abre uma nova conexão, para uso em outra thread (ex.: sincronização da réplica)."""
+        if self.simulado:
+            from controller import vti_simulado
+
+            try:
+                return vti_simulado.connect(self.simulado)
+            except Exception as e:
+                raise Exception(f"Erro ao conectar ao banco de dados: {str(e)}")
+
+        # pyodbc (e o driver ODBC) só é carregado na primeira conexão, fora
+        # do caminho de abertura da janela
+        import pyodbc
+
         try:
             connection_string = (
                 f"DRIVER={self.driver};"
@@ -32,93 +102,165 @@ class Database:
                 f"UID={self.username};"
                 f"PWD={self.password};"
             )
-            self.connection = pyodbc.connect(connection_string)
-            return True
+            return pyodbc.connect(connection_string)
         except Exception as e:
             raise Exception(f"Erro ao conectar ao banco de dados: {str(e)}")
 
     def disconnect(self):
         if self.connection:
+            self.instrucoes.fechar_cursores()
             self.connection.close()
             self.connection = None
 
-    def buscar_produtos_por_nota(
-        self, numero_nota, serie_nota="1", codigo_fornecedor=""
-    ):
+    def _consultar(self, nome, parametros=(), lista=None, **trechos):
+        """Executa a consulta registrada `nome` na conexão principal (ver RegistroInstrucoes)."""
         if not self.connection:
             self.connect()
+        return self.instrucoes.consultar(self.connection, nome, parametros, lista, **trechos)
 
-        nota_formatada = str(numero_nota).zfill(6)
-        fornecedor_formatado = (
-            str(codigo_fornecedor).zfill(5) if codigo_fornecedor else ""
-        )
+    def _consultar_um(self, nome, parametros=(), lista=None, **trechos):
+        if not self.connection:
+            self.connect()
+        return self.instrucoes.consultar_um(self.connection, nome, parametros, lista, **trechos)
 
-        query = """
-            SELECT
-                a.AH_PEN as Sequencia,
-                a.AE_PEN as CodigoProduto,
-                cp.AB_ITE as DescricaoProduto,
-                a.AJ_PEN as CustoTotal,
-                a.AG_PEN as TipoCalculo,
-                a.AI_PEN as Quantidade,
-                a.AO_PEN as ValorAO,
-                a.AR_PEN as ValorAR,
-                CASE
-                    WHEN a.AG_PEN = 2 AND a.AI_PEN > 0 THEN (a.AO_PEN + ISNULL(a.AR_PEN, 0)) / a.AI_PEN
-                    WHEN a.AG_PEN = 3 AND a.AI_PEN > 0 THEN a.AO_PEN / a.AI_PEN
-                    WHEN a.AI_PEN > 0 THEN (a.AO_PEN + ISNULL(a.AR_PEN, 0)) / a.AI_PEN
-                    ELSE 0
-                END as CustoReposicao,
-                pa.PrecoVendaMin as PrecoMinimo,
-                pa.PrecoVendaMax as PrecoMaximo
-            FROM APECENCE a
-            LEFT JOIN CE_PRODUTO cp ON a.AE_PEN = cp.AU_ITE
-            LEFT JOIN ce_produtos_adicionais pa ON a.AE_PEN = pa.CodReduzido
-            WHERE a.AB_PEN = ? AND a.AC_PEN = ? AND a.AA_PEN = ?
-            ORDER BY a.AH_PEN
+    def _executar(self, nome, parametros=(), lista=None, **trechos):
+        if not self.connection:
+            self.connect()
+        return self.instrucoes.executar(self.connection, nome, parametros, lista, **trechos)
+
+    def _executar_lote(self, nome, sequencia, **trechos):
+        if not self.connection:
+            self.connect()
+        self.instrucoes.executar_lote(self.connection, nome, sequencia, **trechos)
+
+    def estatisticas_instrucoes(self):
+        """
+        Execuções, linhas, tempos e preparações de cada instrução SQL desde a
+        abertura (ver RegistroInstrucoes.estatisticas).
         """
+        return self.instrucoes.estatisticas()
 
-        produtos = []
-        try:
-            cursor = self.connection.cursor()
-            cursor.execute(query, (nota_formatada, serie_nota, fornecedor_formatado))
-
-            for row in cursor.fetchall():
-                produto = Produto(
-                    codigo=row.CodigoProduto or "",
-                    descricao=(row.DescricaoProduto or "").strip(),
-                    custo_reposicao=float(row.CustoReposicao or 0),
-                    preco_venda_min=float(row.PrecoMinimo or 0),
-                    preco_venda_max=float(row.PrecoMaximo or 0),
-                    tipo_margem=self.tipo_margem,
-                    custo_total=float(row.CustoTotal or 0),
-                    ag_pen=int(row.TipoCalculo or 0),
-                    ar_pen=float(row.ValorAR or 0),
-                )
-                produto.sequencia = row.Sequencia or ""
-                produtos.append(produto)
+    @perfilado(categoria="banco")
+    def sincronizar_replica(self, conexao=None):
+        """
+        Sincroniza a réplica local do cadastro de produtos (se ativa).
 
-            cursor.close()
-            return produtos
+        Args:
+            conexao: Conexão a usar; padrão é a conexão principal
 
+        Returns:
+            dict com o resultado da sincronização, ou None se a réplica está desativada
+        """
+        if not self.replica:
+            return None
+        if conexao is None:
+            if not self.connection:
+                self.connect()
+            conexao = self.connection
+
+        try:
+            return self.replica.sincronizar(conexao)
         except Exception as e:
-            raise Exception(f"Erro ao buscar produtos: {str(e)}")
+            raise Exception(f"Erro ao sincronizar réplica de produtos: {str(e)}")
+
+    def iniciar_sincronizacao_replica(self):
+        """
+        Mantém a réplica atualizada em segundo plano, com conexão própria,
+        a cada `intervalo_segundos` da seção [Replica].
+        """
+        if self.replica:
+            self.replica.iniciar_sincronizacao_periodica(self.criar_conexao)
+
+    @perfilado(categoria="banco")
+    def cadastro_produtos(self, codigos):
+        """
+        Descrição, código de barras e preços atuais dos produtos: da réplica
+        local quando ativa (buscando no servidor só o que falta), senão do
+        servidor em uma única consulta por lote.
 
-    def atualizar_precos(self, produtos, codigo_fornecedor=None, numero_nota=None, serie=None):
+        A réplica não é sincronizada aqui, e sim na abertura e em segundo
+        plano (iniciar_sincronizacao_replica).
+
+        Returns:
+            dict: codigo -> {descricao, codigo_barras, preco_min, preco_max}
+        """
+        codigos = list(dict.fromkeys(str(codigo).strip() for codigo in codigos))
+        if not codigos:
+            return {}
         if not self.connection:
             self.connect()
 
         try:
-            cursor = self.connection.cursor()
+            if self.replica:
+                return self.replica.obter(codigos, self.connection)
+
+            from controller.replica_produtos import buscar_cadastro_servidor
 
-            query_update = """
-                UPDATE ce_produtos_adicionais
-                SET PrecoVendaMin = ?, PrecoVendaMax = ?
-                WHERE CodReduzido = ?
-            """
+            return buscar_cadastro_servidor(self.connection, codigos)
 
-            query_evolucao = """
-                INSERT INTO GE_VARIACAO_PRECOSVENDA (
+        except Exception as e:
+            raise Exception(f"Erro ao buscar cadastro dos produtos: {str(e)}")
+
+    # Custo de reposição de uma linha de APECENCE (a), conforme o tipo de cálculo
+    CUSTO_REPOSICAO_NOTA = """CASE
+                    WHEN a.AG_PEN = 2 AND a.AI_PEN > 0 THEN (a.AO_PEN + ISNULL(a.AR_PEN, 0)) / a.AI_PEN
+                    WHEN a.AG_PEN = 3 AND a.AI_PEN > 0 THEN a.AO_PEN / a.AI_PEN
+                    WHEN a.AI_PEN > 0 THEN (a.AO_PEN + ISNULL(a.AR_PEN, 0)) / a.AI_PEN
+                    ELSE 0
+                END"""
+
+    # Colunas de APECENCE (a) usadas para montar um Produto; descrição e
+    # preços vêm de CAMPOS_CADASTRO_NOTA ou da réplica local
+    CAMPOS_PRODUTO_NOTA = """
+                a.AH_PEN as Sequencia,
+                a.AE_PEN as CodigoProduto,
+                a.AJ_PEN as CustoTotal,
+                a.AG_PEN as TipoCalculo,
+                a.AI_PEN as Quantidade,
+                a.AO_PEN as ValorAO,
+                a.AR_PEN as ValorAR,
+                """ + CUSTO_REPOSICAO_NOTA + """ as CustoReposicao"""
+
+    CAMPOS_CADASTRO_NOTA = """,
+                cp.AB_ITE as DescricaoProduto,
+                pa.PrecoVendaMin as PrecoMinimo,
+                pa.PrecoVendaMax as PrecoMaximo"""
+
+    JUNCOES_CADASTRO_NOTA = """
+            LEFT JOIN CE_PRODUTO cp ON a.AE_PEN = cp.AU_ITE
+            LEFT JOIN ce_produtos_adicionais pa ON a.AE_PEN = pa.CodReduzido"""
+
+    # Produtos cujo preço muda por uma regra de reajuste (ver _trechos_reajuste)
+    SUBCONSULTA_REAJUSTE = """
+            SELECT r.Codigo, r.Custo, r.PrecoAtual, r.PrecoNovo
+            FROM (
+                SELECT
+                    c.Codigo,
+                    c.Custo,
+                    ISNULL(pa.PrecoVendaMin, 0) AS PrecoAtual,
+                    {preco_novo} AS PrecoNovo
+                FROM (
+                    SELECT
+                        a.AE_PEN AS Codigo,
+                        {custo} AS Custo,
+                        a.AG_PEN AS TipoCalculo,
+                        ISNULL(a.AR_PEN, 0) AS ValorAR,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY a.AE_PEN
+                            ORDER BY n.AE_NEN DESC, a.AB_PEN DESC, a.AH_PEN DESC
+                        ) AS Ordem
+                    FROM APECENCE a
+                    INNER JOIN ANOTENCE n
+                        ON n.AA_NEN = a.AA_PEN AND n.AB_NEN = a.AB_PEN AND n.AC_NEN = a.AC_PEN
+                    WHERE n.BD_NEN = '01' {filtro_fornecedor}
+                ) c
+                INNER JOIN ce_produtos_adicionais pa ON pa.CodReduzido = c.Codigo
+                WHERE c.Ordem = 1 AND c.Custo > 0 {filtro_icms}
+            ) r
+            WHERE r.PrecoNovo > 0 AND ABS(r.PrecoNovo - r.PrecoAtual) >= 0.005
+        """
+
+    COLUNAS_EVOLUCAO = """
                     DATA_VPV,
                     HORA_VPV,
                     USUARIO_VPV,
@@ -130,104 +272,760 @@ class Database:
                     ORIGEMPRECO_VPV,
                     CODIGOORIGEM_VPV,
                     EMPRESA_VPV,
-                    OPERACAO_VPV
-                ) VALUES (
-                    CONVERT(DATE, GETDATE()),
-                    CONVERT(TIME, GETDATE()),
-                    ?,
-                    ?,
-                    ?,
-                    ?,
-                    0,
-                    0,
-                    '0',
-                    ?,
-                    '02',
-                    'ALTERACAO'
+                    OPERACAO_VPV"""
+
+    COLUNAS_FORNECEDOR = """
+                codigo_for as Codigo,
+                nome_for as Nome,
+                cgccpf_for as CNPJ,
+                estado_for as Estado,
+                classi_for as Classificacao"""
+
+    # Todas as instruções SQL do Database, declaradas uma única vez. Os
+    # {trechos} vêm de constantes desta classe, nunca de dados digitados
+    INSTRUCOES = (
+        Instrucao("produtos_nota", """
+            SELECT""" + CAMPOS_PRODUTO_NOTA + """{campos_cadastro}
+            FROM APECENCE a{juncoes_cadastro}
+            WHERE a.AB_PEN = ? AND a.AC_PEN = ? AND a.AA_PEN = ?
+            ORDER BY a.AH_PEN
+        """),
+        # 3 parâmetros por nota: abaixo do limite de 2100 do SQL Server
+        Instrucao("produtos_notas", """
+            SELECT""" + CAMPOS_PRODUTO_NOTA + """{campos_cadastro},
+                a.AA_PEN as Fornecedor,
+                a.AB_PEN as Nota,
+                a.AC_PEN as Serie,
+                n.AE_NEN as Entrada
+            FROM APECENCE a{juncoes_cadastro}
+            LEFT JOIN ANOTENCE n
+                ON n.AA_NEN = a.AA_PEN AND n.AB_NEN = a.AB_PEN AND n.AC_NEN = a.AC_PEN
+            WHERE {lista}
+            ORDER BY a.AA_PEN, a.AB_PEN, a.AC_PEN, a.AH_PEN
+        """, item_lista="(a.AA_PEN = ? AND a.AB_PEN = ? AND a.AC_PEN = ?)", separador=" OR ", lote_maximo=600,
+            permite_repeticao=True),
+        # As linhas lidas ficam travadas (UPDLOCK) só até o commit da gravação
+        Instrucao("precos_atuais", """
+            SELECT
+                CodReduzido AS Codigo,
+                PrecoVendaMin AS PrecoMinimo,
+                PrecoVendaMax AS PrecoMaximo
+            FROM ce_produtos_adicionais WITH (UPDLOCK, ROWLOCK)
+            WHERE CodReduzido IN ({lista})
+        """, permite_repeticao=True),
+        Instrucao("atualizar_preco", """
+            UPDATE ce_produtos_adicionais
+            SET PrecoVendaMin = ?, PrecoVendaMax = ?
+            WHERE CodReduzido = ?
+        """),
+        Instrucao("registrar_evolucao", """
+            INSERT INTO GE_VARIACAO_PRECOSVENDA (""" + COLUNAS_EVOLUCAO + """
+            ) VALUES (
+                CONVERT(DATE, GETDATE()),
+                CONVERT(TIME, GETDATE()),
+                ?,
+                ?,
+                ?,
+                ?,
+                0,
+                0,
+                '0',
+                ?,
+                '02',
+                'ALTERACAO'
+            )
+        """),
+        Instrucao("reajuste_totais", """
+            SELECT
+                COUNT(*) AS Quantidade,
+                SUM(CASE WHEN x.PrecoNovo > x.PrecoAtual THEN 1 ELSE 0 END) AS Aumentos,
+                SUM(x.PrecoAtual) AS SomaAtual,
+                SUM(x.PrecoNovo) AS SomaNova,
+                MAX(x.PrecoNovo - x.PrecoAtual) AS MaiorAumento,
+                MIN(x.PrecoNovo - x.PrecoAtual) AS MaiorReducao
+            FROM (""" + SUBCONSULTA_REAJUSTE + """) AS x
+        """),
+        Instrucao("reajuste_produtos", """
+            SELECT {topo}
+                x.Codigo,
+                cp.AB_ITE AS Descricao,
+                x.Custo,
+                x.PrecoAtual,
+                x.PrecoNovo
+            FROM (""" + SUBCONSULTA_REAJUSTE + """) AS x
+            LEFT JOIN CE_PRODUTO cp ON cp.AU_ITE = x.Codigo
+            ORDER BY ABS(x.PrecoNovo - x.PrecoAtual) DESC, x.Codigo
+        """),
+        Instrucao("reajuste_evolucao", """
+            INSERT INTO GE_VARIACAO_PRECOSVENDA (""" + COLUNAS_EVOLUCAO + """
+            )
+            SELECT
+                CONVERT(DATE, GETDATE()),
+                CONVERT(TIME, GETDATE()),
+                ?,
+                x.Codigo,
+                x.PrecoNovo,
+                x.PrecoNovo,
+                0,
+                0,
+                '0',
+                x.Codigo,
+                '02',
+                'ALTERACAO'
+            FROM (""" + SUBCONSULTA_REAJUSTE + """) AS x
+        """),
+        Instrucao("reajuste_atualizar", """
+            UPDATE ce_produtos_adicionais
+            SET PrecoVendaMin = x.PrecoNovo, PrecoVendaMax = x.PrecoNovo
+            FROM (""" + SUBCONSULTA_REAJUSTE + """) AS x
+            WHERE ce_produtos_adicionais.CodReduzido = x.Codigo
+        """),
+        Instrucao("agora_servidor", "SELECT CONVERT(VARCHAR(19), GETDATE(), 120)"),
+        Instrucao("variacoes_desde", """
+            SELECT
+                PRODUTO_VPV AS Produto,
+                CONVERT(VARCHAR(10), DATA_VPV, 23) AS Data,
+                CONVERT(VARCHAR(8), HORA_VPV, 108) AS Hora,
+                USUARIO_VPV AS Usuario,
+                VLR_MINIMO_VPV AS Preco
+            FROM GE_VARIACAO_PRECOSVENDA
+            WHERE DATA_VPV >= ? AND PRODUTO_VPV IN ({lista})
+        """, permite_repeticao=True),
+        Instrucao("nota_existe", "SELECT COUNT(*) FROM APECENCE WHERE ab_pen = ?"),
+        Instrucao("perfil_empresa", "SELECT BC_EMP, CODRGT_EMP FROM AEMPREGE"),
+        Instrucao("fornecedores", """
+            SELECT""" + COLUNAS_FORNECEDOR + """
+            FROM AFORNEGE
+        """),
+        Instrucao("fornecedor", """
+            SELECT""" + COLUNAS_FORNECEDOR + """
+            FROM AFORNEGE
+            WHERE codigo_for = ?
+        """),
+        Instrucao("notas_periodo", """
+            SELECT
+                AA_NEN AS CODIGO,
+                AB_NEN AS NOTA,
+                AC_NEN AS SERIE
+            FROM ANOTENCE
+            INNER JOIN ATIPNFCE ON AA_TIP = BD_NEN
+            WHERE AA_TIP = '01' AND AE_NEN BETWEEN ? AND ?
+            ORDER BY AE_NEN, AB_NEN
+        """),
+        # O limite é parâmetro: um único plano para qualquer quantidade
+        Instrucao("todas_notas", """
+            SELECT TOP (?)
+                AD_NEN AS EMISSAO, 
+                AB_NEN AS NOTA, 
+                AC_NEN AS SERIE, 
+                AA_NEN AS CODIGO, 
+                AB_TIP AS TIPOENTRADA, 
+                CGCCPF_FOR AS CNPJ, 
+                NOME_FOR AS FORNECEDOR, 
+                AE_NEN AS ENTRADA, 
+                AF_NEN AS VALOR, 
+                CASE BE_NEN
+                    WHEN '1' THEN 'Nota Digitada'
+                    WHEN '2' THEN 'Nota Com Erro de Cálculo'
+                    WHEN '3' THEN 'Nota Cálculo Ok'
+                    WHEN '4' THEN 'Nota Impressa Ok'
+                    WHEN '5' THEN 'Nota Com Atualização Iniciada'
+                    WHEN '6' THEN 'Nota Atualizada Ok'
+                    WHEN '7' THEN 'Nota Emitida Pelo Sistema'
+                    WHEN '9' THEN 'Nota Cancelada'
+                END AS STATUS,
+                CASE BR_NEN 
+                    WHEN 'P' THEN 'Próprio'
+                    WHEN 'T' THEN 'Terceiros'
+                END AS EMITENTE, 
+                CHVNFE_NEN AS CHACENFE 
+            FROM ANOTENCE 
+            LEFT JOIN AFORNEGE ON CODIGO_FOR = AA_NEN 
+            INNER JOIN ATIPNFCE ON AA_TIP = BD_NEN
+            WHERE AA_TIP = '01'
+            ORDER BY AD_NEN DESC, AB_NEN DESC
+        """),
+    )
+
+    def _trechos_cadastro_nota(self):
+        """Colunas e junções do cadastro; vazias quando a réplica local fornece esses dados."""
+        if self.replica:
+            return {"campos_cadastro": "", "juncoes_cadastro": ""}
+        return {
+            "campos_cadastro": self.CAMPOS_CADASTRO_NOTA,
+            "juncoes_cadastro": self.JUNCOES_CADASTRO_NOTA,
+        }
+
+    def _cadastro_das_linhas(self, rows):
+        if not self.replica:
+            return None
+        return self.cadastro_produtos(row.CodigoProduto or "" for row in rows)
+
+    def _montar_produto(self, row, cadastro=None):
+        """
+        Args:
+            row: Linha com CAMPOS_PRODUTO_NOTA (e CAMPOS_CADASTRO_NOTA sem réplica)
+            cadastro: Resultado de cadastro_produtos, quando a réplica está ativa
+        """
+        if cadastro is not None:
+            registro = cadastro.get(str(row.CodigoProduto or "").strip(), {})
+            descricao = registro.get("descricao") or ""
+            preco_min = registro.get("preco_min")
+            preco_max = registro.get("preco_max")
+        else:
+            descricao = row.DescricaoProduto or ""
+            preco_min = row.PrecoMinimo
+            preco_max = row.PrecoMaximo
+
+        produto = Produto(
+            codigo=row.CodigoProduto or "",
+            descricao=descricao.strip(),
+            custo_reposicao=float(row.CustoReposicao or 0),
+            preco_venda_min=float(preco_min or 0),
+            preco_venda_max=float(preco_max or 0),
+            tipo_margem=self.tipo_margem,
+            custo_total=float(row.CustoTotal or 0),
+            ag_pen=int(row.TipoCalculo or 0),
+            ar_pen=float(row.ValorAR or 0),
+        )
+        produto.sequencia = row.Sequencia or ""
+        return produto
+
+    @staticmethod
+    def _normalizar_nota(codigo_fornecedor, numero_nota, serie):
+        """(fornecedor, nota, serie) no formato gravado no banco e nas notas processadas."""
+        return (
+            str(codigo_fornecedor).strip().zfill(5),
+            str(numero_nota).strip().zfill(6),
+            str(serie).strip() or "1",
+        )
+
+    @perfilado(categoria="banco")
+    def buscar_produtos_por_nota(
+        self, numero_nota, serie_nota="1", codigo_fornecedor=""
+    ):
+        nota_formatada = str(numero_nota).zfill(6)
+        fornecedor_formatado = (
+            str(codigo_fornecedor).zfill(5) if codigo_fornecedor else ""
+        )
+
+        try:
+            rows = self._consultar(
+                "produtos_nota",
+                (nota_formatada, serie_nota, fornecedor_formatado),
+                **self._trechos_cadastro_nota(),
+            )
+
+            cadastro = self._cadastro_das_linhas(rows)
+            return [self._montar_produto(row, cadastro) for row in rows]
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar produtos: {str(e)}")
+
+    @perfilado(categoria="banco")
+    def buscar_produtos_por_notas(self, notas):
+        """
+        Carrega os produtos de várias notas para reajustá-las juntas, com
+        uma consulta por lote de até 600 notas.
+
+        Um produto presente em mais de uma nota aparece uma única vez, com o
+        custo da nota de entrada mais recente. Cada produto recebe:
+            notas: Notas (fornecedor, nota, serie) em que aparece
+            nota_custo: Nota de onde veio o custo
+
+        Args:
+            notas: Tuplas (codigo_fornecedor, numero_nota, serie)
+
+        Returns:
+            list: Produtos na ordem das notas informadas e da sequência na nota
+        """
+        notas = list(dict.fromkeys(self._normalizar_nota(*nota) for nota in notas))
+        ordem_notas = {nota: i for i, nota in enumerate(notas)}
+
+        trechos = self._trechos_cadastro_nota()
+        lote_maximo = self.instrucoes.obter("produtos_notas").lote_maximo
+        linhas = []
+        try:
+            for inicio in range(0, len(notas), lote_maximo):
+                linhas.extend(
+                    self._consultar("produtos_notas", lista=notas[inicio:inicio + lote_maximo], **trechos)
                 )
-            """
+            cadastro = self._cadastro_das_linhas(linhas)
+        except Exception as e:
+            raise Exception(f"Erro ao buscar produtos das notas: {str(e)}")
 
-            for produto in produtos:
-                cursor.execute(
-                    query_update,
-                    (
-                        produto.preco_venda_novo,
-                        produto.preco_venda_novo,
-                        produto.codigo,
-                    ),
+        def nota_da_linha(row):
+            return self._normalizar_nota(row.Fornecedor or "", row.Nota or "", row.Serie or "")
+
+        # Ordenação estável: mantém a sequência de cada nota
+        linhas.sort(key=lambda row: ordem_notas.get(nota_da_linha(row), len(notas)))
+
+        produtos = {}
+        recencias = {}
+        for row in linhas:
+            nota = nota_da_linha(row)
+            codigo = str(row.CodigoProduto or "").strip()
+            # Entrada mais recente; no mesmo dia, o maior número de nota
+            recencia = (str(row.Entrada or ""), nota[1])
+            anterior = produtos.get(codigo)
+
+            if anterior is None or recencia > recencias[codigo]:
+                produto = self._montar_produto(row, cadastro)
+                produto.notas = anterior.notas if anterior else []
+                produto.nota_custo = nota
+                # Substituir o valor mantém a posição da primeira ocorrência
+                produtos[codigo] = produto
+                recencias[codigo] = recencia
+
+            if nota not in produtos[codigo].notas:
+                produtos[codigo].notas.append(nota)
+
+        return list(produtos.values())
+
+    def atualizar_precos(
+        self, produtos, codigo_fornecedor=None, numero_nota=None, serie=None, verificar_conflitos=True
+    ):
+        notas = []
+        if codigo_fornecedor and numero_nota and serie:
+            notas.append((codigo_fornecedor, numero_nota, serie, produtos))
+        return self._gravar_precos(produtos, notas, verificar_conflitos)
+
+    def atualizar_precos_notas(self, produtos, notas, verificar_conflitos=True):
+        """
+        Grava os preços de várias notas carregadas juntas em uma única
+        transação e registra todas como processadas de uma vez.
+
+        Args:
+            produtos: Produtos alterados, vindos de buscar_produtos_por_notas
+            notas: Tuplas (codigo_fornecedor, numero_nota, serie) carregadas;
+                todas são registradas, mesmo as sem produto alterado
+
+        Returns:
+            True se os preços foram gravados
+        """
+        notas_produtos = []
+        for nota in dict.fromkeys(self._normalizar_nota(*nota) for nota in notas):
+            da_nota = [produto for produto in produtos if nota in getattr(produto, "notas", ())]
+            notas_produtos.append((*nota, da_nota))
+        return self._gravar_precos(produtos, notas_produtos, verificar_conflitos)
+
+    def _verificar_conflitos(self, produtos):
+        """
+        Confere, dentro da transação da gravação, se os preços atuais no
+        servidor ainda são os carregados (preco_venda_min/max de cada produto),
+        com uma consulta por lote de 2000 produtos. As linhas lidas ficam
+        travadas (UPDLOCK) só até o commit da gravação.
+
+        Returns:
+            list: Conflitos, no formato de ConflitoPrecosError.conflitos
+        """
+        carregados = {str(produto.codigo).strip(): produto for produto in produtos}
+        codigos = list(carregados)
+        atuais = {}
+        # Limite de 2100 parâmetros por instrução do SQL Server
+        for inicio in range(0, len(codigos), 2000):
+            for row in self._consultar("precos_atuais", lista=codigos[inicio:inicio + 2000]):
+                atuais[str(row.Codigo or "").strip()] = (
+                    float(row.PrecoMinimo or 0),
+                    float(row.PrecoMaximo or 0),
                 )
 
-                cursor.execute(
-                    query_evolucao,
+        conflitos = []
+        for codigo, produto in carregados.items():
+            preco_min, preco_max = atuais.get(codigo, (0.0, 0.0))
+            if (
+                abs(preco_min - float(produto.preco_venda_min or 0)) >= 0.005
+                or abs(preco_max - float(produto.preco_venda_max or 0)) >= 0.005
+            ):
+                conflitos.append({
+                    "codigo": codigo,
+                    "preco_min_carregado": float(produto.preco_venda_min or 0),
+                    "preco_max_carregado": float(produto.preco_venda_max or 0),
+                    "preco_min_atual": preco_min,
+                    "preco_max_atual": preco_max,
+                })
+        return conflitos
+
+    @perfilado(categoria="banco")
+    def _gravar_precos(self, produtos, notas, verificar_conflitos=True):
+        """
+        Args:
+            produtos: Produtos com o preço novo
+            notas: Tuplas (codigo_fornecedor, numero_nota, serie, produtos da
+                nota) a registrar como processadas após o commit
+            verificar_conflitos: Recusa a gravação (ConflitoPrecosError) se o
+                preço de algum produto mudou no servidor desde o carregamento
+        """
+        if not self.connection:
+            self.connect()
+
+        intencoes_ids = []
+
+        if notas:
+            # Registra as intenções antes do commit: se o sistema cair entre o
+            # commit e o registro das notas, a próxima abertura reconcilia.
+            # A hora do servidor separa esta gravação de alterações anteriores
+            # do mesmo usuário no GE_VARIACAO_PRECOSVENDA. Falhas no histórico
+            # de notas nunca impedem a gravação dos preços
+            try:
+                intencoes_ids = obter_notas_manager().intencoes.registrar_varias(
+                    [
+                        (fornecedor, nota, serie, [(p.codigo, p.preco_venda_novo) for p in da_nota])
+                        for fornecedor, nota, serie, da_nota in notas
+                    ],
+                    self.usuario_evolucao,
+                    self._consultar_um("agora_servidor")[0],
+                )
+            except Exception as e:
+                print(f"Aviso: Erro ao registrar intenção da nota: {e}")
+
+        try:
+            if verificar_conflitos and produtos:
+                conflitos = self._verificar_conflitos(produtos)
+                if conflitos:
+                    raise ConflitoPrecosError(conflitos)
+
+            # Cada instrução em um único lote (com fast_executemany, se ativo)
+            self._executar_lote(
+                "atualizar_preco",
+                [
+                    (produto.preco_venda_novo, produto.preco_venda_novo, produto.codigo)
+                    for produto in produtos
+                ],
+            )
+            self._executar_lote(
+                "registrar_evolucao",
+                [
                     (
                         self.usuario_evolucao,
                         produto.codigo,
                         produto.preco_venda_novo,
                         produto.preco_venda_novo,
                         produto.codigo,
-                    ),
-                )
+                    )
+                    for produto in produtos
+                ],
+            )
 
             self.connection.commit()
-            cursor.close()
-            
-            # Registrar nota como processada no JSON
-            if codigo_fornecedor and numero_nota and serie:
+
+        except ConflitoPrecosError as e:
+            self.connection.rollback()
+            self._descartar_intencoes(intencoes_ids)
+            if self.replica:
                 try:
-                    notas_manager = NotasProcessadasManager()
-                    codigos_produtos = [produto.codigo for produto in produtos]
-                    notas_manager.adicionar_nota(
-                        codigo_fornecedor=codigo_fornecedor,
-                        numero_nota=numero_nota,
-                        serie=serie,
-                        usuario=self.usuario_evolucao,
-                        produtos_editados=len(produtos),
-                        codigos_produtos=codigos_produtos
+                    # A réplica passa a mostrar os preços atuais do servidor
+                    self.replica.registrar_precos(
+                        (conflito["codigo"], conflito["preco_min_atual"], conflito["preco_max_atual"])
+                        for conflito in e.conflitos
                     )
-                except Exception as e:
-                    print(f"Aviso: Erro ao registrar nota no JSON: {e}")
-            
-            return True
+                except Exception as erro_replica:
+                    print(f"Aviso: Erro ao atualizar réplica de produtos: {erro_replica}")
+            raise
 
         except Exception as e:
             self.connection.rollback()
+            self._descartar_intencoes(intencoes_ids)
             raise Exception(f"Erro ao atualizar preços: {str(e)}")
 
-    def verificar_nota_existe(self, numero_nota):
-        if not self.connection:
-            self.connect()
+        if self.replica:
+            try:
+                self.replica.registrar_precos(
+                    (produto.codigo, produto.preco_venda_novo) for produto in produtos
+                )
+            except Exception as e:
+                # A próxima sincronização traz os preços do servidor
+                print(f"Aviso: Erro ao atualizar réplica de produtos: {e}")
 
-        nota_formatada = str(numero_nota).zfill(6)
+        # Registrar as notas como processadas
+        if notas:
+            try:
+                notas_manager = obter_notas_manager()
+                # As intenções só são concluídas depois que as notas estiverem
+                # em disco (com gravação agrupada, a escrita é em segundo plano)
+                notas_manager.adicionar_notas(
+                    [
+                        (fornecedor, nota, serie, [produto.codigo for produto in da_nota])
+                        for fornecedor, nota, serie, da_nota in notas
+                    ],
+                    self.usuario_evolucao,
+                    ao_gravar=lambda: notas_manager.intencoes.concluir_varias(intencoes_ids),
+                )
+            except Exception as e:
+                # As intenções continuam pendentes e são reconciliadas na próxima abertura
+                print(f"Aviso: Erro ao registrar nota no JSON: {e}")
 
-        query = "SELECT COUNT(*) FROM APECENCE WHERE ab_pen = ?"
+        return True
 
+    def _descartar_intencoes(self, intencoes_ids):
+        if not intencoes_ids:
+            return
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(query, (nota_formatada,))
-            count = cursor.fetchone()[0]
-            cursor.close()
-            return count > 0
+            obter_notas_manager().intencoes.concluir_varias(intencoes_ids)
+        except Exception as e:
+            print(f"Aviso: Erro ao descartar intenção da nota: {e}")
+
+    def _trechos_reajuste(self, regra, valor, codigo_fornecedor=None, usar_custo_total=False):
+        """
+        Trechos e parâmetros de SUBCONSULTA_REAJUSTE: produtos cujo preço muda
+        pela regra, calculado no servidor com as mesmas fórmulas de Produto
+        sobre o custo da compra mais recente de cada produto (do fornecedor,
+        se informado).
+
+        No Regime Normal ficam de fora os produtos cuja compra mais recente
+        foi lançada incorretamente (Campo Aproveita ICMS), como na tela.
+
+        Returns:
+            (trechos, parametros)
+        """
+        if regra == "margem":
+            if valor >= 100:
+                raise ValueError("A margem sobre a venda deve ser menor que 100%")
+            # custo / (1 - margem / 100), como em calcular_preco_por_margem_venda
+            preco_novo, fator = "ROUND(c.Custo / ?, 2)", 1 - valor / 100
+        elif regra == "markup":
+            # custo * (1 + porcentagem / 100), como em calcular_preco_por_porcentagem_custo
+            preco_novo, fator = "ROUND(c.Custo * ?, 2)", 1 + valor / 100
+        else:
+            raise ValueError(f"Regra de reajuste inválida: {regra}")
+
+        parametros = [fator]
+        filtro_fornecedor = ""
+        if codigo_fornecedor:
+            filtro_fornecedor = "AND a.AA_PEN = ?"
+            parametros.append(str(codigo_fornecedor).strip().zfill(5))
+
+        # Sem o regime não há como saber se a conferência se aplica: não
+        # usa buscar_regime_tributario, que trata a falha como Simples Nacional
+        regime_tributario = self.regime_tributario
+        if regime_tributario is None:
+            try:
+                regime_tributario = self.carregar_perfil_empresa()[1]
+            except Exception as e:
+                raise Exception(f"Erro ao buscar regime tributário: {str(e)}")
+        filtro_icms = ""
+        if regime_tributario == 3:
+            filtro_icms = "AND NOT (c.ValorAR > 0 AND c.TipoCalculo NOT IN (2, 3))"
+
+        trechos = {
+            "preco_novo": preco_novo,
+            "custo": "a.AJ_PEN" if usar_custo_total else self.CUSTO_REPOSICAO_NOTA,
+            "filtro_fornecedor": filtro_fornecedor,
+            "filtro_icms": filtro_icms,
+        }
+        return trechos, parametros
+
+    @perfilado(categoria="banco")
+    def simular_reajuste(self, regra, valor, codigo_fornecedor=None, usar_custo_total=False, limite=None):
+        """
+        Prévia de um reajuste no servidor (aplicar_reajuste): só os produtos
+        cujo preço muda e o impacto total, sem alterar nada.
+
+        Args:
+            regra: "margem" (sobre a venda) ou "markup" (sobre o custo)
+            valor: Percentual da regra
+            codigo_fornecedor: Apenas produtos comprados deste fornecedor
+            usar_custo_total: Usa o custo total em vez do custo de reposição
+            limite: Máximo de produtos listados (os de maior variação); None = todos
+
+        Returns:
+            dict: quantidade, aumentos, reducoes, soma_atual, soma_nova,
+                variacao_percentual, maior_aumento, maior_reducao e produtos
+                (lista de {codigo, descricao, custo, preco_atual, preco_novo})
+        """
+        trechos, parametros = self._trechos_reajuste(regra, valor, codigo_fornecedor, usar_custo_total)
+
+        try:
+            totais = self._consultar_um("reajuste_totais", parametros, **trechos)
+
+            if limite is not None:
+                linhas = self._consultar("reajuste_produtos", [limite] + parametros, topo="TOP (?)", **trechos)
+            else:
+                linhas = self._consultar("reajuste_produtos", parametros, topo="", **trechos)
+            produtos = [
+                {
+                    "codigo": str(row.Codigo or "").strip(),
+                    "descricao": (row.Descricao or "").strip(),
+                    "custo": float(row.Custo or 0),
+                    "preco_atual": float(row.PrecoAtual or 0),
+                    "preco_novo": float(row.PrecoNovo or 0),
+                }
+                for row in linhas
+            ]
 
         except Exception as e:
-            raise Exception(f"Erro ao verificar nota: {str(e)}")
+            raise Exception(f"Erro ao simular reajuste: {str(e)}")
 
-    def buscar_nome_empresa(self):
+        quantidade = int(totais.Quantidade or 0)
+        aumentos = int(totais.Aumentos or 0)
+        soma_atual = float(totais.SomaAtual or 0)
+        soma_nova = float(totais.SomaNova or 0)
+        return {
+            "quantidade": quantidade,
+            "aumentos": aumentos,
+            "reducoes": quantidade - aumentos,
+            "soma_atual": round(soma_atual, 2),
+            "soma_nova": round(soma_nova, 2),
+            "variacao_percentual": round((soma_nova / soma_atual - 1) * 100, 2) if soma_atual else None,
+            "maior_aumento": round(max(float(totais.MaiorAumento or 0), 0.0), 2),
+            "maior_reducao": round(min(float(totais.MaiorReducao or 0), 0.0), 2),
+            "produtos": produtos,
+        }
+
+    @perfilado(categoria="banco")
+    def aplicar_reajuste(
+        self, regra, valor, codigo_fornecedor=None, usar_custo_total=False, quantidade_prevista=None
+    ):
+        """
+        Reajusta no servidor, em uma única transação, todos os produtos
+        cujo preço muda pela regra (mesmos parâmetros de simular_reajuste):
+        um INSERT ... SELECT na evolução de preços e um UPDATE ... FROM,
+        sem trazer os produtos para o sistema.
+
+        Args:
+            quantidade_prevista: Quantidade da prévia; se o servidor alterar
+                outra quantidade (preços ou custos mudaram desde a prévia),
+                nada é gravado
+
+        Returns:
+            Quantidade de produtos alterados
+        """
         if not self.connection:
             self.connect()
 
-        query = "SELECT BC_EMP FROM AEMPREGE"
+        trechos, parametros = self._trechos_reajuste(regra, valor, codigo_fornecedor, usar_custo_total)
 
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(query)
-            result = cursor.fetchone()
-            cursor.close()
+            # A evolução primeiro: depois do UPDATE os produtos já não mudariam
+            registrados = self._executar("reajuste_evolucao", [self.usuario_evolucao] + parametros, **trechos)
+            alterados = self._executar("reajuste_atualizar", parametros, **trechos)
+
+            previstos = registrados if quantidade_prevista is None else quantidade_prevista
+            if alterados != registrados or alterados != previstos:
+                raise ValueError(
+                    f"{alterados} produto(s) alterado(s) e {previstos} previsto(s): "
+                    "os preços mudaram desde a simulação, simule novamente"
+                )
 
-            if result and result[0]:
-                return result[0].strip()
+            self.connection.commit()
+
+        except Exception as e:
+            self.connection.rollback()
+            raise Exception(f"Erro ao aplicar reajuste: {str(e)}")
+
+        if self.replica and alterados:
+            try:
+                # Só as faixas alteradas voltam do servidor; em segundo plano
+                # quando a sincronização periódica está ativa
+                if not self.replica.solicitar_sincronizacao():
+                    self.replica.sincronizar(self.connection)
+            except Exception as e:
+                print(f"Aviso: Erro ao atualizar réplica de produtos: {e}")
+
+        return alterados
+
+    @perfilado(categoria="banco")
+    def reconciliar_notas_pendentes(self):
+        """
+        Conclui as intenções deixadas por uma gravação interrompida.
+
+        Confere, em uma única consulta ao GE_VARIACAO_PRECOSVENDA, se os
+        preços de cada intenção foram gravados pelo mesmo usuário a partir da
+        data/hora do servidor registrada na intenção: se sim, a nota é
+        registrada como processada; se não (a transação foi desfeita), a
+        intenção é descartada. Intenções sem produtos não podem ser
+        conferidas e também são descartadas.
+
+        Returns:
+            Quantidade de notas registradas na reconciliação
+        """
+        notas_manager = obter_notas_manager()
+        pendentes = []
+        for intencao in notas_manager.intencoes.pendentes():
+            if intencao.get("produtos"):
+                pendentes.append(intencao)
             else:
-                return "Empresa"
+                notas_manager.intencoes.concluir(intencao["id"])
+        if not pendentes:
+            return 0
+
+        data_inicial = min(intencao["data"] for intencao in pendentes)
+        codigos = sorted({codigo for intencao in pendentes for codigo, _ in intencao["produtos"]})
 
+        # codigo -> [("AAAA-MM-DD HH:MM:SS", usuario, preco)] das alterações desde a intenção mais antiga
+        variacoes = {}
+        try:
+            # Limite de 2100 parâmetros por instrução do SQL Server
+            for inicio in range(0, len(codigos), 2000):
+                for row in self._consultar(
+                    "variacoes_desde", (data_inicial,), lista=codigos[inicio:inicio + 2000]
+                ):
+                    variacoes.setdefault(str(row.Produto or "").strip(), []).append(
+                        (
+                            f"{row.Data or ''} {row.Hora or ''}",
+                            str(row.Usuario or "").strip(),
+                            float(row.Preco or 0),
+                        )
+                    )
+        except Exception as e:
+            raise Exception(f"Erro ao reconciliar notas pendentes: {str(e)}")
+
+        def gravado(intencao, codigo, preco):
+            # Intenções antigas, sem a hora do servidor, conferem só a data
+            inicio = intencao.get("momento") or intencao["data"]
+            return any(
+                momento >= inicio and usuario == intencao["usuario"] and abs(valor - preco) < 0.005
+                for momento, usuario, valor in variacoes.get(str(codigo).strip(), [])
+            )
+
+        registradas = 0
+        for intencao in pendentes:
+            if all(gravado(intencao, codigo, preco) for codigo, preco in intencao["produtos"]):
+                notas_manager.adicionar_nota(
+                    codigo_fornecedor=intencao["fornecedor"],
+                    numero_nota=intencao["nota"],
+                    serie=intencao["serie"],
+                    usuario=intencao["usuario"],
+                    produtos_editados=len(intencao["produtos"]),
+                    codigos_produtos=[codigo for codigo, _ in intencao["produtos"]],
+                    ao_gravar=lambda intencao_id=intencao["id"]: notas_manager.intencoes.concluir(intencao_id),
+                )
+                registradas += 1
+            else:
+                notas_manager.intencoes.concluir(intencao["id"])
+
+        return registradas
+
+    def verificar_nota_existe(self, numero_nota):
+        nota_formatada = str(numero_nota).zfill(6)
+
+        try:
+            count = self._consultar_um("nota_existe", (nota_formatada,))[0]
+            return count > 0
+
+        except Exception as e:
+            raise Exception(f"Erro ao verificar nota: {str(e)}")
+
+    def carregar_perfil_empresa(self):
+        """Busca nome e regime tributário da empresa em uma única consulta.
+        Retorna:
+            tuple: (nome da empresa, código do regime tributário)
+        """
+        result = self._consultar_um("perfil_empresa")
+
+        nome = (result[0] or "").strip() if result else ""
+        regime = result[1] if result else None
+
+        self.nome_empresa = nome or "Empresa"
+        self.regime_tributario = int(regime) if regime is not None else 0
+        return self.nome_empresa, self.regime_tributario
+
+    def buscar_nome_empresa(self):
+        if self.nome_empresa is not None:
+            return self.nome_empresa
+
+        try:
+            return self.carregar_perfil_empresa()[0]
         except Exception as e:
             print(f"Aviso: Não foi possível buscar nome da empresa: {str(e)}")
             return "Empresa"
@@ -237,120 +1035,93 @@ class Database:
         Retorna:
             int: Código do regime tributário (3 = Regime Normal, outros = Simples Nacional)
         """
-        if not self.connection:
-            self.connect()
-
-        query = "SELECT CODRGT_EMP FROM AEMPREGE"
+        if self.regime_tributario is not None:
+            return self.regime_tributario
 
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(query)
-            result = cursor.fetchone()
-            cursor.close()
-
-            if result and result[0] is not None:
-                return int(result[0])
-            else:
-                return 0
-
+            return self.carregar_perfil_empresa()[1]
         except Exception as e:
             print(f"Aviso: Não foi possível buscar regime tributário: {str(e)}")
             return 0
 
-    def buscar_informacoes_fornecedor(self, codigo_fornecedor):
-        if not self.connection:
-            self.connect()
+    def carregar_fornecedores(self):
+        """Carrega todos os fornecedores de uma vez para o cache da sessão.
+        Retorna:
+            int: Quantidade de fornecedores carregados
+        """
+        try:
+            for result in self._consultar("fornecedores"):
+                fornecedor = self._montar_fornecedor(result)
+                self._fornecedores[fornecedor["codigo"].zfill(5)] = fornecedor
+            return len(self._fornecedores)
+
+        except Exception as e:
+            raise Exception(f"Erro ao carregar fornecedores: {str(e)}")
 
+    def _montar_fornecedor(self, result):
+        return {
+            "codigo": (result.Codigo or "").strip(),
+            "nome": (result.Nome or "").strip(),
+            "cnpj": (result.CNPJ or "").strip(),
+            "estado": (result.Estado or "").strip(),
+            "classificacao": (result.Classificacao or "").strip(),
+        }
+
+    def buscar_informacoes_fornecedor(self, codigo_fornecedor):
         fornecedor_formatado = str(codigo_fornecedor).zfill(5)
 
-        query = """
-            SELECT
-                codigo_for as Codigo,
-                nome_for as Nome,
-                cgccpf_for as CNPJ,
-                estado_for as Estado,
-                classi_for as Classificacao
-            FROM AFORNEGE
-            WHERE codigo_for = ?
-        """
+        if fornecedor_formatado in self._fornecedores:
+            return self._fornecedores[fornecedor_formatado]
 
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(query, (fornecedor_formatado,))
-            result = cursor.fetchone()
-            cursor.close()
+            result = self._consultar_um("fornecedor", (fornecedor_formatado,))
 
             if result:
-                return {
-                    "codigo": (result.Codigo or "").strip(),
-                    "nome": (result.Nome or "").strip(),
-                    "cnpj": (result.CNPJ or "").strip(),
-                    "estado": (result.Estado or "").strip(),
-                    "classificacao": (result.Classificacao or "").strip(),
-                }
+                fornecedor = self._montar_fornecedor(result)
+                self._fornecedores[fornecedor_formatado] = fornecedor
+                return fornecedor
             else:
                 return None
 
         except Exception as e:
             raise Exception(f"Erro ao buscar fornecedor: {str(e)}")
 
-    def buscar_todas_notas(self, limite=1000):
-        if not self.connection:
-            self.connect()
-
-        query = f"""
-            SELECT TOP {limite}
-                AD_NEN AS EMISSAO, 
-                AB_NEN AS NOTA, 
-                AC_NEN AS SERIE, 
-                AA_NEN AS CODIGO, 
-                AB_TIP AS TIPOENTRADA, 
-                CGCCPF_FOR AS CNPJ, 
-                NOME_FOR AS FORNECEDOR, 
-                AE_NEN AS ENTRADA, 
-                AF_NEN AS VALOR, 
-                CASE BE_NEN
-                    WHEN '1' THEN 'Nota Digitada'
-                    WHEN '2' THEN 'Nota Com Erro de Cálculo'
-                    WHEN '3' THEN 'Nota Cálculo Ok'
-                    WHEN '4' THEN 'Nota Impressa Ok'
-                    WHEN '5' THEN 'Nota Com Atualização Iniciada'
-                    WHEN '6' THEN 'Nota Atualizada Ok'
-                    WHEN '7' THEN 'Nota Emitida Pelo Sistema'
-                    WHEN '9' THEN 'Nota Cancelada'
-                END AS STATUS,
-                CASE BR_NEN 
-                    WHEN 'P' THEN 'Próprio'
-                    WHEN 'T' THEN 'Terceiros'
-                END AS EMITENTE, 
-                CHVNFE_NEN AS CHACENFE 
-            FROM ANOTENCE 
-            LEFT JOIN AFORNEGE ON CODIGO_FOR = AA_NEN 
-            INNER JOIN ATIPNFCE ON AA_TIP = BD_NEN
-            WHERE AA_TIP = '01'
-            ORDER BY AD_NEN DESC, AB_NEN DESC
+    @perfilado(categoria="banco")
+    def buscar_notas_periodo(self, data_inicio, data_fim):
+        """Lista as notas de entrada com data de entrada no período (inclusive).
+        Retorna:
+            list: Tuplas (codigo_fornecedor, numero_nota, serie) em ordem de entrada
         """
+        try:
+            notas = [
+                ((row.CODIGO or "").strip(), (row.NOTA or "").strip(), (row.SERIE or "").strip())
+                for row in self._consultar("notas_periodo", (data_inicio, data_fim))
+            ]
+            return notas
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar notas do período: {str(e)}")
 
+    @perfilado(categoria="banco")
+    def buscar_todas_notas(self, limite=1000):
         try:
-            # Carregar notas processadas uma única vez
-            notas_manager = NotasProcessadasManager()
+            # Instância compartilhada: só relê o arquivo se ele mudou
+            notas_manager = obter_notas_manager()
+            
+            rows = self._consultar("todas_notas", (int(limite),))
             
-            cursor = self.connection.cursor()
-            cursor.execute(query)
+            identificacoes = [
+                ((row.CODIGO or "").strip(), (row.NOTA or "").strip(), (row.SERIE or "").strip())
+                for row in rows
+            ]
+            
+            # Verifica todas as notas de uma vez (uma consulta no backend sqlite)
+            processadas = notas_manager.verificar_notas(identificacoes)
             
             notas = []
-            for row in cursor.fetchall():
-                codigo_fornecedor = (row.CODIGO or "").strip()
-                numero_nota = (row.NOTA or "").strip()
-                serie = (row.SERIE or "").strip()
-                
-                # Verificar se nota foi processada (operação O(1) no dicionário)
-                processada = notas_manager.verificar_nota(
-                    codigo_fornecedor, 
-                    numero_nota, 
-                    serie
-                )
-                
+            for row, (codigo_fornecedor, numero_nota, serie), processada in zip(
+                rows, identificacoes, processadas
+            ):
                 nota = {
                     "emissao": row.EMISSAO,
                     "nota": numero_nota,
@@ -368,7 +1139,6 @@ class Database:
                 }
                 notas.append(nota)
             
-            cursor.close()
             return notas
 
         except Exception as e:
@@ -2,25 +2,53 @@ import os
 import sys
 from datetime import datetime
 import configparser
-from reportlab.lib.pagesizes import mm
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import barcode
-from barcode.writer import ImageWriter
 from io import BytesIO
+from typing import Optional
+from reportlab.lib.units import mm
+from controller.etiqueta_template import TemplateEtiqueta
+from controller.historico_etiquetas import HistoricoEtiquetasManager
+from controller.perfil import perfilado
+from controller.etiqueta_termica import (
+    LayoutTermico,
+    enviar_para_destino,
+    gerar_epl,
+    gerar_zpl,
+)
 
 
 class EtiquetaGenerator:
     DEFAULT_ETIQUETA_WIDTH_MM = 100.0
     DEFAULT_ETIQUETA_HEIGHT_MM = 25.0
+    DEFAULT_DPI = 203
+    MODOS = ("pdf", "zpl", "epl")
+    MAX_CACHE_CODIGOS_BARRAS = 512
     
-    def __init__(self, database):
+    def __init__(self, database, config_file: Optional[str] = None):
+        """
+        Args:
+            database: Database usado para buscar os produtos
+            config_file: Arquivo de configuração (padrão: config.ini da pasta do programa)
+        """
         self.db = database
+        self.config_file = config_file
         self.etiqueta_width_mm, self.etiqueta_height_mm, self.offset_y_mm = self._carregar_config_etiqueta()
         self.etiqueta_width = self.etiqueta_width_mm * mm
         self.etiqueta_height = self.etiqueta_height_mm * mm
+        self.modo, self.dpi, self.impressora = self._carregar_config_impressora()
+        self.folha = self._carregar_config_folha()
+        self.template = TemplateEtiqueta(self.etiqueta_width_mm, self.etiqueta_height_mm, self.offset_y_mm)
+        self._cache_codigos_barras = {}
+        self.historico = self._criar_historico()
+
+    def _diretorio_base(self) -> str:
+        if getattr(sys, 'frozen', False):
+            return os.path.dirname(sys.executable)
+        return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def _ler_config(self) -> configparser.ConfigParser:
+        config = configparser.ConfigParser()
+        config.read(self.config_file or os.path.join(self._diretorio_base(), "config.ini"), encoding="utf-8")
+        return config
 
     def _parse_float(self, value, fallback: float) -> float:
         try:
@@ -34,15 +62,7 @@ class EtiquetaGenerator:
         offset_y_mm = 0.0
 
         try:
-            config = configparser.ConfigParser()
-
-            if getattr(sys, 'frozen', False):
-                base_dir = os.path.dirname(sys.executable)
-            else:
-                base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-            config_path = os.path.join(base_dir, "config.ini")
-            config.read(config_path, encoding="utf-8")
+            config = self._ler_config()
 
             width_mm = self._parse_float(
                 config.get("Etiqueta", "width_mm", fallback=str(width_mm)),
@@ -65,7 +85,118 @@ class EtiquetaGenerator:
             height_mm = self.DEFAULT_ETIQUETA_HEIGHT_MM
 
         return width_mm, height_mm, offset_y_mm
+
+    def _carregar_config_impressora(self) -> tuple[str, int, str]:
+        modo = "pdf"
+        dpi = self.DEFAULT_DPI
+        impressora = ""
+
+        try:
+            config = self._ler_config()
+            modo = config.get("Etiqueta", "modo", fallback=modo).strip().lower()
+            dpi = int(self._parse_float(config.get("Etiqueta", "dpi", fallback=str(dpi)), dpi))
+            impressora = config.get("Etiqueta", "impressora", fallback=impressora).strip()
+        except Exception:
+            pass
+
+        if modo not in self.MODOS:
+            modo = "pdf"
+
+        return modo, dpi, impressora
+
+    def _carregar_config_folha(self) -> dict | None:
+        """
+        Lê a seção [Folha] do config.ini (folhas A4/Carta com várias etiquetas).
+        Retorna None quando desativada, mantendo uma etiqueta por página.
+        """
+        try:
+            config = self._ler_config()
+            if config.get("Folha", "ativo", fallback="0").strip() != "1":
+                return None
+
+            def valor(chave, padrao):
+                return self._parse_float(config.get("Folha", chave, fallback=str(padrao)), padrao)
+
+            folha = {
+                "largura_mm": valor("largura_mm", 210.0),
+                "altura_mm": valor("altura_mm", 297.0),
+                "margem_esquerda_mm": valor("margem_esquerda_mm", 0.0),
+                "margem_topo_mm": valor("margem_topo_mm", 0.0),
+                "espaco_horizontal_mm": valor("espaco_horizontal_mm", 0.0),
+                "espaco_vertical_mm": valor("espaco_vertical_mm", 0.0),
+                "colunas": int(valor("colunas", 0)),
+                "linhas": int(valor("linhas", 0)),
+            }
+        except Exception:
+            return None
+
+        # Colunas/linhas em 0: cabe quantas etiquetas couberem na folha
+        if folha["colunas"] <= 0:
+            util = folha["largura_mm"] - folha["margem_esquerda_mm"] + folha["espaco_horizontal_mm"]
+            folha["colunas"] = int(util // (self.etiqueta_width_mm + folha["espaco_horizontal_mm"]))
+        if folha["linhas"] <= 0:
+            util = folha["altura_mm"] - folha["margem_topo_mm"] + folha["espaco_vertical_mm"]
+            folha["linhas"] = int(util // (self.etiqueta_height_mm + folha["espaco_vertical_mm"]))
+
+        if folha["colunas"] <= 0 or folha["linhas"] <= 0:
+            print("Aviso: Etiqueta não cabe na folha configurada, usando uma etiqueta por página")
+            return None
+
+        return folha
     
+    def _criar_historico(self) -> HistoricoEtiquetasManager:
+        max_jobs = 200
+        dias = 90
+
+        try:
+            config = self._ler_config()
+            max_jobs = int(self._parse_float(config.get("Etiqueta", "historico_max_jobs", fallback=str(max_jobs)), max_jobs))
+            dias = int(self._parse_float(config.get("Etiqueta", "historico_dias", fallback=str(dias)), dias))
+        except Exception:
+            pass
+
+        diretorio = os.path.join(self._diretorio_base(), "etiquetas", "historico")
+        return HistoricoEtiquetasManager(diretorio, max_jobs=max_jobs, dias=dias)
+
+    def _resolver_itens(self, produtos):
+        """Associa cada produto ao seu código de barras. Itens vindos do
+        histórico já trazem o código resolvido e não consultam o banco; os
+        demais são lidos de uma vez (réplica local ou uma consulta por lote)."""
+        pendentes = [p.codigo for p in produtos if getattr(p, "codigo_barras", None) is None]
+        cadastro = {}
+        if pendentes:
+            try:
+                cadastro = self.db.cadastro_produtos(pendentes)
+            except Exception as e:
+                print(f"Aviso: Erro ao buscar códigos de barras: {e}")
+
+        itens = []
+        for produto in produtos:
+            codigo_barras = getattr(produto, "codigo_barras", None)
+            if codigo_barras is None:
+                codigo = str(produto.codigo).strip()
+                registro = cadastro.get(codigo)
+                if registro is not None:
+                    codigo_barras = registro["codigo_barras"] or codigo
+                else:
+                    codigo_barras = self._obter_codigo_barras(produto.codigo)
+            itens.append((produto, codigo_barras))
+        return itens
+
+    def _registrar_job(self, itens, formato, arquivo, origem=None, arquivo_gerado=False):
+        try:
+            return self.historico.registrar_job(
+                itens,
+                formato=formato,
+                layout=self.template.versao,
+                arquivo=arquivo,
+                origem=origem,
+                arquivo_gerado=arquivo_gerado,
+            )
+        except Exception as e:
+            print(f"Aviso: Erro ao registrar histórico de etiquetas: {e}")
+            return None
+
     def _obter_codigo_barras(self, codigo_produto):
         if not self.db.connection:
             self.db.connect()
@@ -98,6 +229,11 @@ class EtiquetaGenerator:
             return None
         
         try:
+            # python-barcode e Pillow só são carregados na primeira etiqueta em PDF
+            import barcode
+            from barcode.writer import ImageWriter
+            from reportlab.lib.utils import ImageReader
+
             if len(codigo) == 13 or len(codigo) == 12:
                 ean = barcode.get('ean13', codigo, writer=ImageWriter())
             elif len(codigo) == 8 or len(codigo) == 7:
@@ -122,79 +258,199 @@ class EtiquetaGenerator:
             print(f"Erro ao gerar código de barras para {codigo}: {e}")
             return None
     
-    def _desenhar_etiqueta(self, c, produto, y_position, codigo_barras_ean):
-        margin_left = -3 * mm
-        margin_top = y_position
-        y_shift = self.offset_y_mm * mm
-        
-        c.setFont("Helvetica-Bold", 14)
-        descricao = produto.descricao[:60]
+    def _obter_imagem_codigo_barras(self, codigo):
+        # Produtos repetidos no mesmo job reaproveitam a imagem já renderizada
+        if codigo in self._cache_codigos_barras:
+            return self._cache_codigos_barras[codigo]
         
-        desc_width = c.stringWidth(descricao, "Helvetica-Bold", 14)
-        x_desc = margin_left + (self.etiqueta_width - desc_width) / 2
-        c.drawString(x_desc, margin_top + 20*mm - y_shift, descricao)
+        if len(self._cache_codigos_barras) >= self.MAX_CACHE_CODIGOS_BARRAS:
+            self._cache_codigos_barras.clear()
         
+        imagem = self._gerar_codigo_barras_imagem(codigo)
+        self._cache_codigos_barras[codigo] = imagem
+        return imagem
+    
+    def _desenhar_etiqueta(self, c, produto, y_position, codigo_barras_ean):
+        barcode_img = None
         if codigo_barras_ean:
-            barcode_img = self._gerar_codigo_barras_imagem(codigo_barras_ean)
-            if barcode_img:
-                try:
-                    c.drawImage(
-                        barcode_img,
-                        -13*mm,
-                        margin_top + 1*mm - y_shift,
-                        width=63*mm,
-                        height=17*mm,
-                        preserveAspectRatio=True,
-                        mask='auto'
-                    )
-                except Exception as e:
-                    print(f"Erro ao desenhar código de barras: {e}")
-        
-        preco_texto = f"R$ {produto.preco_venda_novo:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        c.setFont("Helvetica-Bold", 28)
-        
-        preco_width = c.stringWidth(preco_texto, "Helvetica-Bold", 28)
-        x_preco = margin_left + 55*mm + (40*mm - preco_width) / 2
-        c.drawString(x_preco, margin_top + 7*mm - y_shift, preco_texto)
-        
-        c.setFont("Helvetica", 11)
-        c.drawString(margin_left + 88*mm, margin_top + 2*mm - y_shift, "UN")
-
-    def gerar_pdf(self, produtos, output_path=None):
+            barcode_img = self._obter_imagem_codigo_barras(codigo_barras_ean)
+        
+        self.template.desenhar(c, produto, y_position, barcode_img)
+
+    @perfilado(categoria="etiquetas")
+    def gerar_pdf(self, produtos, output_path=None, origem=None):
         if not produtos:
             raise ValueError("Nenhum produto fornecido para gerar etiquetas")
         
-        if not output_path:
-            data = datetime.now().strftime("%d%m%Y")
-            
-            if getattr(sys, 'frozen', False):
-                base_dir = os.path.dirname(sys.executable)
-            else:
-                base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            
-            output_dir = os.path.join(base_dir, "etiquetas")
-            os.makedirs(output_dir, exist_ok=True)
+        arquivo_gerado = not output_path
+        if arquivo_gerado:
+            output_path = self._gerar_caminho_saida(produtos, "pdf")
+        
+        itens = self._resolver_itens(produtos)
+        
+        if self.folha:
+            self._gerar_pdf_folha(itens, output_path)
+        else:
+            from reportlab.pdfgen import canvas
+
+            c = canvas.Canvas(output_path, pagesize=(self.etiqueta_width, self.etiqueta_height))
             
-            if len(produtos) == 1:
-                produto = produtos[0]
-                descricao_limpa = "".join(c for c in produto.descricao if c.isalnum() or c in (' ', '-', '_')).strip()
-                descricao_limpa = descricao_limpa.replace(' ', '_')[:50]
-                filename = f"{descricao_limpa}_{produto.codigo}_{data}.pdf"
-            else:
-                filename = f"etiquetas_{data}.pdf"
+            for i, (produto, codigo_barras) in enumerate(itens):
+                self._desenhar_etiqueta(c, produto, 0, codigo_barras)
+                
+                if i < len(itens) - 1:
+                    c.showPage()
             
-            output_path = os.path.join(output_dir, filename)
+            c.save()
+        
+        self._registrar_job(itens, "pdf", output_path, origem, arquivo_gerado)
         
-        c = canvas.Canvas(output_path, pagesize=(self.etiqueta_width, self.etiqueta_height))
+        return output_path
+
+    def _gerar_pdf_folha(self, itens, output_path):
+        folha = self.folha
+        posicoes = self._posicoes_folha()
+        
+        from reportlab.pdfgen import canvas
+
+        c = canvas.Canvas(output_path, pagesize=(folha["largura_mm"] * mm, folha["altura_mm"] * mm))
         
-        for i, produto in enumerate(produtos):
-            codigo_barras = self._obter_codigo_barras(produto.codigo)
+        for i, (produto, codigo_barras) in enumerate(itens):
+            slot = i % len(posicoes)
+            if i > 0 and slot == 0:
+                c.showPage()
             
-            self._desenhar_etiqueta(c, produto, 0, codigo_barras)
+            x, y = posicoes[slot]
             
-            if i < len(produtos) - 1:
-                c.showPage()
+            # Cada etiqueta é desenhada no seu próprio sistema de coordenadas e
+            # recortada no tamanho da etiqueta para não invadir as vizinhas
+            c.saveState()
+            c.translate(x, y)
+            area = c.beginPath()
+            area.rect(0, 0, self.etiqueta_width, self.etiqueta_height)
+            c.clipPath(area, stroke=0, fill=0)
+            self._desenhar_etiqueta(c, produto, 0, codigo_barras)
+            c.restoreState()
         
         c.save()
+
+    def _posicoes_folha(self) -> list[tuple[float, float]]:
+        """Posições (canto inferior esquerdo, em pontos) das etiquetas na folha,
+        da esquerda para a direita e de cima para baixo."""
+        folha = self.folha
+        posicoes = []
         
+        for linha in range(folha["linhas"]):
+            topo_mm = folha["margem_topo_mm"] + linha * (self.etiqueta_height_mm + folha["espaco_vertical_mm"])
+            y = (folha["altura_mm"] - topo_mm - self.etiqueta_height_mm) * mm
+            for coluna in range(folha["colunas"]):
+                x_mm = folha["margem_esquerda_mm"] + coluna * (self.etiqueta_width_mm + folha["espaco_horizontal_mm"])
+                posicoes.append((x_mm * mm, y))
+        
+        return posicoes
+
+    def _gerar_caminho_saida(self, produtos, extensao):
+        agora = datetime.now()
+        data = agora.strftime("%d%m%Y")
+        hora = agora.strftime("%H%M%S")
+
+        output_dir = os.path.join(self._diretorio_base(), "etiquetas")
+        os.makedirs(output_dir, exist_ok=True)
+
+        if len(produtos) == 1:
+            produto = produtos[0]
+            descricao_limpa = "".join(c for c in produto.descricao if c.isalnum() or c in (' ', '-', '_')).strip()
+            descricao_limpa = descricao_limpa.replace(' ', '_')[:50]
+            nome_base = f"{descricao_limpa}_{produto.codigo}_{data}_{hora}"
+        else:
+            nome_base = f"etiquetas_{data}_{hora}"
+
+        # Nunca sobrescreve um job anterior gerado no mesmo segundo
+        output_path = os.path.join(output_dir, f"{nome_base}.{extensao}")
+        contador = 2
+        while os.path.exists(output_path):
+            output_path = os.path.join(output_dir, f"{nome_base}_{contador}.{extensao}")
+            contador += 1
+
         return output_path
+
+    @perfilado(categoria="etiquetas")
+    def gerar_comandos(self, produtos, formato=None) -> bytes:
+        """Gera os comandos nativos (ZPL ou EPL) da impressora térmica."""
+        if not produtos:
+            raise ValueError("Nenhum produto fornecido para gerar etiquetas")
+
+        return self._gerar_comandos_itens(self._resolver_itens(produtos), formato)
+
+    def _gerar_comandos_itens(self, itens, formato=None) -> bytes:
+        formato = (formato or self.modo).lower()
+        if formato not in ("zpl", "epl"):
+            raise ValueError(f"Formato de impressora térmica inválido: {formato}")
+
+        layout = LayoutTermico(
+            self.etiqueta_width_mm,
+            self.etiqueta_height_mm,
+            self.offset_y_mm,
+            self.dpi,
+        )
+
+        if formato == "zpl":
+            return gerar_zpl(itens, layout)
+        return gerar_epl(itens, layout)
+
+    def gerar_termica(self, produtos, formato=None, destino=None, origem=None) -> str:
+        """
+        Gera as etiquetas em ZPL/EPL e envia para a impressora configurada em
+        [Etiqueta] impressora (rede ou dispositivo). Sem impressora configurada,
+        grava o arquivo na pasta etiquetas. Retorna o destino utilizado.
+        """
+        if not produtos:
+            raise ValueError("Nenhum produto fornecido para gerar etiquetas")
+
+        formato = (formato or self.modo).lower()
+        itens = self._resolver_itens(produtos)
+        dados = self._gerar_comandos_itens(itens, formato)
+
+        arquivo_gerado = not (destino or self.impressora)
+        destino = destino or self.impressora or self._gerar_caminho_saida(produtos, formato)
+        enviar_para_destino(dados, destino)
+
+        self._registrar_job(itens, formato, destino, origem, arquivo_gerado)
+
+        return destino
+
+    def gerar(self, produtos, formato=None):
+        """Gera as etiquetas no modo configurado (pdf, zpl ou epl)."""
+        formato = (formato or self.modo).lower()
+        if formato == "pdf":
+            return self.gerar_pdf(produtos)
+        return self.gerar_termica(produtos, formato)
+
+    def reimprimir(self, job_ids, formato=None, destino=None, aceitar_layout_diferente=False):
+        """
+        Reimprime um ou mais jobs do histórico (juntando-os na ordem informada),
+        no formato desejado, sem consultar o banco de dados.
+
+        Args:
+            aceitar_layout_diferente: Reimprime com o layout atual mesmo os jobs
+                gerados com outra versão do layout
+
+        Returns:
+            Caminho do arquivo ou destino gerado
+
+        Raises:
+            LayoutEtiquetaAlteradoError: Layout alterado desde a geração de
+                algum job (sem aceitar_layout_diferente)
+        """
+        if isinstance(job_ids, str):
+            job_ids = [job_ids]
+
+        if not aceitar_layout_diferente:
+            self.historico.verificar_layout(job_ids, self.template.versao)
+
+        itens = self.historico.obter_itens(job_ids)
+        formato = (formato or self.modo).lower()
+
+        if formato == "pdf":
+            return self.gerar_pdf(itens, output_path=destino, origem=job_ids)
+        return self.gerar_termica(itens, formato, destino=destino, origem=job_ids)
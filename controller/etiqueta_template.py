@@ -0,0 +1,109 @@
+import hashlib
+from functools import lru_cache
+from reportlab.lib.units import mm
+
+
+@lru_cache(maxsize=8192)
+def formatar_preco(valor: float) -> str:
+    """Formata o valor no padrão brasileiro (R$ 1.234,56)."""
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+@lru_cache(maxsize=8192)
+def largura_texto(texto: str, fonte: str, tamanho: float) -> float:
+    from reportlab.pdfbase import pdfmetrics
+
+    return pdfmetrics.stringWidth(texto, fonte, tamanho)
+
+
+class TemplateEtiqueta:
+    """
+    Layout da etiqueta compilado a partir da seção [Etiqueta] do config.ini.
+
+    Posições, fontes e deslocamentos são calculados uma única vez; por
+    etiqueta restam apenas a formatação do preço e a medição dos textos,
+    ambas memorizadas.
+    """
+
+    FONTE_DESCRICAO = ("Helvetica-Bold", 14)
+    FONTE_PRECO = ("Helvetica-Bold", 28)
+    FONTE_UNIDADE = ("Helvetica", 11)
+    TAMANHO_MAX_DESCRICAO = 60
+
+    def __init__(self, width_mm: float, height_mm: float, offset_y_mm: float = 0.0):
+        self.width_mm = width_mm
+        self.height_mm = height_mm
+        self.offset_y_mm = offset_y_mm
+
+        largura = width_mm * mm
+        margem_esquerda = -3 * mm
+        y_shift = offset_y_mm * mm
+
+        self.largura = largura
+        self.altura = height_mm * mm
+
+        self.x_centro_descricao = margem_esquerda + largura / 2
+        self.y_descricao = 20 * mm - y_shift
+
+        self.x_codigo_barras = -13 * mm
+        self.y_codigo_barras = 1 * mm - y_shift
+        self.largura_codigo_barras = 63 * mm
+        self.altura_codigo_barras = 17 * mm
+
+        # Preço centralizado na faixa de 40mm que começa em 55mm
+        self.x_centro_preco = margem_esquerda + 55 * mm + 20 * mm
+        self.y_preco = 7 * mm - y_shift
+
+        self.x_unidade = margem_esquerda + 88 * mm
+        self.y_unidade = 2 * mm - y_shift
+
+        self.versao = self._calcular_versao()
+
+    def _calcular_versao(self) -> str:
+        """Identificador curto do layout, muda quando o config ou as fontes mudam."""
+        assinatura = repr((
+            self.width_mm,
+            self.height_mm,
+            self.offset_y_mm,
+            self.FONTE_DESCRICAO,
+            self.FONTE_PRECO,
+            self.FONTE_UNIDADE,
+            self.TAMANHO_MAX_DESCRICAO,
+        ))
+        return hashlib.sha1(assinatura.encode("utf-8")).hexdigest()[:10]
+
+    def posicionar_descricao(self, descricao: str) -> tuple[str, float]:
+        texto = descricao[:self.TAMANHO_MAX_DESCRICAO]
+        largura = largura_texto(texto, *self.FONTE_DESCRICAO)
+        return texto, self.x_centro_descricao - largura / 2
+
+    def posicionar_preco(self, valor: float) -> tuple[str, float]:
+        texto = formatar_preco(valor)
+        largura = largura_texto(texto, *self.FONTE_PRECO)
+        return texto, self.x_centro_preco - largura / 2
+
+    def desenhar(self, c, produto, y_position, barcode_img=None) -> None:
+        descricao, x_descricao = self.posicionar_descricao(produto.descricao)
+        c.setFont(*self.FONTE_DESCRICAO)
+        c.drawString(x_descricao, y_position + self.y_descricao, descricao)
+
+        if barcode_img:
+            try:
+                c.drawImage(
+                    barcode_img,
+                    self.x_codigo_barras,
+                    y_position + self.y_codigo_barras,
+                    width=self.largura_codigo_barras,
+                    height=self.altura_codigo_barras,
+                    preserveAspectRatio=True,
+                    mask='auto'
+                )
+            except Exception as e:
+                print(f"Erro ao desenhar código de barras: {e}")
+
+        preco_texto, x_preco = self.posicionar_preco(produto.preco_venda_novo)
+        c.setFont(*self.FONTE_PRECO)
+        c.drawString(x_preco, y_position + self.y_preco, preco_texto)
+
+        c.setFont(*self.FONTE_UNIDADE)
+        c.drawString(self.x_unidade, y_position + self.y_unidade, "UN")
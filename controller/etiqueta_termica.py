@@ -0,0 +1,255 @@
+import os
+import socket
+from controller.etiqueta_template import formatar_preco
+
+
+MM_POR_POLEGADA = 25.4
+PORTA_RAW_PADRAO = 9100
+
+# Largura aproximada (em dots, incluindo espaçamento) e altura das fontes
+# residentes da EPL2, por resolução da impressora.
+FONTES_EPL = {
+    203: {1: (10, 12), 2: (12, 16), 3: (14, 20), 4: (16, 24), 5: (36, 48)},
+    300: {1: (14, 20), 2: (18, 28), 3: (22, 36), 4: (26, 44), 5: (60, 80)},
+}
+
+# Formatos armazenados na memória da impressora (ZPL ^DF / ^XF), um por
+# simbologia, para que cada etiqueta envie apenas os campos variáveis.
+FORMATOS_ZPL = {
+    "ean13": "R:AJP13.ZPL",
+    "ean8": "R:AJP8.ZPL",
+    "code128": "R:AJP128.ZPL",
+    None: "R:AJPSEM.ZPL",
+}
+
+
+def tipo_codigo_barras(codigo):
+    """
+    Retorna a simbologia usada para o código nas saídas ZPL/EPL ('ean13',
+    'ean8', 'code128') ou None. Só códigos numéricos usam EAN, já que a
+    impressora rejeita outros; a etiqueta em PDF mantém a escolha pelo tamanho.
+    """
+    if not codigo or len(codigo) < 3:
+        return None
+    if codigo.isdigit() and len(codigo) in (12, 13):
+        return "ean13"
+    if codigo.isdigit() and len(codigo) in (7, 8):
+        return "ean8"
+    return "code128"
+
+
+class LayoutTermico:
+    """
+    Converte o layout da etiqueta PDF (milímetros, origem no canto inferior
+    esquerdo) para coordenadas em dots com origem no canto superior esquerdo,
+    como esperado por ZPL e EPL.
+    """
+
+    def __init__(self, width_mm, height_mm, offset_y_mm=0.0, dpi=203):
+        self.width_mm = width_mm
+        self.height_mm = height_mm
+        self.offset_y_mm = offset_y_mm
+        self.dpi = 300 if dpi >= 300 else 203
+
+    def dots(self, valor_mm):
+        return int(round(valor_mm * self.dpi / MM_POR_POLEGADA))
+
+    def pontos(self, tamanho_pt):
+        return int(round(tamanho_pt * self.dpi / 72.0))
+
+    @property
+    def largura(self):
+        return self.dots(self.width_mm)
+
+    @property
+    def altura(self):
+        return self.dots(self.height_mm)
+
+    def topo(self, base_mm, altura_mm):
+        """Posição Y (dots, a partir do topo) de um campo cuja base fica a
+        `base_mm` da borda inferior, aplicando o offset_y_mm do config."""
+        return max(0, self.dots(self.height_mm - base_mm - altura_mm + self.offset_y_mm))
+
+    # Posições equivalentes às usadas em EtiquetaGenerator._desenhar_etiqueta
+    def area_descricao(self):
+        altura_mm = 14 * MM_POR_POLEGADA / 72.0
+        return self.dots(-3), self.topo(20, altura_mm * 0.75), self.largura, self.pontos(14)
+
+    def area_codigo_barras(self):
+        return self.dots(5), self.topo(5, 12), self.dots(12)
+
+    def area_preco(self):
+        altura_mm = 28 * MM_POR_POLEGADA / 72.0
+        return self.dots(52), self.topo(7, altura_mm * 0.75), self.dots(40), self.pontos(28)
+
+    def area_unidade(self):
+        altura_mm = 11 * MM_POR_POLEGADA / 72.0
+        return self.dots(85), self.topo(2, altura_mm * 0.75), self.pontos(11)
+
+
+def _dados_codigo_barras(codigo, tipo):
+    # EAN-13/EAN-8: a impressora calcula o dígito verificador
+    if tipo == "ean13":
+        return codigo[:12]
+    if tipo == "ean8":
+        return codigo[:7]
+    return codigo
+
+
+def _escapar_zpl(texto):
+    # Usado com ^FH_ : caracteres de controle viram hexadecimal
+    return (
+        texto.replace("_", "_5F")
+        .replace("^", "_5E")
+        .replace("~", "_7E")
+    )
+
+
+def _formato_zpl(layout, tipo):
+    x_desc, y_desc, largura_desc, fonte_desc = layout.area_descricao()
+    x_preco, y_preco, largura_preco, fonte_preco = layout.area_preco()
+    x_un, y_un, fonte_un = layout.area_unidade()
+
+    linhas = [
+        f"^XA^DF{FORMATOS_ZPL[tipo]}^FS",
+        "^CI28",
+        f"^PW{layout.largura}",
+        f"^LL{layout.altura}",
+        "^LH0,0",
+        f"^FO{max(0, x_desc)},{y_desc}^A0N,{fonte_desc},{fonte_desc}"
+        f"^FB{largura_desc},1,0,C^FH_^FN1^FS",
+    ]
+
+    if tipo is not None:
+        x_cb, y_cb, altura_cb = layout.area_codigo_barras()
+        modulo = max(1, layout.dots(0.25))
+        comando = {
+            "ean13": f"^BEN,{altura_cb},Y,N",
+            "ean8": f"^B8N,{altura_cb},Y,N",
+            "code128": f"^BCN,{altura_cb},Y,N,N",
+        }[tipo]
+        linhas.append(f"^BY{modulo}")
+        linhas.append(f"^FO{x_cb},{y_cb}{comando}^FH_^FN3^FS")
+
+    linhas.extend([
+        f"^FO{x_preco},{y_preco}^A0N,{fonte_preco},{fonte_preco}"
+        f"^FB{largura_preco},1,0,C^FH_^FN2^FS",
+        f"^FO{x_un},{y_un}^A0N,{fonte_un},{fonte_un}^FDUN^FS",
+        "^XZ",
+    ])
+    return "".join(linhas)
+
+
+def gerar_zpl(itens, layout):
+    """
+    Gera os comandos ZPL para uma lista de (produto, codigo_barras).
+
+    Os formatos são gravados uma única vez na impressora; cada etiqueta só
+    envia descrição, preço e código de barras.
+    """
+    formatos = []
+    etiquetas = []
+
+    for produto, codigo_barras in itens:
+        codigo_barras = (codigo_barras or "").strip()
+        tipo = tipo_codigo_barras(codigo_barras)
+
+        if tipo not in formatos:
+            formatos.append(tipo)
+
+        campos = [
+            f"^FN1^FH_^FD{_escapar_zpl(produto.descricao[:60])}^FS",
+            f"^FN2^FH_^FD{_escapar_zpl(formatar_preco(produto.preco_venda_novo))}^FS",
+        ]
+        if tipo is not None:
+            campos.append(f"^FN3^FH_^FD{_escapar_zpl(_dados_codigo_barras(codigo_barras, tipo))}^FS")
+
+        etiquetas.append(f"^XA^XF{FORMATOS_ZPL[tipo]}^FS{''.join(campos)}^XZ")
+
+    partes = [_formato_zpl(layout, tipo) for tipo in formatos] + etiquetas
+    return ("\n".join(partes) + "\n").encode("utf-8")
+
+
+def _escapar_epl(texto):
+    return texto.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _largura_texto_epl(texto, layout, fonte, multiplicador=1):
+    largura_char = FONTES_EPL[layout.dpi][fonte][0]
+    return len(texto) * largura_char * multiplicador
+
+
+def gerar_epl(itens, layout):
+    """Gera os comandos EPL2 para uma lista de (produto, codigo_barras)."""
+    x_desc, y_desc, largura_desc, _ = layout.area_descricao()
+    x_preco, y_preco, largura_preco, _ = layout.area_preco()
+    x_un, y_un, _ = layout.area_unidade()
+    x_cb, y_cb, altura_cb = layout.area_codigo_barras()
+    modulo = max(1, layout.dots(0.25))
+
+    linhas = [
+        "I8,1,001",
+        f"q{layout.largura}",
+        f"Q{layout.altura},24",
+    ]
+
+    for produto, codigo_barras in itens:
+        codigo_barras = (codigo_barras or "").strip()
+        tipo = tipo_codigo_barras(codigo_barras)
+        descricao = produto.descricao[:60]
+        preco_texto = formatar_preco(produto.preco_venda_novo)
+
+        x_texto = x_desc + (largura_desc - _largura_texto_epl(descricao, layout, 3)) // 2
+        x_valor = x_preco + (largura_preco - _largura_texto_epl(preco_texto, layout, 4, 2)) // 2
+
+        linhas.append("N")
+        linhas.append(f'A{max(0, x_texto)},{y_desc},0,3,1,2,N,"{_escapar_epl(descricao)}"')
+
+        if tipo is not None:
+            simbologia = {"ean13": "E30", "ean8": "E80", "code128": "1"}[tipo]
+            dados = _escapar_epl(_dados_codigo_barras(codigo_barras, tipo))
+            linhas.append(f'B{x_cb},{y_cb},0,{simbologia},{modulo},{modulo * 2},{altura_cb},B,"{dados}"')
+
+        linhas.append(f'A{max(0, x_valor)},{y_preco},0,4,2,2,N,"{_escapar_epl(preco_texto)}"')
+        linhas.append(f'A{x_un},{y_un},0,2,1,1,N,"UN"')
+        linhas.append("P1")
+
+    return ("\n".join(linhas) + "\n").encode("cp850", errors="replace")
+
+
+def _separar_host_porta(destino):
+    endereco = destino[len("tcp://"):] if destino.startswith("tcp://") else destino
+    host, _, porta = endereco.rpartition(":")
+    if host and porta.isdigit():
+        return host, int(porta)
+    if destino.startswith("tcp://"):
+        return endereco, PORTA_RAW_PADRAO
+    return None, None
+
+
+def enviar_para_destino(dados, destino, timeout=10.0):
+    """
+    Envia os comandos brutos para o destino configurado.
+
+    Args:
+        dados: Bytes com os comandos ZPL/EPL
+        destino: "host:porta" / "tcp://host[:porta]" para impressora em rede
+                 (porta RAW 9100), ou caminho de arquivo/dispositivo
+                 (ex.: \\\\PC\\ZEBRA, LPT1, /dev/usb/lp0)
+    """
+    host, porta = _separar_host_porta(destino)
+
+    # Evita interpretar "C:\\..." como host:porta
+    if host and not os.path.splitdrive(destino)[0]:
+        try:
+            with socket.create_connection((host, porta), timeout=timeout) as conexao:
+                conexao.sendall(dados)
+            return
+        except OSError as e:
+            raise Exception(f"Erro ao enviar etiquetas para {host}:{porta}: {str(e)}")
+
+    try:
+        with open(destino, "wb") as f:
+            f.write(dados)
+    except OSError as e:
+        raise Exception(f"Erro ao gravar etiquetas em {destino}: {str(e)}")
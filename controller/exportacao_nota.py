@@ -0,0 +1,296 @@
+"""
+Exportação e importação dos produtos de uma nota carregada, para precificar
+fora da loja (ex.: em um notebook sem acesso ao servidor) e trazer os preços
+de volta para a grade.
+
+Formatos:
+    csv     = separado por ";" com vírgula decimal (abre direto no Excel)
+    parquet = colunar e compacto; requer o pacote opcional pyarrow
+
+Os dois são gravados e lidos em lotes, sem montar o arquivo inteiro em
+memória. Na importação só as colunas codigo, preco_atual e preco_novo são
+usadas: os produtos são localizados pelo código e o preço novo aplicado de
+uma vez, depois de todo o arquivo ser conferido.
+"""
+import csv
+import os
+import re
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+COLUNAS = (
+    "codigo",
+    "descricao",
+    "custo_total",
+    "custo_reposicao",
+    "preco_atual",
+    "preco_novo",
+    "margem_venda",
+    "porcentagem_custo",
+)
+
+COLUNAS_IMPORTACAO = ("codigo", "preco_atual", "preco_novo")
+
+FORMATOS = ("csv", "parquet")
+
+
+def formato_do_arquivo(caminho: str, formato: Optional[str] = None) -> str:
+    formato = (formato or os.path.splitext(caminho)[1].lstrip(".")).lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato não suportado: {formato or caminho} (use {', '.join(FORMATOS)})")
+    return formato
+
+
+def _pyarrow():
+    # Importação tardia: pyarrow é opcional e só é usado no formato Parquet
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("O formato Parquet requer o pacote pyarrow (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+def _linha(produto) -> tuple:
+    return (
+        str(produto.codigo).strip(),
+        produto.descricao,
+        round(float(produto.custo_total), 4),
+        round(float(produto.custo_reposicao), 4),
+        round(float(produto.preco_venda_min), 2),
+        round(float(produto.preco_venda_novo), 2),
+        round(float(produto.margem_venda), 2),
+        round(float(produto.porcentagem_custo), 2),
+    )
+
+
+def _decimal_br(valor) -> str:
+    return valor if isinstance(valor, str) else f"{valor}".replace(".", ",")
+
+
+# Textos iniciados por estes caracteres são fórmulas para o Excel
+INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _celula_csv(valor):
+    """Prefixa com "'" os textos que o Excel abriria como fórmula."""
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def _texto_csv(valor) -> str:
+    texto = (valor or "").strip()
+    if texto.startswith("'") and texto[1:].startswith(INICIO_FORMULA):
+        return texto[1:]
+    return texto
+
+
+def _lotes(itens: Iterable, tamanho: int) -> Iterator[list]:
+    itens = iter(itens)
+    lote = list(islice(itens, tamanho))
+    while lote:
+        yield lote
+        lote = list(islice(itens, tamanho))
+
+
+def exportar_produtos(produtos: Iterable, caminho: str, formato: Optional[str] = None, lote: int = 5000) -> int:
+    """
+    Grava os produtos (código, descrição, custos, preço atual e novo,
+    margem e % sobre o custo), em lotes.
+
+    Args:
+        produtos: Produtos da nota (qualquer iterável, lido uma única vez)
+        formato: "csv" ou "parquet"; padrão pela extensão do arquivo
+
+    Returns:
+        Quantidade de produtos exportados
+    """
+    formato = formato_do_arquivo(caminho, formato)
+    total = 0
+
+    if formato == "csv":
+        # utf-8-sig: o Excel reconhece os acentos
+        with open(caminho, "w", encoding="utf-8-sig", newline="") as f:
+            escritor = csv.writer(f, delimiter=";")
+            escritor.writerow(COLUNAS)
+            for linhas in _lotes((_linha(produto) for produto in produtos), lote):
+                escritor.writerows([_decimal_br(_celula_csv(valor)) for valor in linha] for linha in linhas)
+                total += len(linhas)
+        return total
+
+    pa, pq = _pyarrow()
+    esquema = pa.schema(
+        [("codigo", pa.string()), ("descricao", pa.string())]
+        + [(coluna, pa.float64()) for coluna in COLUNAS[2:]]
+    )
+    with pq.ParquetWriter(caminho, esquema, compression="zstd") as escritor:
+        for linhas in _lotes((_linha(produto) for produto in produtos), lote):
+            colunas = list(zip(*linhas))
+            escritor.write_batch(pa.record_batch(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, esquema)],
+                schema=esquema,
+            ))
+            total += len(linhas)
+    return total
+
+
+def _numero(valor) -> Optional[float]:
+    """
+    Aceita 12.5, "12,50", "1.234,56" e "R$ 12,50"; vazio retorna None.
+    Ponto seguido de três dígitos sem vírgula decimal ("1.234") é ambíguo
+    (milhar ou decimal) e é recusado.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).replace("R$", "").strip()
+    if not texto:
+        return None
+    if "," in texto:
+        if not re.fullmatch(r"-?(\d{1,3}(\.\d{3})+|\d+),\d+", texto):
+            raise ValueError(f"valor não numérico: {valor}")
+        texto = texto.replace(".", "").replace(",", ".")
+    elif re.fullmatch(r"-?\d{1,3}(\.\d{3})+", texto):
+        raise ValueError(f"valor ambíguo (use vírgula decimal, ex.: 1.234,00): {valor}")
+    try:
+        return float(texto)
+    except ValueError:
+        raise ValueError(f"valor não numérico: {valor}") from None
+
+
+def ler_precos(caminho: str, formato: Optional[str] = None, lote: int = 5000) -> Iterator[dict]:
+    """
+    Lê o arquivo em lotes, apenas as colunas de COLUNAS_IMPORTACAO.
+
+    Yields:
+        dict: linha (número no arquivo, a partir de 2 no CSV), codigo e os
+        textos/valores de preco_atual e preco_novo
+    """
+    formato = formato_do_arquivo(caminho, formato)
+
+    if formato == "csv":
+        with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+            # O arquivo pode ter sido salvo pelo Excel com "," ou ";"
+            amostra = f.readline()
+            f.seek(0)
+            delimitador = ";" if amostra.count(";") >= amostra.count(",") else ","
+            leitor = csv.DictReader(f, delimiter=delimitador)
+            faltando = [coluna for coluna in COLUNAS_IMPORTACAO if coluna not in (leitor.fieldnames or ())]
+            if faltando:
+                raise ValueError(f"Colunas ausentes no arquivo: {', '.join(faltando)}")
+            for numero, registro in enumerate(leitor, start=2):
+                yield {
+                    "linha": numero,
+                    "codigo": _texto_csv(registro["codigo"]),
+                    "preco_atual": registro["preco_atual"],
+                    "preco_novo": registro["preco_novo"],
+                }
+        return
+
+    _, pq = _pyarrow()
+    arquivo = pq.ParquetFile(caminho)
+    faltando = [coluna for coluna in COLUNAS_IMPORTACAO if coluna not in arquivo.schema_arrow.names]
+    if faltando:
+        raise ValueError(f"Colunas ausentes no arquivo: {', '.join(faltando)}")
+    numero = 0
+    for bloco in arquivo.iter_batches(batch_size=lote, columns=list(COLUNAS_IMPORTACAO)):
+        dados = bloco.to_pydict()
+        for codigo, preco_atual, preco_novo in zip(dados["codigo"], dados["preco_atual"], dados["preco_novo"]):
+            numero += 1
+            yield {
+                "linha": numero,
+                "codigo": str(codigo or "").strip(),
+                "preco_atual": preco_atual,
+                "preco_novo": preco_novo,
+            }
+
+
+def importar_precos(produtos: List, caminho: str, formato: Optional[str] = None) -> dict:
+    """
+    Aplica os preços novos do arquivo aos produtos carregados, localizando
+    cada um pelo código.
+
+    O arquivo inteiro é conferido antes: nada é aplicado a um produto com
+    conflito, e os demais recebem o preço em uma única passada. São
+    conflitos: código fora da nota, código repetido no arquivo, preço novo
+    inválido e preço atual diferente do carregado (o preço mudou no
+    servidor depois da exportação). Linhas com o preço novo igual ao
+    carregado (não editadas, mesmo que zero ou vazio) contam como sem
+    alteração.
+
+    Returns:
+        dict: alterados (índices em `produtos` com preço novo aplicado),
+            sem_alteracao (quantidade de linhas com o mesmo preço) e
+            conflitos (lista de {linha, codigo, motivo})
+    """
+    indices: Dict[str, List[int]] = {}
+    sem_zeros: Dict[str, str] = {}
+    for indice, produto in enumerate(produtos):
+        codigo = str(produto.codigo).strip()
+        indices.setdefault(codigo, []).append(indice)
+        sem_zeros.setdefault(codigo.lstrip("0"), codigo)
+
+    precos = {}
+    conflitos = []
+    vistos = set()
+    for registro in ler_precos(caminho, formato):
+        codigo = registro["codigo"]
+        if codigo not in indices:
+            # O Excel remove os zeros à esquerda de códigos numéricos
+            codigo = sem_zeros.get(codigo.lstrip("0"), codigo)
+
+        def conflito(motivo):
+            conflitos.append({"linha": registro["linha"], "codigo": codigo, "motivo": motivo})
+
+        if codigo not in indices:
+            conflito("produto não está na nota carregada")
+            continue
+        if codigo in vistos:
+            precos.pop(codigo, None)
+            conflito("código repetido no arquivo")
+            continue
+        vistos.add(codigo)
+
+        try:
+            preco_novo = _numero(registro["preco_novo"])
+            preco_atual = _numero(registro["preco_atual"])
+        except ValueError as e:
+            conflito(str(e))
+            continue
+        produto = produtos[indices[codigo][0]]
+        carregado = round(float(produto.preco_venda_novo or 0), 2)
+        if abs((preco_novo or 0) - carregado) < 0.005:
+            # Linha não editada (inclusive produto sem preço): sem alteração
+            precos[codigo] = carregado
+            continue
+        if preco_novo is None or preco_novo <= 0:
+            conflito("preço novo vazio ou inválido")
+            continue
+
+        if preco_atual is not None and abs(preco_atual - float(produto.preco_venda_min)) >= 0.005:
+            conflito(
+                f"preço atual mudou desde a exportação (R$ {preco_atual:.2f} no arquivo, "
+                f"R$ {produto.preco_venda_min:.2f} agora)"
+            )
+            continue
+
+        precos[codigo] = round(preco_novo, 2)
+
+    alterados = []
+    sem_alteracao = 0
+    for codigo, preco in precos.items():
+        for indice in indices[codigo]:
+            produto = produtos[indice]
+            if abs(float(produto.preco_venda_novo) - preco) < 0.005:
+                sem_alteracao += 1
+                continue
+            produto.set_preco_venda_novo(preco)
+            alterados.append(indice)
+
+    return {
+        "alterados": sorted(alterados),
+        "sem_alteracao": sem_alteracao,
+        "conflitos": conflitos,
+    }
@@ -0,0 +1,224 @@
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+
+class ItemEtiqueta:
+    """
+    Produto mínimo para redesenhar uma etiqueta a partir do histórico,
+    sem consultar o banco de dados.
+    """
+
+    def __init__(self, codigo: str, descricao: str, preco_venda_novo: float, codigo_barras: str = ""):
+        self.codigo = codigo
+        self.descricao = descricao
+        self.preco_venda_novo = preco_venda_novo
+        self.codigo_barras = codigo_barras
+
+
+class LayoutEtiquetaAlteradoError(Exception):
+    """
+    Jobs gerados com outra versão do layout da etiqueta: a reimpressão
+    sairia com o layout atual, diferente do impresso originalmente.
+
+    Attributes:
+        jobs: Lista de {id, layout} dos jobs com layout diferente
+        versao: Versão atual do layout
+    """
+
+    def __init__(self, jobs, versao):
+        self.jobs = jobs
+        self.versao = versao
+        super().__init__(
+            f"{len(jobs)} job(s) gerado(s) com outro layout de etiqueta: "
+            + ", ".join(job["id"] for job in jobs[:5])
+            + (", ..." if len(jobs) > 5 else "")
+        )
+
+
+class HistoricoEtiquetasManager:
+    """
+    Mantém um registro compacto de cada geração de etiquetas (produtos,
+    preços, códigos de barras já resolvidos e versão do layout), permitindo
+    reimprimir, juntar ou converter jobs antigos sem acessar o banco.
+    """
+
+    def __init__(self, diretorio: str, max_jobs: int = 200, dias: int = 90):
+        """
+        Inicializa o histórico de etiquetas.
+
+        Args:
+            diretorio: Pasta onde cada job é gravado como um arquivo JSON
+            max_jobs: Quantidade máxima de jobs mantidos
+            dias: Jobs com mais de X dias são removidos
+        """
+        self.diretorio = diretorio
+        self.max_jobs = max_jobs
+        self.dias = dias
+
+    def _caminho_job(self, job_id: str) -> str:
+        return os.path.join(self.diretorio, f"{job_id}.json")
+
+    def registrar_job(
+        self,
+        itens: List[tuple],
+        formato: str,
+        layout: str,
+        arquivo: str,
+        origem: Optional[List[str]] = None,
+        arquivo_gerado: bool = False,
+    ) -> str:
+        """
+        Registra um job de etiquetas.
+
+        Args:
+            itens: Lista de (produto, codigo_barras) na ordem impressa
+            formato: Formato gerado (pdf, zpl, epl)
+            layout: Versão do layout da etiqueta
+            arquivo: Arquivo ou destino gerado
+            origem: Jobs de origem quando for reimpressão/junção
+            arquivo_gerado: O arquivo foi criado para este job na pasta de
+                etiquetas e pode ser apagado junto com ele
+
+        Returns:
+            Identificador do job
+        """
+        agora = datetime.now()
+        job_id = f"{agora.strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:4]}"
+
+        job = {
+            "id": job_id,
+            "data": agora.strftime("%Y-%m-%d"),
+            "hora": agora.strftime("%H:%M:%S"),
+            "formato": formato,
+            "layout": layout,
+            "arquivo": arquivo,
+            "arquivo_gerado": bool(arquivo_gerado),
+            "origem": origem or [],
+            # [codigo, descricao, preco, codigo_barras]
+            "itens": [
+                [str(produto.codigo), produto.descricao, round(float(produto.preco_venda_novo), 2), codigo_barras or ""]
+                for produto, codigo_barras in itens
+            ],
+        }
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(self._caminho_job(job_id), "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, separators=(",", ":"))
+
+        self.aplicar_retencao()
+
+        return job_id
+
+    def obter_job(self, job_id: str) -> Optional[dict]:
+        """
+        Obtém um job registrado.
+
+        Returns:
+            Dicionário do job ou None se não existir
+        """
+        caminho = self._caminho_job(job_id)
+        if not os.path.exists(caminho):
+            return None
+
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Aviso: Erro ao carregar job de etiquetas {job_id}: {e}")
+            return None
+
+    def listar_jobs(self) -> List[dict]:
+        """
+        Lista os jobs do mais recente para o mais antigo (sem os itens).
+
+        Returns:
+            Lista com id, data, hora, formato, layout, arquivo e quantidade
+        """
+        jobs = []
+        for job_id in self._ids_ordenados(reverso=True):
+            job = self.obter_job(job_id)
+            if not job:
+                continue
+            itens = job.pop("itens", [])
+            job["quantidade"] = len(itens)
+            jobs.append(job)
+        return jobs
+
+    def obter_itens(self, job_ids: List[str]) -> List[ItemEtiqueta]:
+        """
+        Monta os itens de um ou mais jobs, na ordem informada.
+
+        Raises:
+            ValueError: Se algum job não existir
+        """
+        itens = []
+        for job_id in job_ids:
+            job = self.obter_job(job_id)
+            if not job:
+                raise ValueError(f"Job de etiquetas não encontrado: {job_id}")
+            for codigo, descricao, preco, codigo_barras in job["itens"]:
+                itens.append(ItemEtiqueta(codigo, descricao, preco, codigo_barras))
+        return itens
+
+    def verificar_layout(self, job_ids: List[str], versao: str) -> None:
+        """
+        Confere se os jobs foram gerados com a versão atual do layout.
+
+        Raises:
+            LayoutEtiquetaAlteradoError: Se algum job usou outro layout
+        """
+        diferentes = []
+        for job_id in job_ids:
+            job = self.obter_job(job_id)
+            if job and job.get("layout") != versao:
+                diferentes.append({"id": job_id, "layout": job.get("layout")})
+        if diferentes:
+            raise LayoutEtiquetaAlteradoError(diferentes, versao)
+
+    def _ids_ordenados(self, reverso: bool = False) -> List[str]:
+        if not os.path.isdir(self.diretorio):
+            return []
+        # O id começa com data/hora, então a ordem alfabética é a cronológica
+        ids = [nome[:-5] for nome in os.listdir(self.diretorio) if nome.endswith(".json")]
+        return sorted(ids, reverse=reverso)
+
+    def aplicar_retencao(self) -> int:
+        """
+        Remove jobs além do limite de quantidade ou de dias.
+
+        Returns:
+            Quantidade de jobs removidos
+        """
+        ids = self._ids_ordenados()
+        limite = (datetime.now() - timedelta(days=self.dias)).strftime("%Y%m%d")
+
+        excedentes = max(0, len(ids) - self.max_jobs)
+        remover = ids[:excedentes] + [job_id for job_id in ids[excedentes:] if job_id[:8] < limite]
+
+        pasta_etiquetas = os.path.abspath(os.path.dirname(self.diretorio))
+
+        for job_id in remover:
+            job = self.obter_job(job_id) or {}
+            arquivo = job.get("arquivo") or ""
+
+            # Apaga também o arquivo, apenas se foi criado para este job na pasta
+            # de etiquetas (destinos informados e impressoras são mantidos)
+            if (
+                arquivo
+                and job.get("arquivo_gerado")
+                and os.path.dirname(os.path.abspath(arquivo)) == pasta_etiquetas
+            ):
+                try:
+                    os.remove(arquivo)
+                except OSError:
+                    pass
+
+            try:
+                os.remove(self._caminho_job(job_id))
+            except OSError:
+                continue
+
+        return len(remover)
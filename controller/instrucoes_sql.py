@@ -0,0 +1,257 @@
+"""
+Registro das instruções SQL do Database: cada consulta é declarada uma vez,
+com nome e parâmetros (nunca valores no texto), e executada sempre pelo
+mesmo cursor da conexão. O pyodbc só prepara de novo uma instrução quando o
+texto muda no cursor, e o SQL Server reaproveita o plano de um texto já
+visto, então o mesmo texto em um cursor próprio é preparado uma única vez
+por conexão.
+
+Listas de tamanho variável (IN (?, ?, ...), condições com OR) das
+instruções declaradas com permite_repeticao são completadas até a próxima
+potência de 2, repetindo o último item, para que poucos textos diferentes
+cheguem ao servidor. As demais são enviadas com o tamanho exato.
+"""
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+class Instrucao:
+    """
+    Declaração de uma instrução.
+
+    Args:
+        nome: Nome usado para executar e nas estatísticas
+        sql: Texto com parâmetros "?". Pode conter {lista}, repetido conforme
+            a quantidade de itens, e outros {trechos} fixos escolhidos pelo
+            código (nunca dados do usuário)
+        item_lista: Texto de um item de {lista}
+        separador: Separador entre os itens de {lista}
+        lote_maximo: Itens por execução (o chamador divide listas maiores)
+        permite_repeticao: Repetir itens de {lista} não altera o resultado
+            (ex.: IN ou OR em um SELECT), então a lista pode ser completada
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        sql: str,
+        item_lista: str = "?",
+        separador: str = ", ",
+        lote_maximo: int = 2000,
+        permite_repeticao: bool = False,
+    ):
+        self.nome = nome
+        self.sql = sql
+        self.item_lista = item_lista
+        self.separador = separador
+        self.lote_maximo = lote_maximo
+        self.permite_repeticao = permite_repeticao
+
+    def tamanho_lista(self, quantidade: int) -> int:
+        """Quantidade de itens enviada para uma lista com `quantidade` itens."""
+        if not self.permite_repeticao:
+            return quantidade
+        tamanho = 1
+        while tamanho < quantidade:
+            tamanho *= 2
+        return min(tamanho, max(self.lote_maximo, quantidade))
+
+    def texto(self, tamanho_lista: Optional[int] = None, **trechos: str) -> str:
+        sql = self.sql
+        if tamanho_lista is not None:
+            sql = sql.replace("{lista}", self.separador.join([self.item_lista] * tamanho_lista))
+        for nome, valor in trechos.items():
+            sql = sql.replace("{" + nome + "}", valor)
+        return sql
+
+
+def driver_suporta_fast_executemany(driver: str) -> bool:
+    """
+    True para o "ODBC Driver 17 for SQL Server" ou mais novo. O driver
+    antigo "{SQL Server}" não suporta fast_executemany de forma confiável.
+    """
+    encontrado = re.search(r"ODBC Driver (\d+) for SQL Server", driver or "", re.IGNORECASE)
+    return bool(encontrado) and int(encontrado.group(1)) >= 17
+
+
+class RegistroInstrucoes:
+    """
+    Instruções de uma conexão: um cursor por texto de instrução, reaproveitado
+    enquanto a conexão for a mesma, e estatísticas por instrução.
+
+    Args:
+        fast_executemany: Envia os lotes de executar_lote de uma vez (só com
+            drivers que suportam; ver driver_suporta_fast_executemany)
+    """
+
+    def __init__(self, instrucoes: Iterable[Instrucao], fast_executemany: bool = False):
+        self.fast_executemany = fast_executemany
+        self._instrucoes: Dict[str, Instrucao] = {}
+        self._estatisticas: Dict[str, dict] = {}
+        for instrucao in instrucoes:
+            self.registrar(instrucao)
+
+        self._conexao = None
+        self._cursores = {}
+        # A conexão principal também é usada pela preparação da abertura
+        self._trava = threading.RLock()
+
+    def registrar(self, instrucao: Instrucao) -> None:
+        if instrucao.nome in self._instrucoes:
+            raise ValueError(f"Instrução já registrada: {instrucao.nome}")
+        self._instrucoes[instrucao.nome] = instrucao
+        self._estatisticas[instrucao.nome] = {
+            "execucoes": 0,
+            "linhas": 0,
+            "tempo_total_ms": 0.0,
+            "tempo_maximo_ms": 0.0,
+            "preparacoes": 0,
+        }
+
+    def obter(self, nome: str) -> Instrucao:
+        try:
+            return self._instrucoes[nome]
+        except KeyError:
+            raise KeyError(f"Instrução não registrada: {nome}") from None
+
+    def _cursor(self, conexao, sql: str, nome: str):
+        if conexao is not self._conexao:
+            self.fechar_cursores()
+            self._conexao = conexao
+
+        cursor = self._cursores.get(sql)
+        if cursor is None:
+            cursor = conexao.cursor()
+            self._cursores[sql] = cursor
+            self._estatisticas[nome]["preparacoes"] += 1
+        return cursor
+
+    def _montar(self, nome: str, parametros: Sequence, lista: Optional[Sequence], trechos: dict):
+        instrucao = self.obter(nome)
+        parametros = list(parametros)
+        tamanho = None
+        if lista is not None:
+            lista = list(lista)
+            if not lista:
+                raise ValueError(f"Lista vazia para a instrução {nome}")
+            tamanho = instrucao.tamanho_lista(len(lista))
+            if tamanho > len(lista):
+                lista = lista + [lista[-1]] * (tamanho - len(lista))
+            for item in lista:
+                if isinstance(item, (list, tuple)):
+                    parametros.extend(item)
+                else:
+                    parametros.append(item)
+        return instrucao.texto(tamanho, **trechos), parametros
+
+    def _registrar_execucao(self, nome: str, inicio: float, linhas: int) -> None:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        estatisticas = self._estatisticas[nome]
+        estatisticas["execucoes"] += 1
+        estatisticas["linhas"] += max(linhas, 0)
+        estatisticas["tempo_total_ms"] += duracao_ms
+        estatisticas["tempo_maximo_ms"] = max(estatisticas["tempo_maximo_ms"], duracao_ms)
+
+    def _descartar(self, sql: str) -> None:
+        # Cursor com erro: o próximo uso abre outro
+        cursor = self._cursores.pop(sql, None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    def consultar(self, conexao, nome: str, parametros: Sequence = (), lista=None, **trechos) -> List:
+        """
+        Executa uma consulta e retorna todas as linhas (o cursor fica livre
+        para a próxima execução).
+
+        Args:
+            parametros: Parâmetros fixos, antes dos itens de {lista}
+            lista: Itens de {lista} (valores ou tuplas de valores)
+            trechos: Valores dos demais {trechos} da instrução
+        """
+        sql, parametros = self._montar(nome, parametros, lista, trechos)
+        with self._trava:
+            cursor = self._cursor(conexao, sql, nome)
+            inicio = time.perf_counter()
+            try:
+                cursor.execute(sql, parametros)
+                linhas = cursor.fetchall()
+            except Exception:
+                self._descartar(sql)
+                raise
+            self._registrar_execucao(nome, inicio, len(linhas))
+            return linhas
+
+    def consultar_um(self, conexao, nome: str, parametros: Sequence = (), lista=None, **trechos):
+        """Como consultar, retornando apenas a primeira linha (ou None)."""
+        linhas = self.consultar(conexao, nome, parametros, lista, **trechos)
+        return linhas[0] if linhas else None
+
+    def executar(self, conexao, nome: str, parametros: Sequence = (), lista=None, **trechos) -> int:
+        """Executa uma instrução sem resultado (UPDATE, INSERT); retorna as linhas afetadas."""
+        sql, parametros = self._montar(nome, parametros, lista, trechos)
+        with self._trava:
+            cursor = self._cursor(conexao, sql, nome)
+            inicio = time.perf_counter()
+            try:
+                cursor.execute(sql, parametros)
+            except Exception:
+                self._descartar(sql)
+                raise
+            linhas = cursor.rowcount
+            self._registrar_execucao(nome, inicio, linhas)
+            return linhas
+
+    def executar_lote(self, conexao, nome: str, sequencia: Sequence[Sequence], **trechos) -> None:
+        """
+        Executa a instrução para cada conjunto de parâmetros, em um único lote
+        quando fast_executemany está ativo.
+        """
+        sequencia = list(sequencia)
+        if not sequencia:
+            return
+        sql = self.obter(nome).texto(**trechos)
+        with self._trava:
+            cursor = self._cursor(conexao, sql, nome)
+            if self.fast_executemany:
+                # Envia todos os parâmetros de uma vez
+                cursor.fast_executemany = True
+            inicio = time.perf_counter()
+            try:
+                cursor.executemany(sql, sequencia)
+            except Exception:
+                self._descartar(sql)
+                raise
+            self._registrar_execucao(nome, inicio, len(sequencia))
+
+    def fechar_cursores(self) -> None:
+        with self._trava:
+            for cursor in self._cursores.values():
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            self._cursores = {}
+            self._conexao = None
+
+    def estatisticas(self) -> List[dict]:
+        """Estatísticas das instruções já executadas, da mais demorada para a mais rápida."""
+        resultado = []
+        for nome, estatisticas in self._estatisticas.items():
+            if not estatisticas["execucoes"]:
+                continue
+            resultado.append({
+                "nome": nome,
+                "execucoes": estatisticas["execucoes"],
+                "linhas": estatisticas["linhas"],
+                "tempo_total_ms": round(estatisticas["tempo_total_ms"], 2),
+                "tempo_medio_ms": round(estatisticas["tempo_total_ms"] / estatisticas["execucoes"], 2),
+                "tempo_maximo_ms": round(estatisticas["tempo_maximo_ms"], 2),
+                "preparacoes": estatisticas["preparacoes"],
+            })
+        resultado.sort(key=lambda item: item["tempo_total_ms"], reverse=True)
+        return resultado
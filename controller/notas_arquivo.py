@@ -0,0 +1,214 @@
+import gzip
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from controller.notas_backends import IndicesNotas, assinatura_arquivos
+from controller.trava_arquivo import TravaArquivo
+
+
+class ArquivoNotas:
+    """
+    Arquivo morto das notas processadas, particionado por mês.
+
+    Cada mês fica em um arquivo AAAA-MM.json.gz e um índice (indice.json)
+    guarda apenas as chaves de cada mês. Nada é lido na inicialização: o
+    índice é carregado na primeira consulta que não encontra a nota no
+    histórico recente, e cada partição só quando uma nota dela é pedida.
+    As consultas por produto leem todas as partições uma vez e guardam só as
+    chaves de cada produto, até o próximo arquivamento.
+    """
+
+    SEM_DATA = "sem-data"
+    MAX_PARTICOES_EM_MEMORIA = 6
+
+    def __init__(self, diretorio: str, espera_trava: float = 10.0):
+        """
+        Args:
+            diretorio: Pasta das partições (criada no primeiro arquivamento)
+            espera_trava: Segundos aguardando outra estação que esteja arquivando
+        """
+        self.diretorio = diretorio
+        self.arquivo_indice = os.path.join(diretorio, "indice.json")
+        self.espera_trava = espera_trava
+        self._limpar_cache()
+
+    def _limpar_cache(self) -> None:
+        self._indice: Optional[Dict[str, List[str]]] = None
+        self._mes_da_chave: Dict[str, str] = {}
+        self._particoes: "OrderedDict[str, Dict[str, dict]]" = OrderedDict()
+        self._por_produto: Optional[Dict[str, List[str]]] = None
+        self._assinatura_lida = None
+
+    def _caminho_particao(self, mes: str) -> str:
+        return os.path.join(self.diretorio, f"{mes}.json.gz")
+
+    @classmethod
+    def mes(cls, registro: dict) -> str:
+        momento = IndicesNotas.momento(registro)
+        return momento[:7] if momento else cls.SEM_DATA
+
+    def assinatura(self) -> tuple:
+        return assinatura_arquivos(self.arquivo_indice)
+
+    def recarregar_se_alterado(self) -> None:
+        """Descarta o que está em memória se outra estação arquivou notas."""
+        if self._indice is not None and self.assinatura() != self._assinatura_lida:
+            self._limpar_cache()
+
+    def _carregar_indice(self) -> Dict[str, List[str]]:
+        if self._indice is not None:
+            return self._indice
+
+        assinatura = self.assinatura()
+        indice = {}
+        if os.path.exists(self.arquivo_indice):
+            try:
+                with open(self.arquivo_indice, "r", encoding="utf-8") as f:
+                    indice = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Aviso: Erro ao carregar {self.arquivo_indice}: {e}")
+
+        self._indice = indice
+        self._mes_da_chave = {chave: mes for mes, chaves in indice.items() for chave in chaves}
+        self._assinatura_lida = assinatura
+        return indice
+
+    def _ler_particao(self, mes: str) -> Dict[str, dict]:
+        caminho = self._caminho_particao(mes)
+        if not os.path.exists(caminho):
+            return {}
+        with gzip.open(caminho, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _carregar_particao(self, mes: str) -> Dict[str, dict]:
+        if mes in self._particoes:
+            self._particoes.move_to_end(mes)
+            return self._particoes[mes]
+
+        try:
+            notas = self._ler_particao(mes)
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            print(f"Aviso: Erro ao carregar a partição {mes} do arquivo de notas: {e}")
+            return {}
+
+        self._particoes[mes] = notas
+        if len(self._particoes) > self.MAX_PARTICOES_EM_MEMORIA:
+            self._particoes.popitem(last=False)
+        return notas
+
+    def contem(self, chave: str) -> bool:
+        self._carregar_indice()
+        return chave in self._mes_da_chave
+
+    def contem_varias(self, chaves: List[str]) -> List[bool]:
+        self._carregar_indice()
+        mes_da_chave = self._mes_da_chave
+        return [chave in mes_da_chave for chave in chaves]
+
+    def obter(self, chave: str) -> Optional[dict]:
+        self._carregar_indice()
+        mes = self._mes_da_chave.get(chave)
+        if mes is None:
+            return None
+        return self._carregar_particao(mes).get(chave)
+
+    def total(self) -> int:
+        self._carregar_indice()
+        return len(self._mes_da_chave)
+
+    def _carregar_por_produto(self) -> Dict[str, List[str]]:
+        if self._por_produto is not None:
+            return self._por_produto
+
+        por_produto: Dict[str, List[str]] = {}
+        for mes in self.meses():
+            # Leitura direta: não ocupa o cache de partições
+            try:
+                notas = self._ler_particao(mes)
+            except (OSError, EOFError, json.JSONDecodeError) as e:
+                print(f"Aviso: Erro ao carregar a partição {mes} do arquivo de notas: {e}")
+                continue
+            for chave, registro in notas.items():
+                for codigo in registro.get("codigos_produtos") or []:
+                    por_produto.setdefault(str(codigo), []).append(chave)
+        self._por_produto = por_produto
+        return por_produto
+
+    def notas_por_produto(self, codigo: str) -> List[dict]:
+        """Notas arquivadas que alteraram o preço do produto."""
+        notas = (self.obter(chave) for chave in self._carregar_por_produto().get(str(codigo), ()))
+        return [registro for registro in notas if registro is not None]
+
+    def ultimas_notas_produtos(self, codigos: List[str]) -> Dict[str, dict]:
+        """Última nota arquivada de cada produto (produtos sem nota ficam de fora)."""
+        ultimas = {}
+        for codigo in codigos:
+            notas = self.notas_por_produto(codigo)
+            if notas:
+                ultimas[str(codigo)] = max(notas, key=lambda registro: IndicesNotas.momento(registro) or "")
+        return ultimas
+
+    def meses(self) -> List[str]:
+        return sorted(self._carregar_indice())
+
+    def notas_entre(self, inicio: str, fim: str) -> List[dict]:
+        """Notas arquivadas entre as datas "AAAA-MM-DD", lendo só os meses do período."""
+        notas = []
+        for mes in self.meses():
+            if mes == self.SEM_DATA or mes < inicio[:7] or mes > fim[:7]:
+                continue
+            for registro in self._carregar_particao(mes).values():
+                momento = IndicesNotas.momento(registro) or ""
+                if inicio <= momento[:10] <= fim:
+                    notas.append(registro)
+        return sorted(notas, key=lambda registro: IndicesNotas.momento(registro) or "")
+
+    def listar(self) -> List[dict]:
+        notas = []
+        for mes in self.meses():
+            notas.extend(self._carregar_particao(mes).values())
+        return notas
+
+    def arquivar(self, notas: Dict[str, dict]) -> int:
+        """
+        Acrescenta notas às partições mensais. Notas já arquivadas são
+        sobrescritas, então repetir o arquivamento não duplica nada.
+
+        Returns:
+            Quantidade de notas arquivadas
+        """
+        if not notas:
+            return 0
+
+        por_mes: Dict[str, Dict[str, dict]] = {}
+        for chave, registro in notas.items():
+            por_mes.setdefault(self.mes(registro), {})[chave] = registro
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        with TravaArquivo(os.path.join(self.diretorio, "arquivo.lock"), self.espera_trava):
+            # Relê sob a trava para incorporar o que outras estações arquivaram
+            self._limpar_cache()
+            indice = self._carregar_indice()
+
+            for mes, notas_mes in por_mes.items():
+                particao = self._ler_particao(mes)
+                particao.update(notas_mes)
+                dados = json.dumps(particao, ensure_ascii=False, separators=(",", ":"))
+                self._gravar_atomico(self._caminho_particao(mes), gzip.compress(dados.encode("utf-8")))
+                indice[mes] = sorted(particao)
+
+            self._gravar_atomico(self.arquivo_indice, json.dumps(indice, separators=(",", ":")).encode("utf-8"))
+            self._limpar_cache()
+
+        return len(notas)
+
+    @staticmethod
+    def _gravar_atomico(caminho: str, dados: bytes) -> None:
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(dados)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
@@ -0,0 +1,869 @@
+import atexit
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from controller.trava_arquivo import TravaArquivo
+
+
+def assinatura_arquivos(*arquivos: str) -> tuple:
+    """(mtime, tamanho) de cada arquivo, para detectar gravações de outras estações."""
+    assinatura = []
+    for arquivo in arquivos:
+        try:
+            estado = os.stat(arquivo)
+            assinatura.append((estado.st_mtime_ns, estado.st_size))
+        except OSError:
+            assinatura.append(None)
+    return tuple(assinatura)
+
+
+def _executar_ao_gravar(funcoes: List[Callable[[], None]]) -> None:
+    """Executa as funções informadas para depois da gravação em disco."""
+    for funcao in funcoes:
+        try:
+            funcao()
+        except Exception as e:
+            print(f"Aviso: Erro após gravar notas processadas: {e}")
+
+
+class IndicesNotas:
+    """
+    Índices secundários das notas mantidas em memória: código de produto,
+    usuário e data/hora de processamento (lista ordenada, para consultas
+    por período e limpeza sem percorrer todas as notas).
+    """
+
+    def __init__(self, notas: Optional[Dict[str, dict]] = None):
+        self.reconstruir(notas or {})
+
+    def reconstruir(self, notas: Dict[str, dict]) -> None:
+        self.por_produto: Dict[str, set] = {}
+        self.por_usuario: Dict[str, set] = {}
+        self.por_data: List[tuple] = []
+        for chave, registro in notas.items():
+            self._indexar(chave, registro, ordenado=False)
+        self.por_data.sort()
+
+    @staticmethod
+    def momento(registro: dict) -> Optional[str]:
+        """"AAAA-MM-DD HH:MM:SS" do processamento, ou None se a data for inválida."""
+        data = registro.get("data")
+        if not isinstance(data, str) or len(data) != 10 or data[4] != "-" or data[7] != "-":
+            return None
+        return f"{data} {registro.get('hora') or ''}"
+
+    def _indexar(self, chave: str, registro: dict, ordenado: bool = True) -> None:
+        for codigo in registro.get("codigos_produtos") or []:
+            self.por_produto.setdefault(str(codigo), set()).add(chave)
+        self.por_usuario.setdefault(str(registro.get("usuario", "")), set()).add(chave)
+
+        momento = self.momento(registro)
+        if momento is not None:
+            if ordenado:
+                insort(self.por_data, (momento, chave))
+            else:
+                self.por_data.append((momento, chave))
+
+    def adicionar(self, chave: str, registro: dict, anterior: Optional[dict] = None) -> None:
+        if anterior is not None:
+            self.remover(chave, anterior)
+        self._indexar(chave, registro)
+
+    def remover(self, chave: str, registro: dict) -> None:
+        for codigo in registro.get("codigos_produtos") or []:
+            self._descartar(self.por_produto, str(codigo), chave)
+        self._descartar(self.por_usuario, str(registro.get("usuario", "")), chave)
+
+        momento = self.momento(registro)
+        if momento is not None:
+            posicao = bisect_left(self.por_data, (momento, chave))
+            if posicao < len(self.por_data) and self.por_data[posicao] == (momento, chave):
+                del self.por_data[posicao]
+
+    @staticmethod
+    def _descartar(indice: Dict[str, set], valor: str, chave: str) -> None:
+        chaves = indice.get(valor)
+        if chaves is not None:
+            chaves.discard(chave)
+            if not chaves:
+                del indice[valor]
+
+    def chaves_entre(self, inicio: str, fim: str) -> List[str]:
+        """Chaves processadas entre as datas "AAAA-MM-DD" (inclusive), em ordem cronológica."""
+        primeiro = bisect_left(self.por_data, (inicio,))
+        # "~" é maior que o espaço que separa data e hora
+        ultimo = bisect_left(self.por_data, (fim + "~",))
+        return [chave for _, chave in self.por_data[primeiro:ultimo]]
+
+    def chaves_anteriores(self, limite: str) -> List[str]:
+        """Chaves processadas antes da data "AAAA-MM-DD"."""
+        ultimo = bisect_left(self.por_data, (limite,))
+        return [chave for _, chave in self.por_data[:ultimo]]
+
+
+class ArmazenamentoMemoria:
+    """
+    Base dos armazenamentos que mantêm todas as notas em um dicionário
+    (json e jsonl), com os índices secundários atualizados a cada alteração.
+    """
+
+    def _definir_notas(self, notas: Dict[str, dict]) -> None:
+        self.notas = notas
+        self.indices = IndicesNotas(notas)
+
+    def _gravar_memoria(self, chave: str, registro: dict) -> None:
+        self.indices.adicionar(chave, registro, self.notas.get(chave))
+        self.notas[chave] = registro
+
+    def _remover_memoria(self, chave: str) -> None:
+        registro = self.notas.pop(chave, None)
+        if registro is not None:
+            self.indices.remover(chave, registro)
+
+    def contem(self, chave: str) -> bool:
+        return chave in self.notas
+
+    def contem_varias(self, chaves: List[str]) -> List[bool]:
+        notas = self.notas
+        return [chave in notas for chave in chaves]
+
+    def obter(self, chave: str) -> Optional[dict]:
+        return self.notas.get(chave)
+
+    def listar(self) -> List[dict]:
+        return list(self.notas.values())
+
+    def total(self) -> int:
+        return len(self.notas)
+
+    def notas_por_produto(self, codigo: str) -> List[dict]:
+        return [self.notas[chave] for chave in self.indices.por_produto.get(str(codigo), ())]
+
+    def notas_por_usuario(self, usuario: str) -> List[dict]:
+        return [self.notas[chave] for chave in self.indices.por_usuario.get(str(usuario), ())]
+
+    def notas_entre(self, inicio: str, fim: str) -> List[dict]:
+        return [self.notas[chave] for chave in self.indices.chaves_entre(inicio, fim)]
+
+    def ultimas_notas_produtos(self, codigos: List[str]) -> Dict[str, dict]:
+        ultimas = {}
+        for codigo in codigos:
+            notas = self.notas_por_produto(codigo)
+            if notas:
+                ultimas[str(codigo)] = max(notas, key=lambda registro: IndicesNotas.momento(registro) or "")
+        return ultimas
+
+
+class ArmazenamentoJSON(ArmazenamentoMemoria):
+    """
+    Armazenamento original: todas as notas em um único arquivo JSON,
+    mantidas em um dicionário em memória.
+
+    Cada gravação trava o arquivo entre processos, relê o que outras
+    estações gravaram desde a última leitura e só então reescreve o arquivo,
+    para que nenhuma nota registrada em paralelo seja perdida. O arquivo é
+    escrito em um temporário e substituído com os.replace, então uma queda
+    de energia nunca deixa o histórico pela metade.
+
+    Com `agrupar_ms` > 0, as gravações feitas dentro dessa janela são
+    reunidas em uma única escrita, feita em segundo plano; o `ao_gravar` de
+    cada gravação só é chamado depois que essa escrita termina.
+    """
+
+    nome = "json"
+
+    def __init__(self, arquivo_json: str, espera_trava: float = 10.0, agrupar_ms: int = 0):
+        self.arquivo_json = arquivo_json
+        self.arquivo_trava = arquivo_json + ".lock"
+        self.espera_trava = espera_trava
+        self.agrupar_ms = agrupar_ms
+        self._assinatura_lida = None
+        # chave -> registro (None = remoção) ainda não escritos no arquivo
+        self._pendentes: Dict[str, Optional[dict]] = {}
+        # Chamadas quando as gravações pendentes estiverem no arquivo
+        self._ao_gravar: List[Callable[[], None]] = []
+        self._trava = threading.Lock()
+        self._agendamento: Optional[threading.Timer] = None
+        self._definir_notas({})
+        self.carregar()
+        if agrupar_ms:
+            atexit.register(self.descarregar)
+
+    def carregar(self) -> None:
+        """
+        Carrega as notas processadas do arquivo JSON.
+        Se o arquivo não existir, inicializa com dicionário vazio.
+
+        Se o arquivo não puder ser lido (corrompido), uma cópia é guardada e
+        as notas ficam vazias em memória, mas nenhuma gravação sobrescreve o
+        arquivo enquanto ele não for corrigido ou removido: cada gravação
+        relê o arquivo antes e falha.
+        """
+        self._assinatura_lida = self.assinatura()
+        if os.path.exists(self.arquivo_json):
+            try:
+                with open(self.arquivo_json, "r", encoding="utf-8") as f:
+                    self._definir_notas(json.load(f))
+            except Exception as e:
+                print(f"Aviso: Erro ao carregar {self.arquivo_json}: {e}")
+                if isinstance(e, ValueError):
+                    copia = self._guardar_copia_corrompida()
+                    if copia:
+                        print(f"Aviso: Cópia do arquivo corrompido guardada em {copia}")
+                print("Aviso: Notas processadas não serão gravadas até o arquivo ser corrigido ou removido")
+                self._definir_notas({})
+                # Força a releitura (que falha) antes de qualquer gravação
+                self._assinatura_lida = None
+        else:
+            self._definir_notas({})
+
+    def _guardar_copia_corrompida(self) -> Optional[str]:
+        copia = f"{self.arquivo_json}.corrompido-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        try:
+            shutil.copy2(self.arquivo_json, copia)
+            return copia
+        except OSError as e:
+            print(f"Aviso: Não foi possível copiar {self.arquivo_json}: {e}")
+            return None
+
+    def recarregar(self) -> None:
+        """
+        Relê o arquivo, mantendo as gravações ainda não escritas; em caso de
+        erro mantém as notas atuais.
+        """
+        assinatura = self.assinatura()
+        if assinatura == self._assinatura_lida:
+            # A última alteração foi a escrita deste próprio processo
+            return
+        if not os.path.exists(self.arquivo_json):
+            notas = {}
+        else:
+            try:
+                with open(self.arquivo_json, "r", encoding="utf-8") as f:
+                    notas = json.load(f)
+            except ValueError as e:
+                raise Exception(
+                    f"{self.arquivo_json} está corrompido ({e}); corrija ou remova o arquivo "
+                    "para voltar a registrar notas"
+                )
+
+        with self._trava:
+            self._definir_notas(notas)
+            self._reaplicar_pendentes()
+            self._assinatura_lida = assinatura
+
+    def _reaplicar_pendentes(self) -> None:
+        for chave, registro in self._pendentes.items():
+            if registro is None:
+                self._remover_memoria(chave)
+            else:
+                self._gravar_memoria(chave, registro)
+
+    def assinatura(self) -> Optional[tuple]:
+        return assinatura_arquivos(self.arquivo_json)
+
+    def assinatura_lida(self) -> Optional[tuple]:
+        """Assinatura do arquivo cujo conteúdo está em memória."""
+        return self._assinatura_lida
+
+    def salvar(self) -> None:
+        """
+        Salva as notas processadas no arquivo JSON (temporário + os.replace).
+        """
+        temporario = self.arquivo_json + ".tmp"
+        try:
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(self.notas, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.arquivo_json)
+            self._assinatura_lida = self.assinatura()
+        except Exception as e:
+            print(f"Erro ao salvar {self.arquivo_json}: {e}")
+            raise
+
+    def descarregar(self) -> None:
+        """
+        Escreve no arquivo as gravações pendentes, incorporando antes o que
+        outras estações gravaram.
+        """
+        if not self._pendentes:
+            return
+        with TravaArquivo(self.arquivo_trava, self.espera_trava):
+            with self._trava:
+                if self._agendamento is not None:
+                    self._agendamento.cancel()
+                    self._agendamento = None
+                if not self._pendentes:
+                    return
+            # recarregar reaplica as pendentes sobre o que está no arquivo
+            self.recarregar()
+            with self._trava:
+                self.salvar()
+                self._pendentes = {}
+                ao_gravar, self._ao_gravar = self._ao_gravar, []
+        _executar_ao_gravar(ao_gravar)
+
+    def _descarregar_em_segundo_plano(self) -> None:
+        try:
+            self.descarregar()
+        except Exception as e:
+            # As gravações continuam pendentes e vão na próxima escrita
+            print(f"Aviso: Erro ao gravar {self.arquivo_json}: {e}")
+            with self._trava:
+                self._agendamento = None
+
+    def _alterar(
+        self, alteracoes: Dict[str, Optional[dict]], ao_gravar: Optional[Callable[[], None]] = None
+    ) -> None:
+        with self._trava:
+            self._pendentes.update(alteracoes)
+            if ao_gravar is not None:
+                self._ao_gravar.append(ao_gravar)
+            for chave, registro in alteracoes.items():
+                if registro is None:
+                    self._remover_memoria(chave)
+                else:
+                    self._gravar_memoria(chave, registro)
+
+            if self.agrupar_ms:
+                if self._agendamento is None:
+                    self._agendamento = threading.Timer(
+                        self.agrupar_ms / 1000, self._descarregar_em_segundo_plano
+                    )
+                    self._agendamento.daemon = True
+                    self._agendamento.start()
+                return
+
+        self.descarregar()
+
+    def gravar(self, chave: str, registro: dict, ao_gravar: Optional[Callable[[], None]] = None) -> None:
+        self._alterar({chave: registro}, ao_gravar)
+
+    def gravar_varias(self, registros: Dict[str, dict], ao_gravar: Optional[Callable[[], None]] = None) -> None:
+        self._alterar(dict(registros), ao_gravar)
+
+    def notas_anteriores(self, limite: datetime) -> Dict[str, dict]:
+        self.descarregar()
+        with TravaArquivo(self.arquivo_trava, self.espera_trava):
+            self.recarregar()
+            return {
+                chave: self.notas[chave]
+                for chave in self.indices.chaves_anteriores(limite.strftime("%Y-%m-%d"))
+            }
+
+    def remover(self, chaves: List[str]) -> None:
+        self._alterar({chave: None for chave in chaves})
+
+    def fechar(self) -> None:
+        self.descarregar()
+
+
+class ArmazenamentoJournal(ArmazenamentoMemoria):
+    """
+    Armazenamento em diário (journal) somente de acréscimo.
+
+    Cada gravação acrescenta uma linha JSON em notas_processadas.jsonl e faz
+    fsync, em tempo constante. A leitura aplica o diário sobre o snapshot
+    notas_processadas.json (mesmo formato do backend "json"). Quando o diário
+    passa de `compactar_apos` linhas, uma thread reescreve o snapshot de forma
+    atômica e descarta o diário.
+
+    Acréscimos, leituras e compactação usam a mesma trava entre processos,
+    então várias estações podem gravar no mesmo diário. Antes de cada
+    acréscimo, as linhas que outras estações acrescentaram desde a última
+    leitura são aplicadas, a partir da posição já lida do diário.
+    """
+
+    nome = "jsonl"
+
+    def __init__(self, arquivo_json: str, compactar_apos: int = 1000, espera_trava: float = 10.0):
+        self.arquivo_json = arquivo_json
+        self.arquivo_diario = os.path.splitext(arquivo_json)[0] + ".jsonl"
+        self.arquivo_trava = arquivo_json + ".lock"
+        self.compactar_apos = compactar_apos
+        self.espera_trava = espera_trava
+        self._definir_notas({})
+        self.linhas_diario = 0
+        # Bytes do diário já aplicados e estado do snapshot lido: se o
+        # snapshot mudar (compactação de outra estação), tudo é relido
+        self._posicao_diario = 0
+        self._estado_snapshot = None
+        self._assinatura_lida = None
+        self._trava = threading.Lock()
+        self._compactacao: Optional[threading.Thread] = None
+        self.carregar()
+
+    def carregar(self) -> None:
+        """
+        Carrega o snapshot e reaplica o diário. Uma última linha incompleta
+        (queda durante a gravação) é ignorada; o snapshot nunca fica truncado
+        porque só é substituído por os.replace.
+        """
+        with TravaArquivo(self.arquivo_trava, self.espera_trava):
+            self._ler()
+
+    def _ler(self) -> None:
+        notas_anteriores, indices_anteriores = self.notas, self.indices
+        self._definir_notas({})
+        self.linhas_diario = 0
+
+        try:
+            estado_snapshot = self._estado_arquivo(self.arquivo_json)
+            if estado_snapshot is not None:
+                with open(self.arquivo_json, "r", encoding="utf-8") as f:
+                    self._definir_notas(json.load(f))
+            self.linhas_diario, self._posicao_diario = self._aplicar_diario(self.arquivo_diario)
+        except Exception:
+            self.notas, self.indices = notas_anteriores, indices_anteriores
+            raise
+
+        self._estado_snapshot = estado_snapshot
+        self._assinatura_lida = self.assinatura()
+
+    @staticmethod
+    def _estado_arquivo(arquivo: str) -> Optional[tuple]:
+        try:
+            estado = os.stat(arquivo)
+        except OSError:
+            return None
+        return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+    def _atualizar(self) -> None:
+        """
+        Traz para a memória o que outras estações gravaram desde a última
+        leitura: só as linhas novas do diário, ou tudo se o snapshot foi
+        reescrito. Deve ser chamado com a trava entre processos.
+        """
+        estado_diario = self._estado_arquivo(self.arquivo_diario)
+        tamanho_diario = estado_diario[2] if estado_diario else 0
+        if (
+            self._estado_arquivo(self.arquivo_json) != self._estado_snapshot
+            or tamanho_diario < self._posicao_diario
+        ):
+            self._ler()
+            return
+
+        if tamanho_diario > self._posicao_diario:
+            aplicadas, self._posicao_diario = self._aplicar_diario(self.arquivo_diario, self._posicao_diario)
+            self.linhas_diario += aplicadas
+        self._assinatura_lida = self.assinatura()
+
+    def recarregar(self) -> None:
+        with self._trava:
+            with TravaArquivo(self.arquivo_trava, self.espera_trava):
+                self._atualizar()
+
+    def assinatura(self) -> Optional[tuple]:
+        return assinatura_arquivos(self.arquivo_json, self.arquivo_diario)
+
+    def assinatura_lida(self) -> Optional[tuple]:
+        """Assinatura dos arquivos cujo conteúdo está em memória."""
+        return self._assinatura_lida
+
+    def _aplicar_diario(self, arquivo: str, inicio: int = 0) -> tuple:
+        """
+        Aplica as linhas completas do diário a partir do byte `inicio`.
+
+        Returns:
+            (linhas aplicadas, posição após a última linha completa)
+        """
+        if not os.path.exists(arquivo):
+            return 0, 0
+
+        with open(arquivo, "rb") as f:
+            f.seek(inicio)
+            conteudo = f.read()
+
+        # Última linha sem "\n": gravação interrompida, descartada no próximo acréscimo
+        conteudo = conteudo[:conteudo.rfind(b"\n") + 1]
+
+        aplicadas = 0
+        for linha in conteudo.decode("utf-8").splitlines():
+            if not linha.strip():
+                continue
+            try:
+                operacao = json.loads(linha)
+            except json.JSONDecodeError:
+                print(f"Aviso: Linha inválida ignorada em {arquivo}")
+                continue
+            self._aplicar(operacao)
+            aplicadas += 1
+
+        return aplicadas, inicio + len(conteudo)
+
+    def _aplicar(self, operacao: dict) -> None:
+        if operacao.get("op") == "set":
+            self._gravar_memoria(operacao["chave"], operacao["registro"])
+        elif operacao.get("op") == "del":
+            for chave in operacao.get("chaves", []):
+                self._remover_memoria(chave)
+
+    def _descartar_linha_incompleta(self) -> None:
+        """Remove a última linha incompleta para que o acréscimo não seja colado nela."""
+        try:
+            with open(self.arquivo_diario, "r+b") as f:
+                tamanho = f.seek(0, os.SEEK_END)
+                if tamanho == 0:
+                    return
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) == b"\n":
+                    return
+                f.seek(0)
+                fim = f.read().rfind(b"\n") + 1
+                print(f"Aviso: Última gravação incompleta descartada em {self.arquivo_diario}")
+                f.truncate(fim)
+        except FileNotFoundError:
+            pass
+
+    def _acrescentar(self, operacoes: List[dict]) -> None:
+        """
+        Acrescenta as operações ao diário com um único fsync, depois de
+        aplicar o que outras estações acrescentaram desde a última leitura.
+        """
+        linhas = "".join(
+            json.dumps(operacao, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for operacao in operacoes
+        ).encode("utf-8")
+        with self._trava:
+            with TravaArquivo(self.arquivo_trava, self.espera_trava):
+                self._atualizar()
+                self._descartar_linha_incompleta()
+                with open(self.arquivo_diario, "ab") as f:
+                    f.write(linhas)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._posicao_diario = f.tell()
+                for operacao in operacoes:
+                    self._aplicar(operacao)
+                self.linhas_diario += len(operacoes)
+                # Ainda com a trava: o diário só tem o que já está em memória
+                self._assinatura_lida = self.assinatura()
+
+        if self.linhas_diario >= self.compactar_apos:
+            self.compactar(em_segundo_plano=True)
+
+    def compactar(self, em_segundo_plano: bool = False) -> None:
+        """
+        Reescreve o snapshot com o estado em disco (inclusive o que outras
+        estações acrescentaram) e descarta o diário.
+
+        Args:
+            em_segundo_plano: Executa em uma thread, sem bloquear a interface
+        """
+        if self._compactacao is not None and self._compactacao.is_alive():
+            return
+
+        if em_segundo_plano:
+            self._compactacao = threading.Thread(target=self._compactar, daemon=True)
+            self._compactacao.start()
+        else:
+            self._compactar()
+
+    def _compactar(self) -> None:
+        try:
+            with self._trava:
+                with TravaArquivo(self.arquivo_trava, self.espera_trava):
+                    if not os.path.exists(self.arquivo_diario):
+                        return
+                    self._ler()
+                    self._gravar_snapshot(self.notas)
+                    # Se cair antes daqui, o diário é reaplicado sobre o snapshot
+                    # novo sem efeito, pois as operações são idempotentes
+                    os.remove(self.arquivo_diario)
+                    self.linhas_diario = 0
+                    self._assinatura_lida = self.assinatura()
+        except Exception as e:
+            print(f"Aviso: Erro ao compactar {self.arquivo_diario}: {e}")
+
+    def _gravar_snapshot(self, snapshot: Dict[str, dict]) -> None:
+        temporario = self.arquivo_json + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.arquivo_json)
+
+    def gravar(self, chave: str, registro: dict, ao_gravar: Optional[Callable[[], None]] = None) -> None:
+        self._acrescentar([{"op": "set", "chave": chave, "registro": registro}])
+        if ao_gravar is not None:
+            _executar_ao_gravar([ao_gravar])
+
+    def gravar_varias(self, registros: Dict[str, dict], ao_gravar: Optional[Callable[[], None]] = None) -> None:
+        self._acrescentar([
+            {"op": "set", "chave": chave, "registro": registro}
+            for chave, registro in registros.items()
+        ])
+        if ao_gravar is not None:
+            _executar_ao_gravar([ao_gravar])
+
+    def notas_anteriores(self, limite: datetime) -> Dict[str, dict]:
+        with self._trava:
+            with TravaArquivo(self.arquivo_trava, self.espera_trava):
+                self._atualizar()
+            return {
+                chave: self.notas[chave]
+                for chave in self.indices.chaves_anteriores(limite.strftime("%Y-%m-%d"))
+            }
+
+    def remover(self, chaves: List[str]) -> None:
+        self._acrescentar([{"op": "del", "chaves": list(chaves)}])
+
+    def fechar(self) -> None:
+        if self._compactacao is not None:
+            self._compactacao.join()
+
+
+class ArmazenamentoSQLite:
+    """
+    Armazenamento em SQLite no modo WAL, com inserção em tempo constante e
+    índices por nota (fornecedor/nota/série), data e código de produto.
+
+    Na primeira abertura, importa o notas_processadas.json existente.
+
+    Atenção: o modo WAL exige que todos os processos estejam na mesma
+    máquina; não use este backend em pasta compartilhada pela rede.
+    """
+
+    nome = "sqlite"
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS notas (
+            chave TEXT PRIMARY KEY,
+            fornecedor TEXT NOT NULL,
+            nota TEXT NOT NULL,
+            serie TEXT NOT NULL,
+            data TEXT,
+            hora TEXT,
+            usuario TEXT,
+            produtos_editados INTEGER,
+            dados TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_notas_fornecedor_nota_serie
+            ON notas (fornecedor, nota, serie);
+        CREATE INDEX IF NOT EXISTS idx_notas_data ON notas (data, hora);
+        CREATE INDEX IF NOT EXISTS idx_notas_usuario ON notas (usuario);
+        CREATE TABLE IF NOT EXISTS notas_produtos (
+            chave TEXT NOT NULL REFERENCES notas (chave) ON DELETE CASCADE,
+            codigo TEXT NOT NULL,
+            PRIMARY KEY (chave, codigo)
+        );
+        CREATE INDEX IF NOT EXISTS idx_notas_produtos_codigo ON notas_produtos (codigo);
+        CREATE TABLE IF NOT EXISTS meta (
+            chave TEXT PRIMARY KEY,
+            valor TEXT
+        );
+    """
+
+    def __init__(self, arquivo_db: str, arquivo_json: Optional[str] = None, espera_trava: float = 10.0):
+        self.arquivo_db = arquivo_db
+        self.arquivo_json = arquivo_json
+        # IMMEDIATE: a transação reserva a escrita logo no início, e outro
+        # processo gravando faz esta aguardar até `espera_trava` segundos
+        self.conexao = sqlite3.connect(
+            arquivo_db, timeout=espera_trava, check_same_thread=False, isolation_level="IMMEDIATE"
+        )
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.execute("PRAGMA foreign_keys=ON")
+        self.conexao.executescript(self.ESQUEMA)
+        self._migrar_json()
+
+    def _migrar_json(self) -> None:
+        """Importa, uma única vez, o histórico do arquivo JSON legado."""
+        if not self.arquivo_json or not os.path.exists(self.arquivo_json):
+            return
+
+        migrado = self.conexao.execute(
+            "SELECT valor FROM meta WHERE chave = 'migrado_json'"
+        ).fetchone()
+        if migrado:
+            return
+
+        try:
+            with open(self.arquivo_json, "r", encoding="utf-8") as f:
+                notas = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Aviso: Não foi possível migrar {self.arquivo_json}: {e}")
+            return
+
+        with self.conexao:
+            for chave, registro in notas.items():
+                self._inserir(chave, registro)
+            self.conexao.execute(
+                "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('migrado_json', ?)",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),),
+            )
+
+        print(f"{len(notas)} nota(s) migrada(s) de {self.arquivo_json} para {self.arquivo_db}")
+
+    def _inserir(self, chave: str, registro: dict) -> None:
+        self.conexao.execute(
+            """
+            INSERT OR REPLACE INTO notas
+                (chave, fornecedor, nota, serie, data, hora, usuario, produtos_editados, dados)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                chave,
+                str(registro.get("fornecedor", "")),
+                str(registro.get("nota", "")),
+                str(registro.get("serie", "")),
+                registro.get("data"),
+                registro.get("hora"),
+                str(registro.get("usuario", "")),
+                int(registro.get("produtos_editados") or 0),
+                json.dumps(registro, ensure_ascii=False, separators=(",", ":")),
+            ),
+        )
+        self.conexao.execute("DELETE FROM notas_produtos WHERE chave = ?", (chave,))
+        self.conexao.executemany(
+            "INSERT OR IGNORE INTO notas_produtos (chave, codigo) VALUES (?, ?)",
+            [(chave, str(codigo)) for codigo in registro.get("codigos_produtos") or []],
+        )
+
+    def recarregar(self) -> None:
+        pass
+
+    def assinatura(self) -> Optional[tuple]:
+        # Consultas vão direto ao arquivo: gravações de outros processos já
+        # são visíveis sem recarregar
+        return None
+
+    def assinatura_lida(self) -> Optional[tuple]:
+        return None
+
+    def contem(self, chave: str) -> bool:
+        return self.conexao.execute(
+            "SELECT 1 FROM notas WHERE chave = ?", (chave,)
+        ).fetchone() is not None
+
+    def contem_varias(self, chaves: List[str]) -> List[bool]:
+        encontradas = set()
+        unicas = list(set(chaves))
+        for inicio in range(0, len(unicas), 500):
+            lote = unicas[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(lote))
+            encontradas.update(
+                linha[0]
+                for linha in self.conexao.execute(
+                    f"SELECT chave FROM notas WHERE chave IN ({marcadores})", lote
+                )
+            )
+        return [chave in encontradas for chave in chaves]
+
+    def obter(self, chave: str) -> Optional[dict]:
+        linha = self.conexao.execute(
+            "SELECT dados FROM notas WHERE chave = ?", (chave,)
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def gravar(self, chave: str, registro: dict, ao_gravar: Optional[Callable[[], None]] = None) -> None:
+        with self.conexao:
+            self._inserir(chave, registro)
+        if ao_gravar is not None:
+            _executar_ao_gravar([ao_gravar])
+
+    def gravar_varias(self, registros: Dict[str, dict], ao_gravar: Optional[Callable[[], None]] = None) -> None:
+        with self.conexao:
+            for chave, registro in registros.items():
+                self._inserir(chave, registro)
+        if ao_gravar is not None:
+            _executar_ao_gravar([ao_gravar])
+
+    def listar(self) -> List[dict]:
+        return [json.loads(linha[0]) for linha in self.conexao.execute("SELECT dados FROM notas")]
+
+    def total(self) -> int:
+        return self.conexao.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+
+    def notas_por_produto(self, codigo: str) -> List[dict]:
+        linhas = self.conexao.execute(
+            """
+            SELECT n.dados FROM notas_produtos p
+            JOIN notas n ON n.chave = p.chave
+            WHERE p.codigo = ?
+            """,
+            (str(codigo),),
+        )
+        return [json.loads(linha[0]) for linha in linhas]
+
+    def notas_por_usuario(self, usuario: str) -> List[dict]:
+        linhas = self.conexao.execute("SELECT dados FROM notas WHERE usuario = ?", (str(usuario),))
+        return [json.loads(linha[0]) for linha in linhas]
+
+    def notas_entre(self, inicio: str, fim: str) -> List[dict]:
+        linhas = self.conexao.execute(
+            "SELECT dados FROM notas WHERE data BETWEEN ? AND ? ORDER BY data, hora",
+            (inicio, fim),
+        )
+        return [json.loads(linha[0]) for linha in linhas]
+
+    def ultimas_notas_produtos(self, codigos: List[str]) -> Dict[str, dict]:
+        codigos = [str(codigo) for codigo in codigos]
+        ultimas = {}
+        momentos = {}
+        # Limite de parâmetros por instrução do SQLite
+        for inicio in range(0, len(codigos), 500):
+            lote = codigos[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(lote))
+            linhas = self.conexao.execute(
+                f"""
+                SELECT p.codigo, n.data || ' ' || IFNULL(n.hora, ''), n.dados
+                FROM notas_produtos p
+                JOIN notas n ON n.chave = p.chave
+                WHERE p.codigo IN ({marcadores})
+                """,
+                lote,
+            )
+            for codigo, momento, dados in linhas:
+                if codigo not in momentos or (momento or "") > momentos[codigo]:
+                    momentos[codigo] = momento or ""
+                    ultimas[codigo] = dados
+        return {codigo: json.loads(dados) for codigo, dados in ultimas.items()}
+
+    def notas_anteriores(self, limite: datetime) -> Dict[str, dict]:
+        linhas = self.conexao.execute(
+            "SELECT chave, dados FROM notas WHERE data < ?", (limite.strftime("%Y-%m-%d"),)
+        )
+        return {chave: json.loads(dados) for chave, dados in linhas}
+
+    def remover(self, chaves: List[str]) -> None:
+        chaves = list(chaves)
+        with self.conexao:
+            for inicio in range(0, len(chaves), 500):
+                lote = chaves[inicio:inicio + 500]
+                marcadores = ",".join("?" * len(lote))
+                self.conexao.execute(f"DELETE FROM notas WHERE chave IN ({marcadores})", lote)
+
+    def fechar(self) -> None:
+        self.conexao.close()
+
+
+BACKENDS = ("json", "jsonl", "sqlite")
+
+
+def criar_armazenamento(backend: str, arquivo_json: str, opcoes: Optional[dict] = None):
+    """
+    Cria o armazenamento de notas processadas.
+
+    Args:
+        backend: "json" (arquivo único, padrão), "jsonl" (diário) ou "sqlite"
+        arquivo_json: Caminho do notas_processadas.json; os demais arquivos
+                      usam o mesmo nome com outra extensão
+        opcoes: Demais chaves da seção [NotasProcessadas] do config.ini
+    """
+    opcoes = opcoes or {}
+    espera_trava = float(opcoes.get("espera_trava", 10))
+    if backend == "jsonl":
+        return ArmazenamentoJournal(arquivo_json, int(opcoes.get("compactar_apos", 1000)), espera_trava)
+    if backend == "sqlite":
+        arquivo_db = os.path.splitext(arquivo_json)[0] + ".db"
+        return ArmazenamentoSQLite(arquivo_db, arquivo_json, espera_trava)
+    return ArmazenamentoJSON(arquivo_json, espera_trava, int(opcoes.get("agrupar_ms", 0)))
@@ -0,0 +1,212 @@
+import atexit
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from controller.trava_arquivo import TravaArquivo
+
+
+class IntencoesNotas:
+    """
+    Registro antecipado (write-ahead) das notas cujos preços estão sendo
+    gravados no banco.
+
+    A intenção é gravada antes da transação e concluída depois que a nota é
+    registrada como processada. Se o sistema cair entre o commit e o
+    registro, a intenção fica pendente e é reconciliada na próxima abertura
+    (Database.reconciliar_notas_pendentes).
+
+    Cada intenção guarda o processo que a registrou. Enquanto aberto, o
+    processo mantém travado um arquivo em <arquivo>_donos, e as intenções de
+    um processo ainda aberto (nesta ou em outra estação) nunca são
+    reconciliadas, pois a gravação pode estar em andamento.
+    """
+
+    def __init__(self, arquivo: str, espera_trava: float = 10.0):
+        """
+        Args:
+            arquivo: Arquivo JSON das intenções pendentes
+            espera_trava: Segundos aguardando outra estação que esteja gravando
+        """
+        self.arquivo = arquivo
+        self.arquivo_trava = arquivo + ".lock"
+        self.espera_trava = espera_trava
+        # Identifica este processo; o início evita confundir um PID reutilizado
+        self.dono = f"{socket.gethostname()}_{os.getpid()}_{int(time.time() * 1000)}"
+        self.pasta_donos = os.path.splitext(arquivo)[0] + "_donos"
+        self._trava_dono: Optional[TravaArquivo] = None
+
+    def _ler(self) -> Dict[str, dict]:
+        """Lê as intenções; deve ser chamado com a trava do arquivo."""
+        if not os.path.exists(self.arquivo):
+            return {}
+        try:
+            with open(self.arquivo, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError as e:
+            # Nunca sobrescrito: fica guardado para conferência manual
+            copia = f"{self.arquivo}.corrompido-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            os.replace(self.arquivo, copia)
+            print(f"Aviso: {self.arquivo} corrompido ({e}); movido para {copia}")
+            return {}
+
+    def _arquivo_dono(self, dono: str) -> str:
+        return os.path.join(self.pasta_donos, f"{dono}.lock")
+
+    def _marcar_processo_ativo(self) -> None:
+        """Trava, até o fim do processo, o arquivo que o identifica como aberto."""
+        if self._trava_dono is not None:
+            return
+        os.makedirs(self.pasta_donos, exist_ok=True)
+        trava = TravaArquivo(self._arquivo_dono(self.dono), espera=0)
+        trava.adquirir()
+        self._trava_dono = trava
+        atexit.register(self._liberar_processo)
+
+    def _liberar_processo(self) -> None:
+        if self._trava_dono is None:
+            return
+        self._trava_dono.liberar()
+        self._trava_dono = None
+        try:
+            os.remove(self._arquivo_dono(self.dono))
+        except OSError:
+            pass
+
+    def _dono_ativo(self, dono: str) -> bool:
+        """True se o processo que registrou a intenção ainda está aberto."""
+        if dono == self.dono:
+            return True
+        caminho = self._arquivo_dono(dono)
+        if not os.path.exists(caminho):
+            return False
+        trava = TravaArquivo(caminho, espera=0)
+        try:
+            trava.adquirir()
+        except TimeoutError:
+            return True
+        trava.liberar()
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+        return False
+
+    def _gravar(self, intencoes: Dict[str, dict]) -> None:
+        if not intencoes:
+            if os.path.exists(self.arquivo):
+                os.remove(self.arquivo)
+            return
+
+        temporario = self.arquivo + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(intencoes, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.arquivo)
+
+    def registrar(
+        self,
+        codigo_fornecedor: str,
+        numero_nota: str,
+        serie: str,
+        usuario: str,
+        produtos: List[tuple],
+    ) -> str:
+        """
+        Registra a intenção de gravar os preços de uma nota.
+
+        Args:
+            produtos: Lista de (codigo, preco_venda_novo)
+
+        Returns:
+            Identificador da intenção
+        """
+        return self.registrar_varias([(codigo_fornecedor, numero_nota, serie, produtos)], usuario)[0]
+
+    def registrar_varias(self, notas: List[tuple], usuario: str, momento: Optional[str] = None) -> List[str]:
+        """
+        Registra as intenções de várias notas gravadas na mesma transação,
+        com uma única escrita do arquivo.
+
+        Args:
+            notas: Tuplas (codigo_fornecedor, numero_nota, serie, produtos), com
+                produtos como lista de (codigo, preco_venda_novo)
+            usuario: Código do usuário que está gravando
+            momento: Data/hora do servidor ("AAAA-MM-DD HH:MM:SS") antes da
+                transação; a reconciliação só aceita alterações a partir dele
+
+        Returns:
+            Identificadores das intenções, na ordem das notas
+        """
+        agora = datetime.now()
+        estacao = socket.gethostname()
+        ids = []
+
+        self._marcar_processo_ativo()
+        with TravaArquivo(self.arquivo_trava, self.espera_trava):
+            intencoes = self._ler()
+            for codigo_fornecedor, numero_nota, serie, produtos in notas:
+                intencao_id = f"{agora.strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:4]}"
+                intencoes[intencao_id] = {
+                    "id": intencao_id,
+                    "fornecedor": str(codigo_fornecedor),
+                    "nota": str(numero_nota),
+                    "serie": str(serie),
+                    "usuario": str(usuario),
+                    "data": agora.strftime("%Y-%m-%d"),
+                    "hora": agora.strftime("%H:%M:%S"),
+                    "momento": momento,
+                    "estacao": estacao,
+                    "dono": self.dono,
+                    "produtos": [[str(codigo), round(float(preco), 2)] for codigo, preco in produtos],
+                }
+                ids.append(intencao_id)
+            self._gravar(intencoes)
+
+        return ids
+
+    def concluir(self, intencao_id: str) -> None:
+        """Remove a intenção (nota registrada ou transação desfeita)."""
+        self.concluir_varias([intencao_id])
+
+    def concluir_varias(self, ids: List[str]) -> None:
+        with TravaArquivo(self.arquivo_trava, self.espera_trava):
+            intencoes = self._ler()
+            removidas = [intencao_id for intencao_id in ids if intencoes.pop(intencao_id, None) is not None]
+            if removidas:
+                self._gravar(intencoes)
+
+    def pendentes(self, estacao: Optional[str] = None, minutos: int = 60) -> List[dict]:
+        """
+        Lista as intenções pendentes que podem ser reconciliadas: as de
+        processos que já foram fechados. Intenções antigas, sem o processo
+        registrado, seguem a regra anterior: as desta estação e as de outras
+        estações com mais de `minutos`.
+        """
+        if not os.path.exists(self.arquivo):
+            return []
+
+        estacao = estacao or socket.gethostname()
+        agora = datetime.now()
+        with TravaArquivo(self.arquivo_trava, self.espera_trava):
+            intencoes = self._ler()
+
+        pendentes = []
+        for intencao in intencoes.values():
+            dono = intencao.get("dono")
+            if dono:
+                if not self._dono_ativo(dono):
+                    pendentes.append(intencao)
+                continue
+            try:
+                momento = datetime.strptime(f"{intencao['data']} {intencao['hora']}", "%Y-%m-%d %H:%M:%S")
+            except (KeyError, ValueError):
+                momento = agora
+            if intencao.get("estacao") == estacao or (agora - momento).total_seconds() >= minutos * 60:
+                pendentes.append(intencao)
+        return pendentes
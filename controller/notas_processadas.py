@@ -1,25 +1,119 @@
-import json
+import configparser
 import os
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from controller.notas_arquivo import ArquivoNotas
+from controller.notas_backends import BACKENDS, IndicesNotas, criar_armazenamento
+from controller.notas_pendentes import IntencoesNotas
 
 
 class NotasProcessadasManager:
     """
     Gerencia o rastreamento de notas fiscais que já tiveram seus preços ajustados.
-    Utiliza arquivo JSON para persistência sem modificar o banco de dados original.
+    A persistência é feita fora do banco de dados original, em JSON (padrão),
+    diário JSON-lines ou SQLite, conforme a seção [NotasProcessadas] do config.ini.
+
+    Notas antigas podem ser movidas para um arquivo morto particionado por mês
+    (arquivar_notas_antigas), que só é lido quando uma delas é consultada.
     """
 
-    def __init__(self, arquivo_json: str = "notas_processadas.json"):
+    def __init__(
+        self,
+        arquivo_json: Optional[str] = None,
+        backend: Optional[str] = None,
+        config_file: str = "config.ini",
+    ):
         """
         Inicializa o gerenciador de notas processadas.
         
         Args:
-            arquivo_json: Caminho do arquivo JSON para armazenamento
+            arquivo_json: Caminho do arquivo JSON para armazenamento (padrão:
+                `arquivo` do config.ini, ou notas_processadas.json)
+            backend: "json", "jsonl" ou "sqlite" (padrão: lido do config.ini)
+            config_file: Arquivo de configuração usado quando backend ou
+                arquivo não são informados
         """
+        opcoes = self._ler_config(config_file)
+        arquivo_json = arquivo_json or opcoes.get("arquivo", "").strip() or "notas_processadas.json"
         self.arquivo_json = arquivo_json
-        self.notas: Dict[str, dict] = {}
-        self._carregar()
+        self.backend = backend or opcoes.get("backend", "json").strip().lower()
+        if self.backend not in BACKENDS:
+            self.backend = "json"
+        inicio = time.perf_counter()
+        self.armazenamento = criar_armazenamento(self.backend, arquivo_json, opcoes)
+        self._assinatura = self.armazenamento.assinatura()
+        self.arquivo = ArquivoNotas(
+            os.path.splitext(arquivo_json)[0] + "_arquivo",
+            float(opcoes.get("espera_trava", 10)),
+        )
+        # Notas com preço sendo gravado no banco (ver Database.atualizar_precos)
+        self.intencoes = IntencoesNotas(
+            os.path.splitext(arquivo_json)[0] + "_pendentes.json",
+            float(opcoes.get("espera_trava", 10)),
+        )
+        # Notas com mais de X dias vão para o arquivo morto (0 = nunca)
+        self.manter_dias = int(opcoes.get("manter_dias", 0) or 0)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        # Carregamentos/tempo de leitura e quantas vezes os dados em memória
+        # foram reaproveitados sem reler o arquivo
+        self.estatisticas = {
+            "carregamentos": 1,
+            "tempo_carregamento_ms": duracao_ms,
+            "tempo_ultimo_carregamento_ms": duracao_ms,
+            "reaproveitamentos": 0,
+        }
+
+    def recarregar_se_alterado(self) -> bool:
+        """
+        Recarrega as notas apenas se o arquivo foi alterado (mtime/tamanho)
+        por outra estação ou processo desde a última leitura.
+        
+        Returns:
+            True se houve recarga, False se os dados em memória foram reaproveitados
+        """
+        self.arquivo.recarregar_se_alterado()
+        assinatura = self.armazenamento.assinatura()
+        if assinatura is None or assinatura == self._assinatura:
+            self.estatisticas["reaproveitamentos"] += 1
+            return False
+        if assinatura == self.armazenamento.assinatura_lida():
+            # Gravação deste processo (ex.: gravação agrupada concluída em
+            # segundo plano): a memória já reflete o arquivo
+            self._assinatura = assinatura
+            self.estatisticas["reaproveitamentos"] += 1
+            return False
+        
+        inicio = time.perf_counter()
+        try:
+            self.armazenamento.recarregar()
+        except Exception as e:
+            # Arquivo sendo gravado por outra estação: tenta de novo na próxima vez
+            print(f"Aviso: Erro ao recarregar {self.arquivo_json}: {e}")
+            return False
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        
+        self._assinatura = assinatura
+        self.estatisticas["carregamentos"] += 1
+        self.estatisticas["tempo_carregamento_ms"] += duracao_ms
+        self.estatisticas["tempo_ultimo_carregamento_ms"] = duracao_ms
+        return True
+
+    def _registrar_gravacao_propria(self) -> None:
+        # A alteração foi feita por este processo: o armazenamento informa a
+        # assinatura do que tem em memória (já com o que outras estações
+        # gravaram antes), nunca a do arquivo atual, que pode ter linhas
+        # acrescentadas por outra estação depois da gravação
+        self._assinatura = self.armazenamento.assinatura_lida()
+
+    def _ler_config(self, config_file: str) -> dict:
+        config = configparser.ConfigParser()
+        config.read(config_file, encoding="utf-8")
+        if not config.has_section("NotasProcessadas"):
+            return {}
+        return dict(config.items("NotasProcessadas"))
 
     def _gerar_chave(self, codigo_fornecedor: str, numero_nota: str, serie: str) -> str:
         """
@@ -38,33 +132,6 @@ class NotasProcessadasManager:
         nota = str(numero_nota).zfill(6)
         return f"{fornecedor}_{nota}_{serie}"
 
-    def _carregar(self) -> None:
-        """
-        Carrega as notas processadas do arquivo JSON.
-        Se o arquivo não existir, inicializa com dicionário vazio.
-        """
-        if os.path.exists(self.arquivo_json):
-            try:
-                with open(self.arquivo_json, "r", encoding="utf-8") as f:
-                    self.notas = json.load(f)
-            except (json.JSONDecodeError, Exception) as e:
-                print(f"Aviso: Erro ao carregar {self.arquivo_json}: {e}")
-                print("Criando novo arquivo de rastreamento...")
-                self.notas = {}
-        else:
-            self.notas = {}
-
-    def _salvar(self) -> None:
-        """
-        Salva as notas processadas no arquivo JSON.
-        """
-        try:
-            with open(self.arquivo_json, "w", encoding="utf-8") as f:
-                json.dump(self.notas, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Erro ao salvar {self.arquivo_json}: {e}")
-            raise
-
     def verificar_nota(
         self, codigo_fornecedor: str, numero_nota: str, serie: str = "1"
     ) -> bool:
@@ -80,7 +147,35 @@ class NotasProcessadasManager:
             True se a nota já foi processada, False caso contrário
         """
         chave = self._gerar_chave(codigo_fornecedor, numero_nota, serie)
-        return chave in self.notas
+        return self.armazenamento.contem(chave) or self.arquivo.contem(chave)
+
+    def verificar_notas(self, notas: Iterable[tuple]) -> List[bool]:
+        """
+        Verifica, de uma vez, quais notas já foram processadas.
+        
+        Args:
+            notas: Tuplas (codigo_fornecedor, numero_nota, serie)
+            
+        Returns:
+            Lista de booleanos na mesma ordem das notas informadas
+        """
+        chaves = [
+            f"{str(fornecedor).zfill(5)}_{str(nota).zfill(6)}_{serie}"
+            for fornecedor, nota, serie in notas
+        ]
+        if not chaves:
+            return []
+        
+        processadas = self.armazenamento.contem_varias(chaves)
+        
+        # Só consulta o arquivo morto para as que não estão no histórico recente
+        faltantes = [i for i, processada in enumerate(processadas) if not processada]
+        if faltantes:
+            arquivadas = self.arquivo.contem_varias([chaves[i] for i in faltantes])
+            for i, arquivada in zip(faltantes, arquivadas):
+                processadas[i] = arquivada
+        
+        return processadas
 
     def adicionar_nota(
         self,
@@ -90,6 +185,7 @@ class NotasProcessadasManager:
         usuario: str,
         produtos_editados: int,
         codigos_produtos: List[str] = None,
+        ao_gravar: Optional[Callable[[], None]] = None,
     ) -> None:
         """
         Registra uma nota como processada.
@@ -101,12 +197,52 @@ class NotasProcessadasManager:
             usuario: Código do usuário que processou
             produtos_editados: Quantidade de produtos que tiveram preço alterado
             codigos_produtos: Lista com códigos dos produtos editados (opcional)
+            ao_gravar: Chamada quando o registro estiver gravado em disco (com
+                gravação agrupada, só depois da escrita em segundo plano)
         """
         chave = self._gerar_chave(codigo_fornecedor, numero_nota, serie)
+        registro = self._montar_registro(
+            codigo_fornecedor, numero_nota, serie, usuario, produtos_editados, codigos_produtos, datetime.now()
+        )
+        
+        self.armazenamento.gravar(chave, registro, ao_gravar)
+        self._registrar_gravacao_propria()
+
+    def adicionar_notas(
+        self, notas: Iterable[tuple], usuario: str, ao_gravar: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Registra várias notas como processadas em uma única gravação.
         
+        Args:
+            notas: Tuplas (codigo_fornecedor, numero_nota, serie, codigos_produtos)
+            usuario: Código do usuário que processou
+            ao_gravar: Chamada quando os registros estiverem gravados em disco
+        """
         agora = datetime.now()
+        registros = {}
+        for codigo_fornecedor, numero_nota, serie, codigos_produtos in notas:
+            chave = self._gerar_chave(codigo_fornecedor, numero_nota, serie)
+            registros[chave] = self._montar_registro(
+                codigo_fornecedor, numero_nota, serie, usuario, len(codigos_produtos), codigos_produtos, agora
+            )
+        if not registros:
+            return
         
-        self.notas[chave] = {
+        self.armazenamento.gravar_varias(registros, ao_gravar)
+        self._registrar_gravacao_propria()
+
+    @staticmethod
+    def _montar_registro(
+        codigo_fornecedor: str,
+        numero_nota: str,
+        serie: str,
+        usuario: str,
+        produtos_editados: int,
+        codigos_produtos: Optional[List[str]],
+        agora: datetime,
+    ) -> dict:
+        return {
             "fornecedor": str(codigo_fornecedor).zfill(5),
             "nota": str(numero_nota).zfill(6),
             "serie": serie,
@@ -116,8 +252,6 @@ class NotasProcessadasManager:
             "produtos_editados": produtos_editados,
             "codigos_produtos": codigos_produtos or [],
         }
-        
-        self._salvar()
 
     def obter_informacoes(
         self, codigo_fornecedor: str, numero_nota: str, serie: str = "1"
@@ -134,16 +268,100 @@ class NotasProcessadasManager:
             Dicionário com informações da nota ou None se não foi processada
         """
         chave = self._gerar_chave(codigo_fornecedor, numero_nota, serie)
-        return self.notas.get(chave)
+        registro = self.armazenamento.obter(chave)
+        if registro is None:
+            registro = self.arquivo.obter(chave)
+        return registro
 
-    def listar_todas(self) -> List[dict]:
+    def listar_todas(self, incluir_arquivo: bool = False) -> List[dict]:
         """
         Lista todas as notas processadas.
         
+        Args:
+            incluir_arquivo: Inclui as notas do arquivo morto (lê todas as partições)
+            
         Returns:
             Lista de dicionários com informações de todas as notas processadas
         """
-        return list(self.notas.values())
+        notas = self.armazenamento.listar()
+        if incluir_arquivo:
+            notas.extend(self.arquivo.listar())
+        return notas
+
+    def _ordenar_recentes(self, notas: List[dict]) -> List[dict]:
+        return sorted(notas, key=lambda registro: IndicesNotas.momento(registro) or "", reverse=True)
+
+    def notas_por_produto(self, codigo_produto: str) -> List[dict]:
+        """
+        Lista as notas processadas que alteraram o preço de um produto,
+        incluindo as do arquivo morto.
+        
+        Args:
+            codigo_produto: Código do produto
+            
+        Returns:
+            Notas da mais recente para a mais antiga
+        """
+        return self._ordenar_recentes(
+            self.armazenamento.notas_por_produto(codigo_produto) + self.arquivo.notas_por_produto(codigo_produto)
+        )
+
+    def notas_por_usuario(self, usuario: str) -> List[dict]:
+        """
+        Lista as notas processadas por um usuário.
+        
+        Returns:
+            Notas da mais recente para a mais antiga
+        """
+        return self._ordenar_recentes(self.armazenamento.notas_por_usuario(usuario))
+
+    def notas_entre(
+        self, data_inicio: Union[str, date], data_fim: Union[str, date]
+    ) -> List[dict]:
+        """
+        Lista as notas processadas em um período.
+        
+        Args:
+            data_inicio: Data inicial (inclusive), date ou "AAAA-MM-DD"
+            data_fim: Data final (inclusive), date ou "AAAA-MM-DD"
+            
+        Returns:
+            Notas em ordem cronológica (inclui as partições do arquivo morto
+            que cobrem o período)
+        """
+        if isinstance(data_inicio, date):
+            data_inicio = data_inicio.strftime("%Y-%m-%d")
+        if isinstance(data_fim, date):
+            data_fim = data_fim.strftime("%Y-%m-%d")
+        arquivadas = self.arquivo.notas_entre(data_inicio, data_fim)
+        return arquivadas + self.armazenamento.notas_entre(data_inicio, data_fim)
+
+    def ultima_nota_produto(self, codigo_produto: str) -> Optional[dict]:
+        """
+        Obtém a última nota processada que alterou o preço do produto.
+        
+        Returns:
+            Dicionário com informações da nota ou None
+        """
+        return self.ultimas_notas_produtos([codigo_produto]).get(str(codigo_produto))
+
+    def ultimas_notas_produtos(self, codigos_produtos: Iterable[str]) -> Dict[str, dict]:
+        """
+        Obtém, de uma vez, a última nota processada de cada produto.
+        
+        Args:
+            codigos_produtos: Códigos dos produtos
+            
+        Returns:
+            Dicionário código -> nota (produtos sem histórico ficam de fora)
+        """
+        codigos = [str(codigo) for codigo in codigos_produtos]
+        ultimas = self.armazenamento.ultimas_notas_produtos(codigos)
+        # As notas arquivadas são sempre mais antigas que as do histórico recente
+        faltantes = [codigo for codigo in codigos if codigo not in ultimas]
+        if faltantes and self.arquivo.total():
+            ultimas.update(self.arquivo.ultimas_notas_produtos(faltantes))
+        return ultimas
 
     def total_notas_processadas(self) -> int:
         """
@@ -152,35 +370,86 @@ class NotasProcessadasManager:
         Returns:
             Quantidade de notas processadas
         """
-        return len(self.notas)
+        return self.armazenamento.total() + self.arquivo.total()
 
-    def limpar_notas_antigas(self, dias: int = 365) -> int:
+    def arquivar_notas_antigas(self, dias: int = 365) -> int:
         """
-        Remove notas processadas com mais de X dias (opcional, para manutenção).
+        Move notas processadas com mais de X dias para o arquivo morto
+        (partições mensais compactadas). Elas continuam sendo reconhecidas
+        como processadas, mas deixam de ser carregadas na inicialização.
         
         Args:
             dias: Número de dias para considerar nota como antiga
             
         Returns:
-            Quantidade de notas removidas
+            Quantidade de notas arquivadas
         """
-        from datetime import timedelta
-        
         limite = datetime.now() - timedelta(days=dias)
-        chaves_remover = []
-        
-        for chave, info in self.notas.items():
-            try:
-                data_processamento = datetime.strptime(info["data"], "%Y-%m-%d")
-                if data_processamento < limite:
-                    chaves_remover.append(chave)
-            except (ValueError, KeyError):
-                continue
+        antigas = self.armazenamento.notas_anteriores(limite)
+        if not antigas:
+            return 0
         
-        for chave in chaves_remover:
-            del self.notas[chave]
-        
-        if chaves_remover:
-            self._salvar()
+        # Grava o arquivo morto antes de remover: se cair no meio, a nota
+        # fica nos dois lugares, nunca em nenhum
+        self.arquivo.arquivar(antigas)
+        self.armazenamento.remover(list(antigas))
+        self._registrar_gravacao_propria()
+        return len(antigas)
+
+    def arquivar_conforme_config(self) -> int:
+        """
+        Arquiva as notas com mais de `manter_dias` dias ([NotasProcessadas]).
+        Chamado só na abertura da janela, nunca em consultas ou simulações.
+
+        Returns:
+            Quantidade de notas arquivadas (0 com manter_dias = 0)
+        """
+        if not self.manter_dias:
+            return 0
+        return self.arquivar_notas_antigas(self.manter_dias)
+
+    def limpar_notas_antigas(self, dias: int = 365) -> int:
+        """
+        Mantido por compatibilidade: as notas antigas agora são arquivadas
+        (ver arquivar_notas_antigas), não apagadas.
         
-        return len(chaves_remover)
+        Returns:
+            Quantidade de notas arquivadas
+        """
+        return self.arquivar_notas_antigas(dias)
+
+
+_manager_compartilhado: Optional[NotasProcessadasManager] = None
+_config_compartilhado = "config.ini"
+_trava_manager = threading.Lock()
+
+
+def configurar_notas_manager(config_file: str) -> None:
+    """
+    Define o arquivo de configuração da instância compartilhada (ex.: o
+    --config do cli.py). Deve ser chamado antes do primeiro obter_notas_manager.
+    """
+    global _config_compartilhado, _manager_compartilhado
+
+    with _trava_manager:
+        if config_file != _config_compartilhado and _manager_compartilhado is not None:
+            _manager_compartilhado.armazenamento.fechar()
+            _manager_compartilhado = None
+        _config_compartilhado = config_file
+
+
+def obter_notas_manager() -> NotasProcessadasManager:
+    """
+    Retorna a instância de NotasProcessadasManager compartilhada pelo processo.
+
+    O histórico é lido uma única vez e só é relido quando o arquivo muda,
+    para que gravações de outras estações continuem aparecendo.
+    """
+    global _manager_compartilhado
+
+    with _trava_manager:
+        if _manager_compartilhado is None:
+            _manager_compartilhado = NotasProcessadasManager(config_file=_config_compartilhado)
+        else:
+            _manager_compartilhado.recarregar_se_alterado()
+        return _manager_compartilhado
@@ -0,0 +1,219 @@
+import atexit
+import configparser
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+
+class Perfil:
+    """
+    Perfil das operações da tela (carregar nota, gravar, buscar notas,
+    gerar etiquetas): cada operação vira um trecho com tempo de relógio e de
+    CPU, gravado em arquivos no formato de trace do Chrome, que podem ser
+    abertos em chrome://tracing ou https://ui.perfetto.dev.
+
+    Ativado pela seção [Perfil] do config.ini (lida em configurar, chamado
+    por main.py e cli.py) ou pela variável AJUSTA_PRECO_PERFIL=1
+    (AJUSTA_PRECO_PERFIL=cprofile também grava um .prof do cProfile por
+    operação). Desativado, o custo é um if por chamada.
+    """
+
+    def __init__(self, config_file: Optional[str] = None):
+        self._inicio = time.perf_counter()
+        self._trava = threading.Lock()
+        self._local = threading.local()
+        self._arquivo = None
+        self._eventos_arquivo = 0
+        self._threads_nomeadas = set()
+        self._fechar_ao_sair = False
+        self.configurar(config_file)
+
+    def configurar(self, config_file: Optional[str] = None) -> None:
+        """
+        Lê a seção [Perfil] do arquivo de configuração; sem arquivo, só a
+        variável AJUSTA_PRECO_PERFIL é considerada.
+        """
+        config = configparser.ConfigParser()
+        if config_file:
+            config.read(config_file, encoding="utf-8")
+
+        variavel = os.environ.get("AJUSTA_PRECO_PERFIL", "").strip().lower()
+        with self._trava:
+            # A pasta pode mudar: o próximo trecho abre um arquivo novo
+            self.fechar_arquivo()
+            self.ativo = variavel in ("1", "cprofile") or config.get("Perfil", "ativo", fallback="0").strip() == "1"
+            self.cprofile = variavel == "cprofile" or config.get("Perfil", "cprofile", fallback="0").strip() == "1"
+            self.pasta = os.path.abspath(config.get("Perfil", "pasta", fallback="perfil").strip() or "perfil")
+            self.max_arquivos = int(config.get("Perfil", "max_arquivos", fallback="10"))
+            self.max_eventos = int(config.get("Perfil", "max_eventos", fallback="20000"))
+
+        if self.ativo and not self._fechar_ao_sair:
+            atexit.register(self.fechar)
+            self._fechar_ao_sair = True
+
+    def _microssegundos(self, instante: float) -> float:
+        return round((instante - self._inicio) * 1_000_000, 1)
+
+    def _abrir_arquivo(self) -> None:
+        os.makedirs(self.pasta, exist_ok=True)
+        nome = f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{os.getpid()}.json"
+        # Formato de array do trace do Chrome: o "]" final é opcional, então
+        # os eventos são acrescentados conforme acontecem
+        self._arquivo = open(os.path.join(self.pasta, nome), "w", encoding="utf-8")
+        self._arquivo.write("[")
+        self._eventos_arquivo = 0
+        self._threads_nomeadas = set()
+        self._escrever({
+            "name": "process_name", "ph": "M", "pid": os.getpid(), "tid": 0,
+            "args": {"name": "Ajusta Preço"},
+        })
+
+        # Mantém apenas os arquivos mais recentes (o nome começa pela data)
+        arquivos = sorted(glob.glob(os.path.join(self.pasta, "trace_*.json")))
+        for antigo in arquivos[:-self.max_arquivos]:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+
+    def _escrever(self, evento: dict) -> None:
+        separador = ",\n" if self._eventos_arquivo else "\n"
+        self._arquivo.write(separador + json.dumps(evento, ensure_ascii=False))
+        self._eventos_arquivo += 1
+
+    def _registrar(self, evento: dict) -> None:
+        with self._trava:
+            try:
+                if self._arquivo is None or self._eventos_arquivo >= self.max_eventos:
+                    self.fechar_arquivo()
+                    self._abrir_arquivo()
+                thread = threading.current_thread()
+                if thread.ident not in self._threads_nomeadas:
+                    self._threads_nomeadas.add(thread.ident)
+                    self._escrever({
+                        "name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": thread.ident,
+                        "args": {"name": thread.name},
+                    })
+                self._escrever(evento)
+                self._arquivo.flush()
+            except OSError as e:
+                print(f"Aviso: Não foi possível gravar o perfil: {e}")
+
+    @contextmanager
+    def trecho(self, nome: str, categoria: str = "operacao", **args):
+        """Mede um trecho (tempo de relógio e de CPU da thread)."""
+        if not self.ativo:
+            yield
+            return
+
+        # cProfile não pode ser aninhado: só o trecho mais externo da thread
+        profiler = None
+        nivel = getattr(self._local, "nivel", 0)
+        self._local.nivel = nivel + 1
+        if self.cprofile and nivel == 0:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Outro profiler ativo no processo
+                profiler = None
+
+        inicio = time.perf_counter()
+        inicio_cpu = time.thread_time()
+        erro = None
+        try:
+            yield
+        except BaseException as e:
+            erro = e
+            raise
+        finally:
+            fim = time.perf_counter()
+            cpu_ms = (time.thread_time() - inicio_cpu) * 1000
+            self._local.nivel = nivel
+
+            detalhes = {chave: str(valor) for chave, valor in args.items()}
+            detalhes["cpu_ms"] = round(cpu_ms, 2)
+            if erro is not None:
+                detalhes["erro"] = f"{type(erro).__name__}: {erro}"
+            if profiler is not None:
+                profiler.disable()
+                detalhes["cprofile"] = self._gravar_cprofile(profiler, nome)
+
+            self._registrar({
+                "name": nome,
+                "cat": categoria,
+                "ph": "X",
+                "ts": self._microssegundos(inicio),
+                "dur": round((fim - inicio) * 1_000_000, 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": detalhes,
+            })
+
+    def _gravar_cprofile(self, profiler, nome: str) -> str:
+        os.makedirs(self.pasta, exist_ok=True)
+        arquivo = os.path.join(
+            self.pasta, f"{nome.replace('.', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.prof"
+        )
+        try:
+            profiler.dump_stats(arquivo)
+        except OSError as e:
+            print(f"Aviso: Não foi possível gravar {arquivo}: {e}")
+            return ""
+
+        # Também limitados a max_arquivos por operação
+        prefixo = os.path.join(self.pasta, f"{nome.replace('.', '_')}_")
+        arquivos = sorted(glob.glob(prefixo + "[0-9]*.prof"))
+        for antigo in arquivos[:-self.max_arquivos]:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+        return os.path.basename(arquivo)
+
+    def fechar_arquivo(self) -> None:
+        if self._arquivo is not None:
+            try:
+                self._arquivo.write("\n]\n")
+                self._arquivo.close()
+            except OSError:
+                pass
+            self._arquivo = None
+
+    def fechar(self) -> None:
+        with self._trava:
+            self.fechar_arquivo()
+
+
+# Sem config.ini na importação: main.py e cli.py chamam perfil.configurar
+perfil = Perfil()
+
+
+def perfilado(nome: str = None, categoria: str = "operacao"):
+    """
+    Decorador que mede a função com perfil.trecho.
+
+    Args:
+        nome: Nome do trecho no trace (padrão: Classe.metodo)
+    """
+    def decorador(funcao):
+        nome_trecho = nome or funcao.__qualname__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if not perfil.ativo:
+                return funcao(*args, **kwargs)
+            with perfil.trecho(nome_trecho, categoria):
+                return funcao(*args, **kwargs)
+
+        return envolvida
+
+    return decorador
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from controller.database import Database
+from controller.tempos_inicializacao import tempos
+
+
+class PreparacaoInicial:
+    """
+    Etapas da abertura executadas em segundo plano enquanto a tela de
+    abertura é exibida:
+
+    - banco: conexão, perfil da empresa (nome e regime) e cache de fornecedores,
+      em sequência, pois usam a mesma conexão
+    - notas: histórico de notas processadas e arquivamento das notas antigas
+    - fontes: ReportLab, python-barcode e métricas das fontes das etiquetas
+    - replica: sincronização da réplica local de produtos, com conexão própria;
+      depois dela a réplica segue sendo sincronizada em segundo plano
+
+    A janela só espera banco e notas; fontes e replica podem terminar depois.
+    """
+
+    ETAPAS_NECESSARIAS = ("banco", "notas")
+
+    def __init__(self, config_file: str = "config.ini"):
+        self.db = Database(config_file)
+        self.nome_empresa: Optional[str] = None
+        self.mensagem = "Iniciando..."
+        self.duracoes: Dict[str, float] = {}
+        self.erros: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="preparacao")
+        self._futuros = {}
+
+    def iniciar(self) -> None:
+        self._futuros["banco"] = self._executor.submit(self._preparar_banco)
+        self._futuros["notas"] = self._executor.submit(
+            self._etapa, "notas", "Carregando notas processadas...", self._preparar_notas
+        )
+        self._futuros["fontes"] = self._executor.submit(
+            self._etapa, "fontes", "Preparando etiquetas...", self._preparar_fontes
+        )
+        if self.db.replica:
+            self._futuros["replica"] = self._executor.submit(
+                self._etapa, "replica", "Atualizando cadastro de produtos...", self._preparar_replica
+            )
+        # Não aceita novas tarefas; as atuais continuam até o fim
+        self._executor.shutdown(wait=False)
+
+    def concluida(self) -> bool:
+        """True quando as etapas necessárias para abrir a janela terminaram."""
+        return all(self._futuros[etapa].done() for etapa in self.ETAPAS_NECESSARIAS)
+
+    def aguardar(self) -> None:
+        for etapa in self.ETAPAS_NECESSARIAS:
+            self._futuros[etapa].result()
+
+    def _etapa(self, nome: str, mensagem: str, funcao: Callable[[], None]) -> bool:
+        self.mensagem = mensagem
+        inicio = time.perf_counter()
+        try:
+            funcao()
+            sucesso = True
+        except Exception as e:
+            self.erros[nome] = str(e)
+            print(f"Aviso: Etapa de inicialização '{nome}' falhou: {e}")
+            sucesso = False
+
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        self.duracoes[nome] = duracao_ms
+        tempos.registrar_preparacao(nome, duracao_ms)
+        print(f"Inicialização: {nome} em {duracao_ms:.1f} ms")
+        return sucesso
+
+    def _preparar_banco(self) -> None:
+        if not self._etapa("conexao", "Conectando ao banco de dados...", self.db.connect):
+            return
+
+        def perfil():
+            self.nome_empresa = self.db.carregar_perfil_empresa()[0]
+
+        self._etapa("empresa", "Carregando dados da empresa...", perfil)
+        self._etapa("fornecedores", "Carregando fornecedores...", self.db.carregar_fornecedores)
+
+    def _preparar_notas(self) -> None:
+        from controller.notas_processadas import obter_notas_manager
+
+        manager = obter_notas_manager()
+        try:
+            manager.arquivar_conforme_config()
+        except Exception as e:
+            print(f"Aviso: Erro ao arquivar notas antigas: {e}")
+
+    def _preparar_fontes(self) -> None:
+        from controller.etiqueta_generator import EtiquetaGenerator  # noqa: F401
+        from controller.etiqueta_template import TemplateEtiqueta, formatar_preco, largura_texto
+        from reportlab.pdfgen import canvas  # noqa: F401
+        import barcode  # noqa: F401
+        from barcode.writer import ImageWriter  # noqa: F401
+
+        # Primeira medição de cada fonte carrega suas métricas
+        for fonte in (TemplateEtiqueta.FONTE_DESCRICAO, TemplateEtiqueta.FONTE_PRECO, TemplateEtiqueta.FONTE_UNIDADE):
+            largura_texto(formatar_preco(0.0), *fonte)
+
+    def _preparar_replica(self) -> None:
+        try:
+            # Conexão própria: a conexão principal é usada pela etapa banco
+            conexao = self.db.criar_conexao()
+            try:
+                resultado = self.db.sincronizar_replica(conexao)
+                print(
+                    f"Réplica de produtos: {resultado['produtos']} produto(s) em "
+                    f"{resultado['faixas']} faixa(s) atualizada(s)"
+                )
+            finally:
+                conexao.close()
+        finally:
+            # Mesmo se esta falhar: as leituras não sincronizam a réplica
+            self.db.iniciar_sincronizacao_replica()
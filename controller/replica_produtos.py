@@ -0,0 +1,381 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Produtos do servidor divididos em 256 faixas pelo CHECKSUM do código: a
+# sincronização compara um resumo por faixa e só baixa as faixas alteradas
+CAMPOS_CADASTRO = """
+        RTRIM(cp.AU_ITE) AS Codigo,
+        cp.AB_ITE AS Descricao,
+        cp.BO_ITE AS CodigoBarras,
+        pa.PrecoVendaMin AS PrecoMinimo,
+        pa.PrecoVendaMax AS PrecoMaximo,
+        CHECKSUM(RTRIM(cp.AU_ITE)) & 255 AS Faixa
+    FROM CE_PRODUTO cp
+    LEFT JOIN ce_produtos_adicionais pa ON pa.CodReduzido = cp.AU_ITE"""
+
+
+def _registro(row) -> dict:
+    return {
+        "codigo": str(row.Codigo or "").strip(),
+        "descricao": (row.Descricao or "").strip(),
+        "codigo_barras": str(row.CodigoBarras or "").strip(),
+        "preco_min": float(row.PrecoMinimo or 0),
+        "preco_max": float(row.PrecoMaximo or 0),
+        "faixa": int(row.Faixa or 0),
+    }
+
+
+def buscar_cadastro_servidor(conexao, codigos: List[str]) -> Dict[str, dict]:
+    """
+    Busca no servidor descrição, código de barras e preços dos produtos,
+    em lotes de 2000 códigos (limite de 2100 parâmetros do SQL Server).
+
+    Returns:
+        dict: codigo -> registro (descricao, codigo_barras, preco_min, preco_max, faixa)
+    """
+    cadastro = {}
+    cursor = conexao.cursor()
+    try:
+        for inicio in range(0, len(codigos), 2000):
+            lote = codigos[inicio:inicio + 2000]
+            marcadores = ", ".join("?" * len(lote))
+            cursor.execute(f"SELECT{CAMPOS_CADASTRO}\n    WHERE cp.AU_ITE IN ({marcadores})", lote)
+            for row in cursor.fetchall():
+                registro = _registro(row)
+                cadastro[registro["codigo"]] = registro
+    finally:
+        cursor.close()
+    return cadastro
+
+
+class ReplicaProdutos:
+    """
+    Cópia local (SQLite) do cadastro de produtos usado pela tela e pelas
+    etiquetas: código, descrição, código de barras e preços mínimo/máximo.
+
+    Funciona como cache de leitura: produtos ausentes são buscados no
+    servidor e guardados. A sincronização incremental compara, por faixa de
+    códigos, um CHECKSUM_AGG calculado no servidor com o da última
+    sincronização e baixa apenas as faixas que mudaram. Uma sincronização
+    completa é feita a cada `completa_horas`, cobrindo colisões do checksum.
+
+    As leituras não sincronizam: a réplica é atualizada na abertura e depois
+    em segundo plano (iniciar_sincronizacao_periodica), com conexão própria.
+
+    O arquivo deve ficar em pasta local: cada estação tem a sua réplica.
+    """
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS produtos (
+            codigo TEXT PRIMARY KEY,
+            descricao TEXT,
+            codigo_barras TEXT,
+            preco_min REAL,
+            preco_max REAL,
+            faixa INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_produtos_faixa ON produtos (faixa);
+        CREATE TABLE IF NOT EXISTS faixas (
+            faixa INTEGER PRIMARY KEY,
+            soma INTEGER,
+            quantidade INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            chave TEXT PRIMARY KEY,
+            valor TEXT
+        );
+    """
+
+    def __init__(
+        self,
+        arquivo_db: str,
+        origem: str,
+        intervalo_segundos: float = 60.0,
+        completa_horas: float = 24.0,
+    ):
+        """
+        Args:
+            arquivo_db: Arquivo SQLite da réplica
+            origem: Identificação do banco replicado (servidor/banco); se
+                mudar, a réplica é descartada
+            intervalo_segundos: Intervalo da sincronização em segundo plano
+                (iniciar_sincronizacao_periodica)
+            completa_horas: Intervalo entre sincronizações completas
+        """
+        self.arquivo_db = arquivo_db
+        self.intervalo_segundos = intervalo_segundos
+        self.completa_horas = completa_horas
+        self._trava = threading.Lock()
+        self._sincronizando = threading.Lock()
+        self._periodica: Optional[threading.Thread] = None
+        self._acordar = threading.Event()
+        self._parando = False
+
+        self.conexao = sqlite3.connect(arquivo_db, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(self.ESQUEMA)
+
+        if self._meta("origem") != origem:
+            with self.conexao:
+                self.conexao.execute("DELETE FROM produtos")
+                self.conexao.execute("DELETE FROM faixas")
+                self.conexao.execute("DELETE FROM meta")
+                self._definir_meta("origem", origem)
+
+        # Última execução e quantidades, para diagnóstico
+        self.estatisticas = {
+            "sincronizacoes": 0,
+            "faixas_baixadas": 0,
+            "produtos_baixados": 0,
+            "leituras_locais": 0,
+            "leituras_servidor": 0,
+            "ultima_sincronizacao_ms": 0.0,
+        }
+
+    def _meta(self, chave: str) -> Optional[str]:
+        linha = self.conexao.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else None
+
+    def _definir_meta(self, chave: str, valor: str) -> None:
+        self.conexao.execute(
+            "INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, valor)
+        )
+
+    def _gravar(self, registros: Iterable[dict]) -> None:
+        self.conexao.executemany(
+            """
+            INSERT OR REPLACE INTO produtos
+                (codigo, descricao, codigo_barras, preco_min, preco_max, faixa)
+            VALUES (:codigo, :descricao, :codigo_barras, :preco_min, :preco_max, :faixa)
+            """,
+            registros,
+        )
+
+    def total(self) -> int:
+        with self._trava:
+            return self.conexao.execute("SELECT COUNT(*) FROM produtos").fetchone()[0]
+
+    def sincronizar(self, conexao, completa: bool = False) -> dict:
+        """
+        Baixa do servidor as faixas de produtos alteradas desde a última
+        sincronização.
+
+        Args:
+            conexao: Conexão pyodbc com o banco do VTi
+            completa: Baixa todas as faixas, mesmo as que não mudaram
+
+        Returns:
+            dict: faixas e produtos baixados, se foi completa e a duração em ms
+        """
+        with self._sincronizando:
+            inicio = time.perf_counter()
+
+            ultima_completa = self._meta("ultima_completa")
+            if not ultima_completa or (
+                datetime.now() - datetime.fromisoformat(ultima_completa)
+                >= timedelta(hours=self.completa_horas)
+            ):
+                completa = True
+
+            cursor = conexao.cursor()
+            try:
+                cursor.execute(
+                    """
+                    SELECT
+                        CHECKSUM(RTRIM(cp.AU_ITE)) & 255 AS Faixa,
+                        CHECKSUM_AGG(CHECKSUM(
+                            RTRIM(cp.AU_ITE), cp.AB_ITE, cp.BO_ITE, pa.PrecoVendaMin, pa.PrecoVendaMax
+                        )) AS Soma,
+                        COUNT(*) AS Quantidade
+                    FROM CE_PRODUTO cp
+                    LEFT JOIN ce_produtos_adicionais pa ON pa.CodReduzido = cp.AU_ITE
+                    GROUP BY CHECKSUM(RTRIM(cp.AU_ITE)) & 255
+                    """
+                )
+                servidor = {
+                    int(row.Faixa): (int(row.Soma or 0), int(row.Quantidade or 0))
+                    for row in cursor.fetchall()
+                }
+
+                with self._trava:
+                    locais = {
+                        faixa: (soma, quantidade)
+                        for faixa, soma, quantidade in self.conexao.execute(
+                            "SELECT faixa, soma, quantidade FROM faixas"
+                        )
+                    }
+                alteradas = sorted(
+                    faixa for faixa, resumo in servidor.items()
+                    if completa or locais.get(faixa) != resumo
+                )
+                removidas = [faixa for faixa in locais if faixa not in servidor]
+
+                registros = []
+                if alteradas:
+                    marcadores = ", ".join("?" * len(alteradas))
+                    cursor.execute(
+                        f"SELECT{CAMPOS_CADASTRO}\n    WHERE CHECKSUM(RTRIM(cp.AU_ITE)) & 255 IN ({marcadores})",
+                        alteradas,
+                    )
+                    registros = [_registro(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+            with self._trava, self.conexao:
+                for faixa in alteradas + removidas:
+                    self.conexao.execute("DELETE FROM produtos WHERE faixa = ?", (faixa,))
+                    self.conexao.execute("DELETE FROM faixas WHERE faixa = ?", (faixa,))
+                self._gravar(registros)
+                self.conexao.executemany(
+                    "INSERT INTO faixas (faixa, soma, quantidade) VALUES (?, ?, ?)",
+                    [(faixa, *servidor[faixa]) for faixa in alteradas],
+                )
+                agora = datetime.now().isoformat(timespec="seconds")
+                self._definir_meta("ultima_sincronizacao", agora)
+                if completa:
+                    self._definir_meta("ultima_completa", agora)
+
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            self.estatisticas["sincronizacoes"] += 1
+            self.estatisticas["faixas_baixadas"] += len(alteradas)
+            self.estatisticas["produtos_baixados"] += len(registros)
+            self.estatisticas["ultima_sincronizacao_ms"] = duracao_ms
+
+            return {
+                "faixas": len(alteradas),
+                "produtos": len(registros),
+                "completa": completa,
+                "duracao_ms": duracao_ms,
+            }
+
+    def iniciar_sincronizacao_periodica(self, criar_conexao: Callable[[], object]) -> None:
+        """
+        Sincroniza a cada `intervalo_segundos` em uma thread própria, com uma
+        conexão aberta por `criar_conexao` (nunca a conexão da tela). Em caso
+        de erro a conexão é descartada e reaberta na próxima vez.
+        """
+        if self._periodica is not None:
+            return
+        self._parando = False
+        self._periodica = threading.Thread(
+            target=self._sincronizar_periodicamente,
+            args=(criar_conexao,),
+            name="replica-produtos",
+            daemon=True,
+        )
+        self._periodica.start()
+
+    def solicitar_sincronizacao(self) -> bool:
+        """
+        Antecipa a próxima sincronização em segundo plano.
+
+        Returns:
+            bool: False se a sincronização periódica não está ativa
+        """
+        if self._periodica is None:
+            return False
+        self._acordar.set()
+        return True
+
+    def _sincronizar_periodicamente(self, criar_conexao: Callable[[], object]) -> None:
+        conexao = None
+        try:
+            while True:
+                self._acordar.wait(self.intervalo_segundos)
+                self._acordar.clear()
+                if self._parando:
+                    return
+                try:
+                    if conexao is None:
+                        conexao = criar_conexao()
+                    self.sincronizar(conexao)
+                except Exception as e:
+                    print(f"Aviso: Erro ao sincronizar réplica de produtos: {e}")
+                    if conexao is not None:
+                        try:
+                            conexao.close()
+                        except Exception:
+                            pass
+                        conexao = None
+        finally:
+            if conexao is not None:
+                try:
+                    conexao.close()
+                except Exception:
+                    pass
+
+    def parar_sincronizacao_periodica(self) -> None:
+        if self._periodica is None:
+            return
+        self._parando = True
+        self._acordar.set()
+        # Espera uma sincronização em andamento terminar
+        self._periodica.join()
+        self._periodica = None
+
+    def obter(self, codigos: Iterable[str], conexao=None) -> Dict[str, dict]:
+        """
+        Lê o cadastro dos produtos na réplica; os ausentes são buscados no
+        servidor (se a conexão for informada) e guardados.
+
+        Returns:
+            dict: codigo -> registro (descricao, codigo_barras, preco_min, preco_max)
+        """
+        codigos = list(dict.fromkeys(str(codigo).strip() for codigo in codigos))
+        cadastro = {}
+        with self._trava:
+            for inicio in range(0, len(codigos), 500):
+                lote = codigos[inicio:inicio + 500]
+                marcadores = ",".join("?" * len(lote))
+                for codigo, descricao, codigo_barras, preco_min, preco_max in self.conexao.execute(
+                    f"""
+                    SELECT codigo, descricao, codigo_barras, preco_min, preco_max
+                    FROM produtos WHERE codigo IN ({marcadores})
+                    """,
+                    lote,
+                ):
+                    cadastro[codigo] = {
+                        "codigo": codigo,
+                        "descricao": descricao,
+                        "codigo_barras": codigo_barras,
+                        "preco_min": preco_min,
+                        "preco_max": preco_max,
+                    }
+        self.estatisticas["leituras_locais"] += len(cadastro)
+
+        ausentes = [codigo for codigo in codigos if codigo not in cadastro]
+        if ausentes and conexao is not None:
+            do_servidor = buscar_cadastro_servidor(conexao, ausentes)
+            with self._trava, self.conexao:
+                self._gravar(do_servidor.values())
+            cadastro.update(do_servidor)
+            self.estatisticas["leituras_servidor"] += len(ausentes)
+
+        return cadastro
+
+    def registrar_precos(self, precos: Iterable[tuple]) -> None:
+        """
+        Aplica na réplica os preços gravados por este sistema, sem esperar a
+        próxima sincronização.
+
+        Args:
+            precos: Tuplas (codigo, preco_venda_novo), gravado como mínimo e
+                máximo, ou (codigo, preco_min, preco_max)
+        """
+        with self._trava, self.conexao:
+            self.conexao.executemany(
+                "UPDATE produtos SET preco_min = ?, preco_max = ? WHERE codigo = ?",
+                [
+                    (float(valores[0]), float(valores[-1]), str(codigo).strip())
+                    for codigo, *valores in precos
+                ],
+            )
+
+    def fechar(self) -> None:
+        self.parar_sincronizacao_periodica()
+        with self._trava:
+            self.conexao.close()
@@ -0,0 +1,114 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+INICIO = time.perf_counter()
+
+# Carregados sob demanda (conexão ao banco e geração de etiquetas em PDF) ou
+# em segundo plano pela preparação da abertura; a importação da janela não
+# deve trazê-los
+MODULOS_PESADOS = (
+    "pyodbc",
+    "reportlab.pdfgen.canvas",
+    "reportlab.pdfbase.pdfmetrics",
+    "barcode",
+    "PIL.Image",
+)
+
+
+class TemposInicializacao:
+    """
+    Marcos de tempo da abertura do sistema: importações, primeira pintura
+    da janela e exibição do nome da empresa.
+
+    Ativado com o argumento --tempos ou a variável AJUSTA_PRECO_TEMPOS=1,
+    tanto no executável quanto rodando pelo Python. Ao final, o relatório é
+    impresso e acrescentado em tempos_inicializacao.jsonl, uma linha por
+    abertura, para comparar versões.
+    """
+
+    ARQUIVO = "tempos_inicializacao.jsonl"
+
+    def __init__(self, inicio: float = INICIO):
+        self.inicio = inicio
+        self.ativo = "--tempos" in sys.argv or os.environ.get("AJUSTA_PRECO_TEMPOS") == "1"
+        self.importacoes = {}
+        self.preparacao = {}
+        self.etapas = []
+        self.modulos_pesados_primeira_pintura = []
+        self._finalizado = False
+
+    def _decorrido_ms(self) -> float:
+        return round((time.perf_counter() - self.inicio) * 1000, 1)
+
+    @contextmanager
+    def importacao(self, nome: str):
+        """Mede o tempo de um bloco de importações."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.importacoes[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    def registrar_preparacao(self, etapa: str, duracao_ms: float) -> None:
+        """Duração de uma etapa executada em segundo plano na abertura."""
+        self.preparacao[etapa] = round(duracao_ms, 1)
+
+    def marcar(self, etapa: str) -> None:
+        self.etapas.append((etapa, self._decorrido_ms()))
+
+    def marcar_primeira_pintura(self) -> None:
+        self.marcar("primeira_pintura")
+        self.modulos_pesados_primeira_pintura = [
+            modulo for modulo in MODULOS_PESADOS if modulo in sys.modules
+        ]
+        self.finalizar()
+
+    def relatorio(self) -> dict:
+        return {
+            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "executavel": bool(getattr(sys, "frozen", False)),
+            "importacoes_ms": self.importacoes,
+            "preparacao_ms": self.preparacao,
+            "etapas_ms": dict(self.etapas),
+            "modulos_pesados_primeira_pintura": self.modulos_pesados_primeira_pintura,
+        }
+
+    ETAPAS_FINAIS = ("primeira_pintura", "nome_empresa")
+
+    def finalizar(self) -> None:
+        """
+        Imprime e grava o relatório (uma única vez, se ativo), assim que a
+        janela foi pintada e o nome da empresa exibido, na ordem que for.
+        """
+        if not self.ativo or self._finalizado:
+            return
+        marcadas = {etapa for etapa, _ in self.etapas}
+        if not all(etapa in marcadas for etapa in self.ETAPAS_FINAIS):
+            return
+        self._finalizado = True
+
+        relatorio = self.relatorio()
+
+        print("Tempos de inicialização:")
+        for nome, duracao in relatorio["importacoes_ms"].items():
+            print(f"  importação {nome:<28} {duracao:>9.1f} ms")
+        for etapa, duracao in relatorio["preparacao_ms"].items():
+            print(f"  preparação {etapa:<28} {duracao:>9.1f} ms")
+        for etapa, decorrido in relatorio["etapas_ms"].items():
+            print(f"  {etapa:<39} {decorrido:>9.1f} ms")
+        if self.modulos_pesados_primeira_pintura:
+            # Normalmente carregados em segundo plano pela preparação da abertura
+            print(f"  Carregados antes da primeira pintura: {', '.join(self.modulos_pesados_primeira_pintura)}")
+
+        try:
+            with open(self.ARQUIVO, "a", encoding="utf-8") as f:
+                f.write(json.dumps(relatorio, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Aviso: Não foi possível gravar {self.ARQUIVO}: {e}")
+
+
+tempos = TemposInicializacao()
@@ -0,0 +1,76 @@
+import os
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class TravaArquivo:
+    """
+    Trava exclusiva entre processos (inclusive de outras estações que usam a
+    mesma pasta), baseada em um arquivo .lock ao lado do arquivo protegido.
+
+    Uso:
+        with TravaArquivo("notas_processadas.json.lock", espera=10):
+            ...
+    """
+
+    INTERVALO = 0.02
+
+    def __init__(self, caminho: str, espera: float = 10.0):
+        """
+        Args:
+            caminho: Arquivo usado como trava (criado se não existir)
+            espera: Tempo máximo, em segundos, aguardando a trava
+        """
+        self.caminho = caminho
+        self.espera = espera
+        self._arquivo = None
+
+    def _tentar_travar(self) -> bool:
+        try:
+            if os.name == "nt":
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def adquirir(self) -> None:
+        self._arquivo = open(self.caminho, "a+b")
+        limite = time.monotonic() + self.espera
+
+        while not self._tentar_travar():
+            if time.monotonic() >= limite:
+                self._arquivo.close()
+                self._arquivo = None
+                raise TimeoutError(
+                    f"Tempo esgotado aguardando {self.caminho} "
+                    f"(outra estação está gravando)"
+                )
+            time.sleep(self.INTERVALO)
+
+    def liberar(self) -> None:
+        if self._arquivo is None:
+            return
+        try:
+            if os.name == "nt":
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def __enter__(self):
+        self.adquirir()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.liberar()
+        return False
@@ -0,0 +1,265 @@
+"""
+Banco do VTi simulado em SQLite, com a mesma interface do pyodbc usada
+pelo sistema (connect, cursor, execute/executemany, fetchone/fetchall,
+linhas com acesso por nome de coluna, commit/rollback).
+
+Reproduz apenas as tabelas e colunas que o sistema consulta e traduz as
+construções de T-SQL usadas nas consultas (TOP, ISNULL, GETDATE, CONVERT,
+CHECKSUM/CHECKSUM_AGG, dicas de trava). Serve para rodar o sistema e os
+benchmarks sem um SQL Server: informe o arquivo em `simulado` na seção
+[Database] do config.ini. Dados de exemplo: benchmarks/gerar_vti_simulado.py.
+"""
+import re
+import sqlite3
+import zlib
+from datetime import datetime
+
+Error = sqlite3.Error
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS AEMPREGE (
+        BC_EMP TEXT,
+        CODRGT_EMP INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS AFORNEGE (
+        CODIGO_FOR TEXT PRIMARY KEY,
+        NOME_FOR TEXT,
+        CGCCPF_FOR TEXT,
+        ESTADO_FOR TEXT,
+        CLASSI_FOR TEXT
+    );
+    CREATE TABLE IF NOT EXISTS ATIPNFCE (
+        AA_TIP TEXT PRIMARY KEY,
+        AB_TIP TEXT
+    );
+    CREATE TABLE IF NOT EXISTS ANOTENCE (
+        AA_NEN TEXT,
+        AB_NEN TEXT,
+        AC_NEN TEXT,
+        AD_NEN DATAHORA,
+        AE_NEN DATAHORA,
+        AF_NEN REAL,
+        BD_NEN TEXT,
+        BE_NEN TEXT,
+        BR_NEN TEXT,
+        CHVNFE_NEN TEXT,
+        PRIMARY KEY (AA_NEN, AB_NEN, AC_NEN)
+    );
+    CREATE INDEX IF NOT EXISTS IX_ANOTENCE_EMISSAO ON ANOTENCE (AD_NEN, AB_NEN);
+    CREATE INDEX IF NOT EXISTS IX_ANOTENCE_ENTRADA ON ANOTENCE (AE_NEN);
+    CREATE TABLE IF NOT EXISTS APECENCE (
+        AA_PEN TEXT,
+        AB_PEN TEXT,
+        AC_PEN TEXT,
+        AE_PEN TEXT,
+        AG_PEN INTEGER,
+        AH_PEN INTEGER,
+        AI_PEN REAL,
+        AJ_PEN REAL,
+        AO_PEN REAL,
+        AR_PEN REAL
+    );
+    CREATE INDEX IF NOT EXISTS IX_APECENCE_NOTA ON APECENCE (AB_PEN, AC_PEN, AA_PEN);
+    CREATE TABLE IF NOT EXISTS CE_PRODUTO (
+        AU_ITE TEXT PRIMARY KEY,
+        AB_ITE TEXT,
+        BO_ITE TEXT
+    );
+    CREATE TABLE IF NOT EXISTS ce_produtos_adicionais (
+        CodReduzido TEXT PRIMARY KEY,
+        PrecoVendaMin REAL,
+        PrecoVendaMax REAL
+    );
+    CREATE TABLE IF NOT EXISTS GE_VARIACAO_PRECOSVENDA (
+        DATA_VPV DATAHORA,
+        HORA_VPV TEXT,
+        USUARIO_VPV TEXT,
+        PRODUTO_VPV TEXT,
+        VLR_MINIMO_VPV REAL,
+        VLR_MAXIMO_VPV REAL,
+        VLR_PROMOCIONAL_VPV REAL,
+        VLR_TABELADO_VPV REAL,
+        ORIGEMPRECO_VPV TEXT,
+        CODIGOORIGEM_VPV TEXT,
+        EMPRESA_VPV TEXT,
+        OPERACAO_VPV TEXT
+    );
+    CREATE INDEX IF NOT EXISTS IX_VARIACAO_PRODUTO ON GE_VARIACAO_PRECOSVENDA (PRODUTO_VPV, DATA_VPV);
+"""
+
+
+def _converter_datahora(valor: bytes):
+    texto = valor.decode()
+    for formato in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(texto[:19], formato)
+        except ValueError:
+            continue
+    return texto
+
+
+# Colunas declaradas como DATAHORA voltam como datetime, como no pyodbc
+sqlite3.register_converter("DATAHORA", _converter_datahora)
+
+
+def _checksum(*valores) -> int:
+    """Equivalente ao CHECKSUM do SQL Server: inteiro de 32 bits com sinal."""
+    soma = zlib.crc32(repr(valores).encode("utf-8"))
+    return soma - (1 << 32) if soma >= (1 << 31) else soma
+
+
+class _ChecksumAgg:
+    """Equivalente ao CHECKSUM_AGG: independe da ordem das linhas."""
+
+    def __init__(self):
+        self.soma = 0
+
+    def step(self, valor):
+        if valor is not None:
+            self.soma ^= int(valor)
+
+    def finalize(self):
+        return self.soma
+
+
+_TRADUCOES = (
+    (re.compile(r"CONVERT\s*\(\s*DATE\s*,\s*GETDATE\(\)\s*\)", re.I), "date('now', 'localtime')"),
+    (re.compile(r"CONVERT\s*\(\s*TIME\s*,\s*GETDATE\(\)\s*\)", re.I), "time('now', 'localtime')"),
+    (re.compile(r"CONVERT\s*\(\s*VARCHAR\s*\(\s*19\s*\)\s*,\s*GETDATE\(\)\s*,\s*120\s*\)", re.I), "datetime('now', 'localtime')"),
+    (re.compile(r"GETDATE\(\)", re.I), "datetime('now', 'localtime')"),
+    # Estilos 23 (AAAA-MM-DD) e 108 (HH:MM:SS): o início do texto gravado
+    (re.compile(r"CONVERT\s*\(\s*VARCHAR\s*\(\s*(\d+)\s*\)\s*,\s*([\w.]+)\s*,\s*(?:23|108)\s*\)", re.I), r"substr(\2, 1, \1)"),
+    (re.compile(r"\bISNULL\s*\(", re.I), "IFNULL("),
+    (re.compile(r"\bLEN\s*\(", re.I), "LENGTH("),
+    # Dicas de trava (WITH (UPDLOCK, ROWLOCK)): o SQLite trava o banco todo na escrita
+    (re.compile(r"\bWITH\s*\(\s*(?:(?:UPDLOCK|ROWLOCK|HOLDLOCK|NOLOCK)\s*,?\s*)+\)", re.I), ""),
+)
+
+_TOP = re.compile(r"\bTOP\s*(?:\(\s*(\?|\d+)\s*\)|(\?|\d+))", re.I)
+
+
+def traduzir(sql: str, parametros=()):
+    """
+    Traduz uma instrução T-SQL para SQLite.
+
+    Returns:
+        (sql, parametros): TOP vira LIMIT no fim da instrução e, se for um
+        parâmetro, ele passa a ser o último
+    """
+    for padrao, substituto in _TRADUCOES:
+        sql = padrao.sub(substituto, sql)
+
+    parametros = list(parametros or ())
+    top = _TOP.search(sql)
+    if top:
+        limite = top.group(1) or top.group(2)
+        if limite == "?":
+            posicao = sql[:top.start()].count("?")
+            parametros.append(parametros.pop(posicao))
+        sql = sql[:top.start()] + sql[top.end():]
+        sql = sql.rstrip().rstrip(";") + f"\nLIMIT {limite}"
+
+    return sql, parametros
+
+
+class Linha(tuple):
+    """Linha com acesso por posição e pelo nome da coluna, como pyodbc.Row."""
+
+    def __new__(cls, valores, colunas):
+        linha = super().__new__(cls, valores)
+        linha._colunas = colunas
+        return linha
+
+    def __getattr__(self, nome):
+        try:
+            return self[self._colunas[nome]]
+        except KeyError:
+            raise AttributeError(nome) from None
+
+
+class Cursor:
+    def __init__(self, conexao: "Conexao"):
+        self._conexao = conexao
+        self._cursor = conexao._sqlite.cursor()
+        self._colunas = {}
+        # Aceito como no pyodbc; o SQLite não precisa
+        self.fast_executemany = False
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, sql, *parametros):
+        # pyodbc aceita os parâmetros em uma sequência ou soltos
+        if len(parametros) == 1 and isinstance(parametros[0], (list, tuple)):
+            parametros = parametros[0]
+        sql, parametros = traduzir(sql, parametros)
+        self._conexao.instrucoes += 1
+        self._cursor.execute(sql, parametros)
+        self._colunas = {
+            coluna[0]: i for i, coluna in enumerate(self._cursor.description or ())
+        }
+        return self
+
+    def executemany(self, sql, sequencia):
+        sequencia = list(sequencia)
+        if not sequencia:
+            raise Error("executemany sem parâmetros")
+        sql, _ = traduzir(sql)
+        self._conexao.instrucoes += 1
+        self._cursor.executemany(sql, [list(parametros) for parametros in sequencia])
+        self._colunas = {}
+
+    def _linha(self, valores):
+        return Linha(valores, self._colunas) if valores is not None else None
+
+    def fetchone(self):
+        return self._linha(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [Linha(valores, self._colunas) for valores in self._cursor.fetchall()]
+
+    def fetchmany(self, tamanho=1):
+        return [Linha(valores, self._colunas) for valores in self._cursor.fetchmany(tamanho)]
+
+    def __iter__(self):
+        linha = self.fetchone()
+        while linha is not None:
+            yield linha
+            linha = self.fetchone()
+
+    def close(self):
+        self._cursor.close()
+
+
+class Conexao:
+    def __init__(self, arquivo: str):
+        self._sqlite = sqlite3.connect(
+            arquivo, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False, timeout=10
+        )
+        self._sqlite.create_function("CHECKSUM", -1, _checksum, deterministic=True)
+        self._sqlite.create_aggregate("CHECKSUM_AGG", 1, _ChecksumAgg)
+        self._sqlite.executescript(ESQUEMA)
+        # Instruções enviadas, para os benchmarks
+        self.instrucoes = 0
+
+    def cursor(self) -> Cursor:
+        return Cursor(self)
+
+    def commit(self) -> None:
+        self._sqlite.commit()
+
+    def rollback(self) -> None:
+        self._sqlite.rollback()
+
+    def close(self) -> None:
+        self._sqlite.close()
+
+
+def connect(arquivo: str, **_) -> Conexao:
+    """Abre o banco simulado (criando as tabelas, se necessário)."""
+    return Conexao(arquivo)
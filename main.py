@@ -1,18 +1,79 @@
+from controller.tempos_inicializacao import tempos
+
 import sys
 import os
-from PySide6.QtWidgets import QApplication, QSplashScreen
-from PySide6.QtGui import QPixmap
-from PySide6.QtCore import Qt, QTimer
-from view.main_window import MainWindow
+
+with tempos.importacao("PySide6"):
+    from PySide6.QtWidgets import QApplication, QSplashScreen
+    from PySide6.QtGui import QPixmap, QPainter, QIcon, QColor, QFont
+    from PySide6.QtCore import Qt, QTimer
+
+with tempos.importacao("view.main_window"):
+    from view.main_window import MainWindow
+
+from controller.perfil import perfil
+from controller.preparacao_inicial import PreparacaoInicial
+
+
+def _criar_splash():
+    if getattr(sys, "frozen", False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+
+    pixmap = QPixmap(420, 180)
+    pixmap.fill(QColor("#f0f0f0"))
+
+    painter = QPainter(pixmap)
+    icon_path = os.path.join(base_path, "icon", "money-management.ico")
+    if os.path.exists(icon_path):
+        painter.drawPixmap(24, 58, QIcon(icon_path).pixmap(64, 64))
+    fonte = QFont()
+    fonte.setPointSize(18)
+    fonte.setBold(True)
+    painter.setFont(fonte)
+    painter.drawText(108, 58, 300, 64, Qt.AlignVCenter | Qt.AlignLeft, "Ajusta Preço")
+    painter.end()
+
+    return QSplashScreen(pixmap)
 
 
 def main():
+    perfil.configurar("config.ini")
     app = QApplication(sys.argv)
-    
-    window = MainWindow()
-    
-    window.show()
-    
+    tempos.marcar("qapplication")
+
+    splash = _criar_splash()
+    splash.show()
+    app.processEvents()
+    tempos.marcar("splash")
+
+    # Conexão, dados da empresa, fornecedores, notas processadas e fontes
+    # das etiquetas são preparados em segundo plano
+    preparacao = PreparacaoInicial()
+    preparacao.iniciar()
+
+    janela = {}
+
+    def verificar_preparacao():
+        splash.showMessage(preparacao.mensagem, Qt.AlignBottom | Qt.AlignHCenter)
+        if not preparacao.concluida():
+            return
+        timer.stop()
+
+        window = MainWindow(db=preparacao.db, nome_empresa=preparacao.nome_empresa)
+        tempos.marcar("janela_criada")
+        janela["principal"] = window
+
+        window.show()
+        splash.finish(window)
+        # Executado depois que o loop de eventos processa a primeira pintura
+        QTimer.singleShot(0, tempos.marcar_primeira_pintura)
+
+    timer = QTimer()
+    timer.timeout.connect(verificar_preparacao)
+    timer.start(30)
+
     sys.exit(app.exec())
 
 
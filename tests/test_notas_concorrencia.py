@@ -0,0 +1,231 @@
+"""
+Duas estações (dois NotasProcessadasManager) sobre a mesma pasta: notas
+gravadas por uma aparecem na outra, arquivos corrompidos nunca são
+sobrescritos e intenções pendentes só são reconciliadas com prova no banco.
+
+Uso:
+    python -m pytest tests
+"""
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import time
+import unittest
+from unittest import mock
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+from controller import notas_processadas  # noqa: E402
+from controller.notas_backends import BACKENDS  # noqa: E402
+from controller.notas_pendentes import IntencoesNotas  # noqa: E402
+from controller.notas_processadas import NotasProcessadasManager  # noqa: E402
+
+# Processo morto: sem arquivo de trava em <intenções>_donos
+DONO_FECHADO = "outra-estacao_999_1"
+
+
+class PastaTemporaria(unittest.TestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+        self.arquivo = os.path.join(self.pasta, "notas_processadas.json")
+        # Inexistente: opções padrão, sem ler o config.ini da pasta atual
+        self.config = os.path.join(self.pasta, "config.ini")
+
+    def manager(self, backend):
+        manager = NotasProcessadasManager(self.arquivo, backend, self.config)
+        self.addCleanup(manager.armazenamento.fechar)
+        return manager
+
+
+class TestVisibilidadeEntreEstacoes(PastaTemporaria):
+    def test_notas_de_uma_estacao_aparecem_na_outra(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.arquivo = os.path.join(self.pasta, backend, "notas_processadas.json")
+                os.makedirs(os.path.dirname(self.arquivo))
+                a, b = self.manager(backend), self.manager(backend)
+
+                a.adicionar_nota("1", "111", "1", "2", 1, ["10"])
+                b.adicionar_nota("2", "222", "1", "2", 1, ["20"])
+
+                b.recarregar_se_alterado()
+                a.recarregar_se_alterado()
+                self.assertTrue(b.verificar_nota("1", "111", "1"))
+                self.assertTrue(a.verificar_nota("2", "222", "1"))
+
+    def test_gravacao_agrupada_conclui_depois_de_gravar(self):
+        with open(self.config, "w", encoding="utf-8") as f:
+            f.write("[NotasProcessadas]\nbackend = json\nagrupar_ms = 200\n")
+        manager = self.manager(None)
+        concluidas = []
+
+        manager.adicionar_notas([("1", "111", "1", ["10"])], "2", ao_gravar=lambda: concluidas.append(True))
+        self.assertFalse(os.path.exists(self.arquivo))
+        self.assertEqual(concluidas, [])
+
+        manager.armazenamento.descarregar()
+        self.assertEqual(concluidas, [True])
+        with open(self.arquivo, encoding="utf-8") as f:
+            self.assertIn("00001_000111_1", json.load(f))
+
+
+class TestArquivoMorto(PastaTemporaria):
+    def test_ultima_nota_do_produto_inclui_notas_arquivadas(self):
+        manager = self.manager("json")
+        manager.adicionar_nota("1", "111", "1", "2", 1, ["10"])
+        manager.adicionar_nota("2", "222", "1", "2", 1, ["20"])
+        self.assertEqual(manager.arquivar_notas_antigas(-1), 2)
+        manager.adicionar_nota("3", "333", "1", "2", 1, ["20"])
+
+        ultimas = manager.ultimas_notas_produtos(["10", "20", "30"])
+        self.assertEqual(ultimas["10"]["nota"], "000111")
+        self.assertEqual(ultimas["20"]["nota"], "000333")
+        self.assertNotIn("30", ultimas)
+        self.assertEqual(len(manager.notas_por_produto("20")), 2)
+
+
+class TestArquivosCorrompidos(PastaTemporaria):
+    def test_historico_corrompido_nao_e_sobrescrito(self):
+        conteudo = '{"00001_000111_1": {"data": "2026-01-01"}, '
+        with open(self.arquivo, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+        manager = self.manager("json")
+
+        with self.assertRaises(Exception):
+            manager.adicionar_nota("2", "222", "1", "2", 1, ["20"])
+
+        with open(self.arquivo, encoding="utf-8") as f:
+            self.assertEqual(f.read(), conteudo)
+        self.assertTrue(glob.glob(self.arquivo + ".corrompido-*"))
+
+        # Removido o arquivo, a nota pendente é gravada
+        os.remove(self.arquivo)
+        manager.armazenamento.descarregar()
+        with open(self.arquivo, encoding="utf-8") as f:
+            self.assertEqual(list(json.load(f)), ["00002_000222_1"])
+
+    def test_intencoes_corrompidas_sao_guardadas(self):
+        intencoes = IntencoesNotas(os.path.join(self.pasta, "pendentes.json"))
+        with open(intencoes.arquivo, "w", encoding="utf-8") as f:
+            f.write("{")
+
+        self.assertEqual(intencoes.pendentes(), [])
+        self.assertFalse(os.path.exists(intencoes.arquivo))
+        self.assertEqual(len(glob.glob(intencoes.arquivo + ".corrompido-*")), 1)
+
+
+class TestIntencoesPendentes(PastaTemporaria):
+    def setUp(self):
+        super().setUp()
+        self.intencoes = IntencoesNotas(os.path.join(self.pasta, "pendentes.json"))
+        self.addCleanup(self.intencoes._liberar_processo)
+
+    def _trocar_dono(self, ids, dono):
+        with open(self.intencoes.arquivo, encoding="utf-8") as f:
+            dados = json.load(f)
+        for intencao_id in ids:
+            dados[intencao_id]["dono"] = dono
+        with open(self.intencoes.arquivo, "w", encoding="utf-8") as f:
+            json.dump(dados, f)
+
+    def test_intencoes_deste_processo_nao_sao_reconciliadas(self):
+        self.intencoes.registrar_varias([("1", "111", "1", [("10", 1.0)])], "2")
+        self.assertEqual(self.intencoes.pendentes(), [])
+
+    def test_intencoes_de_processo_aberto_esperam_o_fim(self):
+        ids = self.intencoes.registrar_varias([("1", "111", "1", [("10", 1.0)])], "2")
+        self._trocar_dono(ids, "viva_1_1")
+        processo = subprocess.Popen(
+            [sys.executable, "-c", textwrap.dedent(f"""
+                import sys, time
+                sys.path.insert(0, {RAIZ!r})
+                from controller.notas_pendentes import IntencoesNotas
+                intencoes = IntencoesNotas({self.intencoes.arquivo!r})
+                intencoes.dono = "viva_1_1"
+                intencoes._marcar_processo_ativo()
+                print("ok", flush=True)
+                time.sleep(60)
+            """)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            self.assertEqual(processo.stdout.readline().strip(), "ok")
+            self.assertEqual(self.intencoes.pendentes(), [])
+        finally:
+            processo.kill()
+            processo.wait()
+            processo.stdout.close()
+
+        self.assertEqual([intencao["id"] for intencao in self.intencoes.pendentes()], ids)
+
+
+class TestReconciliacao(PastaTemporaria):
+    def setUp(self):
+        super().setUp()
+        from gerar_vti_simulado import gerar
+        from controller.database import Database
+
+        banco = os.path.join(self.pasta, "vti.db")
+        fixas = gerar(banco, produtos=200, fornecedores=5, notas=2, tamanhos=(5,))
+        with open(self.config, "w", encoding="utf-8") as f:
+            f.write(
+                "[Database]\nserver = simulado\ndatabase = vti\nusername =\npassword =\n"
+                f"driver =\nsimulado = {banco}\n"
+            )
+        self.db = Database(self.config)
+        self.addCleanup(self.db.disconnect)
+        self.nota = fixas[5]
+
+        self.manager = self.manager("json")
+        compartilhado = mock.patch.object(notas_processadas, "_manager_compartilhado", self.manager)
+        compartilhado.start()
+        self.addCleanup(compartilhado.stop)
+        self.addCleanup(self.manager.intencoes._liberar_processo)
+
+    def _registrar(self, nota, precos, momento):
+        ids = self.manager.intencoes.registrar_varias([(*nota, precos)], self.db.usuario_evolucao, momento)
+        with open(self.manager.intencoes.arquivo, encoding="utf-8") as f:
+            dados = json.load(f)
+        for intencao_id in ids:
+            dados[intencao_id]["dono"] = DONO_FECHADO
+        with open(self.manager.intencoes.arquivo, "w", encoding="utf-8") as f:
+            json.dump(dados, f)
+
+    def test_so_registra_nota_com_precos_gravados_depois_da_intencao(self):
+        fornecedor, numero, serie = self.nota
+        produtos = self.db.buscar_produtos_por_nota(numero, serie, fornecedor)
+        for produto in produtos:
+            produto.set_preco_venda_novo(round(produto.preco_venda_min + 1, 2))
+        precos = [(produto.codigo, produto.preco_venda_novo) for produto in produtos]
+
+        antes = self.db._consultar_um("agora_servidor")[0]
+        self.db.atualizar_precos(produtos)
+        # HORA_VPV tem resolução de segundos
+        time.sleep(1.1)
+        depois = self.db._consultar_um("agora_servidor")[0]
+
+        self._registrar(self.nota, precos, antes)
+        # Mesmos preços, mas a intenção é posterior à gravação: não é prova
+        self._registrar(("00099", "000099", "1"), precos, depois)
+        # Sem produtos não há o que conferir
+        self._registrar(("00098", "000098", "1"), [], depois)
+
+        self.assertEqual(self.db.reconciliar_notas_pendentes(), 1)
+        self.manager.armazenamento.descarregar()
+        self.assertTrue(self.manager.verificar_nota(fornecedor, numero, serie))
+        self.assertFalse(self.manager.verificar_nota("00099", "000099", "1"))
+        self.assertFalse(self.manager.verificar_nota("00098", "000098", "1"))
+        self.assertFalse(os.path.exists(self.manager.intencoes.arquivo))
+
+
+if __name__ == "__main__":
+    unittest.main()
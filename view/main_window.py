@@ -1,14 +1,17 @@
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
-    QHeaderView, QMessageBox, QFrame, QDialog, QScrollArea, QRadioButton, QButtonGroup
+    QHeaderView, QMessageBox, QFrame, QDialog, QScrollArea, QRadioButton, QButtonGroup,
+    QFileDialog
 )
 from PySide6.QtCore import Qt, QTimer, QEvent, QObject
 from PySide6.QtGui import QIcon, QDoubleValidator
 import configparser
 import os
 import sys
-from controller.database import Database
+from controller.database import Database, ConflitoPrecosError
+from controller.tempos_inicializacao import tempos
+from controller.perfil import perfilado
 
 
 class EditorEventFilter(QObject):
@@ -24,7 +27,12 @@ class EditorEventFilter(QObject):
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, db=None, nome_empresa=None):
+        """
+        Args:
+            db: Database já conectado pela preparação da abertura (opcional)
+            nome_empresa: Nome da empresa já carregado (opcional)
+        """
         super().__init__()
 
         self._definir_icone()
@@ -32,11 +40,14 @@ class MainWindow(QMainWindow):
         self.config = configparser.ConfigParser()
         self.config.read("config.ini", encoding="utf-8")
 
-        self.db = Database()
+        self.db = db or Database()
 
         self.setWindowTitle("Ajusta Preço - Carregando...")
 
         self.produtos = []
+        # Notas carregadas juntas pela busca (área de trabalho com várias
+        # notas); vazia quando a tela tem uma única nota
+        self.notas_carregadas = []
         
         self.editor_ativo = None
         self.editor_row = None
@@ -51,7 +62,11 @@ class MainWindow(QMainWindow):
         if fullscreen != "1":
             self._centralizar_janela()
         
-        QTimer.singleShot(100, self._carregar_nome_empresa)
+        if nome_empresa:
+            self._exibir_nome_empresa(nome_empresa)
+        else:
+            QTimer.singleShot(100, self._carregar_nome_empresa)
+        QTimer.singleShot(200, self._reconciliar_notas_pendentes)
 
     def _definir_icone(self):
         try:
@@ -80,10 +95,28 @@ class MainWindow(QMainWindow):
     def _carregar_nome_empresa(self):
         try:
             nome_empresa = self.db.buscar_nome_empresa()
-            self.setWindowTitle(f"Ajusta Preço - {nome_empresa}")
         except Exception as e:
             print(f"Aviso: Não foi possível buscar nome da empresa: {e}")
+            nome_empresa = None
+        
+        self._exibir_nome_empresa(nome_empresa)
+
+    def _exibir_nome_empresa(self, nome_empresa):
+        if nome_empresa:
+            self.setWindowTitle(f"Ajusta Preço - {nome_empresa}")
+        else:
             self.setWindowTitle("Ajusta Preço")
+        
+        tempos.marcar("nome_empresa")
+        tempos.finalizar()
+
+    def _reconciliar_notas_pendentes(self):
+        try:
+            registradas = self.db.reconciliar_notas_pendentes()
+            if registradas:
+                print(f"{registradas} nota(s) com preços já gravados registrada(s) como processada(s)")
+        except Exception as e:
+            print(f"Aviso: Não foi possível reconciliar notas pendentes: {e}")
 
     def _centralizar_janela(self):
         screen_geometry = self.screen().availableGeometry()
@@ -319,6 +352,41 @@ class MainWindow(QMainWindow):
         self.label_alerta_nota.setVisible(False)
         layout_bottom.addWidget(self.label_alerta_nota)
         
+        btn_exportar = QPushButton("Exportar")
+        btn_exportar.setToolTip("Exporta os produtos carregados para precificar fora da loja (CSV ou Parquet)")
+        btn_exportar.setStyleSheet("""
+            QPushButton {
+                font-size: 10pt;
+                padding: 12px 18px;
+                border-radius: 4px;
+            }
+        """)
+        btn_exportar.clicked.connect(self._exportar_nota)
+        layout_bottom.addWidget(btn_exportar)
+
+        btn_importar = QPushButton("Importar")
+        btn_importar.setToolTip("Traz para a grade os preços novos de um arquivo exportado")
+        btn_importar.setStyleSheet("""
+            QPushButton {
+                font-size: 10pt;
+                padding: 12px 18px;
+                border-radius: 4px;
+            }
+        """)
+        btn_importar.clicked.connect(self._importar_precos)
+        layout_bottom.addWidget(btn_importar)
+
+        btn_reimprimir = QPushButton("Reimprimir Etiquetas")
+        btn_reimprimir.setStyleSheet("""
+            QPushButton {
+                font-size: 10pt;
+                padding: 12px 18px;
+                border-radius: 4px;
+            }
+        """)
+        btn_reimprimir.clicked.connect(self._abrir_historico_etiquetas)
+        layout_bottom.addWidget(btn_reimprimir)
+        
         btn_gravar = QPushButton("Gravar")
         btn_gravar.setStyleSheet("""
             QPushButton {
@@ -345,6 +413,7 @@ class MainWindow(QMainWindow):
         self._atualizar_nome_fornecedor()
         self._carregar_produtos()
 
+    @perfilado()
     def _carregar_produtos(self):
         serie_nota = self.entry_serie.text().strip()
         numero_nota = self.entry_nota.text().strip()
@@ -370,8 +439,8 @@ class MainWindow(QMainWindow):
 
         # Verificar se nota já foi processada
         try:
-            from controller.notas_processadas import NotasProcessadasManager
-            notas_manager = NotasProcessadasManager()
+            from controller.notas_processadas import obter_notas_manager
+            notas_manager = obter_notas_manager()
             
             if notas_manager.verificar_nota(codigo_fornecedor, numero_nota, serie_nota):
                 info_nota = notas_manager.obter_informacoes(codigo_fornecedor, numero_nota, serie_nota)
@@ -401,6 +470,7 @@ class MainWindow(QMainWindow):
 
         try:
             self.table.setRowCount(0)
+            self.notas_carregadas = []
 
             self.label_status.setText("Carregando produtos...")
             self.repaint()
@@ -418,44 +488,149 @@ class MainWindow(QMainWindow):
                 self.label_status.setText("")
                 return
 
-            self.table.setRowCount(len(self.produtos))
-            
-            for i, produto in enumerate(self.produtos):
-                icon_item = QTableWidgetItem("")
-                icon_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(i, 0, icon_item)
-                
-                self.table.setItem(i, 1, QTableWidgetItem(str(produto.sequencia)))
-                self.table.setItem(i, 2, QTableWidgetItem(str(produto.codigo)))
-                self.table.setItem(i, 3, QTableWidgetItem(produto.descricao))
-                self.table.setItem(i, 4, QTableWidgetItem(f"R$ {produto.custo_total:.2f}"))
-                self.table.setItem(i, 5, QTableWidgetItem(f"R$ {produto.custo_reposicao:.2f}"))
-                self.table.setItem(i, 6, QTableWidgetItem(f"R$ {produto.preco_venda_min:.2f}"))
-                self.table.setItem(i, 7, QTableWidgetItem(f"▶ R$ {produto.preco_venda_novo:.2f}"))
-                self.table.setItem(i, 8, QTableWidgetItem(f"▶ {produto.margem_venda:.2f}"))
-                self.table.setItem(i, 9, QTableWidgetItem(f"▶ {produto.porcentagem_custo:.2f}"))
-                
-                for col in [0, 1, 2]:
-                    self.table.item(i, col).setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                for col in [4, 5, 6, 7, 8, 9]:
-                    self.table.item(i, col).setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            self._exibir_produtos()
+
+        except Exception as e:
+            QMessageBox.critical(self, "Erro", f"Erro ao carregar produtos:\n{str(e)}")
+            self.label_status.setText("")
+            self.label_alerta_nota.setVisible(False)
+
+    @perfilado()
+    def _carregar_notas(self, notas):
+        """
+        Carrega várias notas selecionadas na busca em uma única grade.
+        Produtos repetidos aparecem uma vez, com o custo da nota mais recente.
+        """
+        identificacoes = [(n['codigo_fornecedor'], n['nota'], n['serie']) for n in notas]
 
-            self.label_status.setText(f"{len(self.produtos)} produto(s) carregado(s).")
+        processadas = [n for n in notas if n.get('processada', False)]
+        if processadas:
+            lista = "\n".join(
+                f"NF {n['nota']} série {n['serie']} (fornecedor {n['codigo_fornecedor']})"
+                for n in processadas[:10]
+            )
+            if len(processadas) > 10:
+                lista += f"\n... e mais {len(processadas) - 10}"
+
+            msg_box = QMessageBox(self)
+            msg_box.setWindowTitle("Notas Já Processadas")
+            msg_box.setText(
+                f"⚠ ATENÇÃO: {len(processadas)} das notas selecionadas já foram processadas!\n\n"
+                f"{lista}\n\n"
+                f"Deseja carregar as notas mesmo assim?"
+            )
+            msg_box.setIcon(QMessageBox.Icon.Warning)
             
-            # Verificar alerta de ICMS apenas para Regime Normal (código 3)
-            regime_tributario = self.db.buscar_regime_tributario()
-            produtos_com_erro = [p for p in self.produtos if p.ar_pen > 0 and p.ag_pen not in [2, 3]]
-            if produtos_com_erro and regime_tributario == 3:
-                self.label_alerta_nota.setText("⚠ Nota lançada incorretamente (Campo Aproveita ICMS)")
-                self.label_alerta_nota.setVisible(True)
-            else:
-                self.label_alerta_nota.setVisible(False)
+            btn_sim = msg_box.addButton("Sim, Carregar", QMessageBox.ButtonRole.YesRole)
+            btn_nao = msg_box.addButton("Não, Cancelar", QMessageBox.ButtonRole.NoRole)
+            
+            msg_box.exec()
+            
+            if msg_box.clickedButton() != btn_sim:
+                return
+
+        try:
+            self.table.setRowCount(0)
+
+            self.entry_serie.clear()
+            self.entry_nota.clear()
+            self.entry_fornecedor.clear()
+            self.label_nome_fornecedor.setText(f"{len(notas)} notas carregadas")
+
+            self.label_status.setText(f"Carregando produtos de {len(notas)} notas...")
+            self.repaint()
+
+            self.produtos = self.db.buscar_produtos_por_notas(identificacoes)
+            self.notas_carregadas = identificacoes
+
+            if not self.produtos:
+                QMessageBox.information(
+                    self,
+                    "Informação",
+                    "Nenhum produto encontrado nas notas selecionadas.",
+                )
+                self.label_status.setText("")
+                return
+
+            self._exibir_produtos()
+
+            for i, produto in enumerate(self.produtos):
+                self.table.item(i, 1).setToolTip(
+                    "Presente em: " + ", ".join(
+                        f"NF {nota} série {serie} (fornecedor {fornecedor})"
+                        for fornecedor, nota, serie in produto.notas
+                    )
+                )
+                if len(produto.notas) > 1:
+                    fornecedor, nota, serie = produto.nota_custo
+                    origem_custo = f"Custo da NF {nota} série {serie} (fornecedor {fornecedor}), a entrada mais recente"
+                    self.table.item(i, 4).setToolTip(origem_custo)
+                    self.table.item(i, 5).setToolTip(origem_custo)
+
+            repetidos = sum(1 for produto in self.produtos if len(produto.notas) > 1)
+            self.label_status.setText(
+                f"{len(self.produtos)} produto(s) de {len(notas)} notas carregado(s)"
+                + (f" ({repetidos} em mais de uma nota)." if repetidos else ".")
+            )
 
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Erro ao carregar produtos:\n{str(e)}")
             self.label_status.setText("")
             self.label_alerta_nota.setVisible(False)
 
+    def _exibir_produtos(self):
+        self.table.setRowCount(len(self.produtos))
+        
+        ultimas_notas = self._buscar_ultimas_notas_produtos()
+        
+        for i, produto in enumerate(self.produtos):
+            icon_item = QTableWidgetItem("")
+            icon_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.table.setItem(i, 0, icon_item)
+            
+            self.table.setItem(i, 1, QTableWidgetItem(str(produto.sequencia)))
+            self.table.setItem(i, 2, QTableWidgetItem(str(produto.codigo)))
+            self.table.setItem(i, 3, QTableWidgetItem(produto.descricao))
+            self.table.setItem(i, 4, QTableWidgetItem(f"R$ {produto.custo_total:.2f}"))
+            self.table.setItem(i, 5, QTableWidgetItem(f"R$ {produto.custo_reposicao:.2f}"))
+            self.table.setItem(i, 6, QTableWidgetItem(f"R$ {produto.preco_venda_min:.2f}"))
+            self.table.setItem(i, 7, QTableWidgetItem(f"▶ R$ {produto.preco_venda_novo:.2f}"))
+            self.table.setItem(i, 8, QTableWidgetItem(f"▶ {produto.margem_venda:.2f}"))
+            self.table.setItem(i, 9, QTableWidgetItem(f"▶ {produto.porcentagem_custo:.2f}"))
+            
+            ultima_nota = ultimas_notas.get(str(produto.codigo))
+            if ultima_nota:
+                data = "/".join(reversed(ultima_nota.get("data", "").split("-")))
+                self.table.item(i, 2).setToolTip(
+                    f"Última precificação: NF {ultima_nota.get('nota', '')} "
+                    f"série {ultima_nota.get('serie', '')} "
+                    f"(fornecedor {ultima_nota.get('fornecedor', '')}) em {data}"
+                )
+            
+            for col in [0, 1, 2]:
+                self.table.item(i, col).setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            for col in [4, 5, 6, 7, 8, 9]:
+                self.table.item(i, col).setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        self.label_status.setText(f"{len(self.produtos)} produto(s) carregado(s).")
+        
+        # Verificar alerta de ICMS apenas para Regime Normal (código 3)
+        regime_tributario = self.db.buscar_regime_tributario()
+        produtos_com_erro = [p for p in self.produtos if p.ar_pen > 0 and p.ag_pen not in [2, 3]]
+        if produtos_com_erro and regime_tributario == 3:
+            self.label_alerta_nota.setText("⚠ Nota lançada incorretamente (Campo Aproveita ICMS)")
+            self.label_alerta_nota.setVisible(True)
+        else:
+            self.label_alerta_nota.setVisible(False)
+
+    def _buscar_ultimas_notas_produtos(self):
+        try:
+            from controller.notas_processadas import obter_notas_manager
+            return obter_notas_manager().ultimas_notas_produtos(p.codigo for p in self.produtos)
+        except Exception as e:
+            print(f"Aviso: Erro ao buscar última nota dos produtos: {e}")
+            return {}
+
     def _editar_celula(self, row, column):
         if column not in [7, 8, 9]:
             return
@@ -668,6 +843,7 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.label_nome_fornecedor.setText("")
 
+    @perfilado()
     def _gravar_precos(self):
         if not self.produtos:
             QMessageBox.warning(self, "Atenção", "Nenhum produto carregado para gravar.")
@@ -718,17 +894,18 @@ class MainWindow(QMainWindow):
             self.label_status.setText("Gravando preços...")
             self.repaint()
 
-            # Obter dados da nota para registrar no JSON
-            codigo_fornecedor = self.entry_fornecedor.text().strip()
-            numero_nota = self.entry_nota.text().strip()
-            serie = self.entry_serie.text().strip() or "1"
-
-            self.db.atualizar_precos(
-                produtos_editados,
-                codigo_fornecedor=codigo_fornecedor,
-                numero_nota=numero_nota,
-                serie=serie
-            )
+            try:
+                self._enviar_precos(produtos_editados)
+            except ConflitoPrecosError as e:
+                # Preços alterados por outra estação desde o carregamento
+                if not self._confirmar_sobrescrita(e.conflitos):
+                    self.label_status.setText(
+                        f"Gravação cancelada: {len(e.conflitos)} preço(s) alterado(s) por outra estação."
+                    )
+                    return
+                self.label_status.setText("Gravando preços...")
+                self.repaint()
+                self._enviar_precos(produtos_editados)
 
             QMessageBox.information(
                 self, 
@@ -755,6 +932,169 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Erro", f"Erro ao gravar preços:\n{str(e)}")
             self.label_status.setText("")
 
+    def _enviar_precos(self, produtos_editados):
+        if self.notas_carregadas:
+            # Várias notas: uma transação e todas registradas de uma vez
+            self.db.atualizar_precos_notas(produtos_editados, self.notas_carregadas)
+        else:
+            # Obter dados da nota para registrar no JSON
+            codigo_fornecedor = self.entry_fornecedor.text().strip()
+            numero_nota = self.entry_nota.text().strip()
+            serie = self.entry_serie.text().strip() or "1"
+
+            self.db.atualizar_precos(
+                produtos_editados,
+                codigo_fornecedor=codigo_fornecedor,
+                numero_nota=numero_nota,
+                serie=serie
+            )
+
+    def _confirmar_sobrescrita(self, conflitos):
+        """
+        Mostra os preços atuais dos produtos em conflito na grade (destacados)
+        e pergunta se os preços novos devem sobrescrevê-los.
+
+        Returns:
+            True para gravar mesmo assim
+        """
+        atuais = {conflito["codigo"]: conflito for conflito in conflitos}
+        linhas = []
+        for row, produto in enumerate(self.produtos):
+            conflito = atuais.get(str(produto.codigo).strip())
+            if not conflito:
+                continue
+            # A próxima verificação compara com o preço que o operador viu aqui
+            produto.preco_venda_min = conflito["preco_min_atual"]
+            produto.preco_venda_max = conflito["preco_max_atual"]
+
+            item = self.table.item(row, 6)
+            if item:
+                item.setText(f"R$ {produto.preco_venda_min:.2f}")
+                item.setBackground(Qt.GlobalColor.yellow)
+                item.setToolTip(
+                    f"Alterado por outra estação: era R$ {conflito['preco_min_carregado']:.2f} "
+                    "quando a nota foi carregada"
+                )
+            if len(linhas) < 15:
+                linhas.append(
+                    f"{produto.codigo} - {produto.descricao[:30]}: "
+                    f"R$ {conflito['preco_min_carregado']:.2f} → R$ {conflito['preco_min_atual']:.2f}"
+                )
+
+        if len(conflitos) > len(linhas):
+            linhas.append(f"... e mais {len(conflitos) - len(linhas)}")
+
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("Preços alterados")
+        msg_box.setText(
+            f"{len(conflitos)} produto(s) tiveram o preço alterado por outra estação "
+            "desde que a nota foi carregada (destacados na grade):\n\n"
+            + "\n".join(linhas)
+            + "\n\nDeseja gravar mesmo assim os novos preços, substituindo os atuais?"
+        )
+        msg_box.setIcon(QMessageBox.Icon.Warning)
+
+        btn_sim = msg_box.addButton("Gravar mesmo assim", QMessageBox.ButtonRole.YesRole)
+        msg_box.addButton("Revisar", QMessageBox.ButtonRole.NoRole)
+
+        msg_box.exec()
+        return msg_box.clickedButton() == btn_sim
+
+    @perfilado()
+    def _exportar_nota(self):
+        if not self.produtos:
+            QMessageBox.warning(self, "Atenção", "Nenhum produto carregado para exportar.")
+            return
+
+        if self.notas_carregadas:
+            sugestao = f"notas_{len(self.notas_carregadas)}.csv"
+        else:
+            sugestao = f"nota_{self.entry_fornecedor.text().strip()}_{self.entry_nota.text().strip()}.csv"
+        caminho, filtro = QFileDialog.getSaveFileName(
+            self, "Exportar produtos", sugestao, "CSV (*.csv);;Parquet (*.parquet)"
+        )
+        if not caminho:
+            return
+        if not os.path.splitext(caminho)[1]:
+            caminho += ".parquet" if filtro.startswith("Parquet") else ".csv"
+
+        try:
+            from controller.exportacao_nota import exportar_produtos
+
+            self.label_status.setText("Exportando produtos...")
+            self.repaint()
+            total = exportar_produtos(self.produtos, caminho)
+            self.label_status.setText(f"{total} produto(s) exportado(s) para {os.path.basename(caminho)}")
+        except Exception as e:
+            QMessageBox.critical(self, "Erro", f"Erro ao exportar produtos:\n{str(e)}")
+            self.label_status.setText("")
+
+    @perfilado()
+    def _importar_precos(self):
+        if not self.produtos:
+            QMessageBox.warning(
+                self, "Atenção", "Carregue a mesma nota exportada antes de importar os preços."
+            )
+            return
+
+        caminho, _ = QFileDialog.getOpenFileName(
+            self, "Importar preços", "", "Arquivos exportados (*.csv *.parquet);;CSV (*.csv);;Parquet (*.parquet)"
+        )
+        if not caminho:
+            return
+
+        self._fechar_editor_ativo()
+        try:
+            from controller.exportacao_nota import importar_precos
+
+            self.label_status.setText("Importando preços...")
+            self.repaint()
+            resultado = importar_precos(self.produtos, caminho)
+        except Exception as e:
+            QMessageBox.critical(self, "Erro", f"Erro ao importar preços:\n{str(e)}")
+            self.label_status.setText("")
+            return
+
+        # Só as linhas alteradas são redesenhadas, de uma vez
+        self.table.setUpdatesEnabled(False)
+        try:
+            for row in resultado["alterados"]:
+                self._atualizar_linha(row)
+                if self._verificar_linha_editada(row):
+                    self._marcar_linha_editada(row)
+                else:
+                    self._desmarcar_linha_editada(row)
+        finally:
+            self.table.setUpdatesEnabled(True)
+
+        alterados = len(resultado["alterados"])
+        conflitos = resultado["conflitos"]
+        self.label_status.setText(
+            f"{alterados} preço(s) importado(s)" + (f", {len(conflitos)} conflito(s)" if conflitos else "")
+        )
+
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("Importar preços")
+        texto = f"{alterados} preço(s) novo(s) aplicado(s) na grade."
+        if resultado["sem_alteracao"]:
+            texto += f"\n{resultado['sem_alteracao']} produto(s) sem alteração de preço."
+        if conflitos:
+            texto += (
+                f"\n\n{len(conflitos)} linha(s) do arquivo não foram aplicadas "
+                "(veja os detalhes)."
+            )
+            msg_box.setDetailedText("\n".join(
+                f"Linha {conflito['linha']} - {conflito['codigo'] or '(sem código)'}: {conflito['motivo']}"
+                for conflito in conflitos
+            ))
+            msg_box.setIcon(QMessageBox.Icon.Warning)
+        else:
+            msg_box.setIcon(QMessageBox.Icon.Information)
+        if alterados:
+            texto += "\n\nConfira os preços e clique em Gravar para enviá-los ao sistema."
+        msg_box.setText(texto)
+        msg_box.exec()
+
     def _processar_geracao_etiquetas(self, produtos_editados):
         
         dialog = self._criar_modal_confirmacao_etiquetas(produtos_editados)
@@ -764,9 +1104,27 @@ class MainWindow(QMainWindow):
                 self.label_status.setText("Gerando etiquetas...")
                 self.repaint()
                 
+                # Importação tardia: ReportLab, python-barcode e Pillow só são
+                # carregados quando etiquetas são geradas, não na abertura
                 from controller.etiqueta_generator import EtiquetaGenerator
                 
                 gerador = EtiquetaGenerator(self.db)
+                
+                if gerador.modo != "pdf":
+                    destino = gerador.gerar_termica(produtos_editados)
+                    
+                    self.label_status.setText("")
+                    
+                    QMessageBox.information(
+                        self,
+                        "Sucesso",
+                        f"Etiquetas geradas com sucesso!\n\n{len(produtos_editados)} etiqueta(s) "
+                        f"enviada(s) em {gerador.modo.upper()} para:\n{destino}"
+                    )
+                    
+                    self._limpar_tela()
+                    return
+                
                 pdf_path = gerador.gerar_pdf(produtos_editados)
                 
                 self.label_status.setText("")
@@ -876,6 +1234,149 @@ class MainWindow(QMainWindow):
         dialog.setLayout(layout)
         return dialog
 
+    def _abrir_historico_etiquetas(self):
+        try:
+            from controller.etiqueta_generator import EtiquetaGenerator
+            from controller.historico_etiquetas import LayoutEtiquetaAlteradoError
+            
+            gerador = EtiquetaGenerator(self.db)
+            jobs = gerador.historico.listar_jobs()
+            
+            if not jobs:
+                QMessageBox.information(self, "Informação", "Nenhuma etiqueta gerada anteriormente.")
+                return
+            
+            dialog = self._criar_modal_historico_etiquetas(jobs)
+            
+            if dialog.exec() != QDialog.DialogCode.Accepted or not dialog.jobs_selecionados:
+                return
+            
+            self.label_status.setText("Gerando etiquetas...")
+            self.repaint()
+            
+            # Ordem cronológica ao juntar vários jobs
+            job_ids = sorted(job["id"] for job in dialog.jobs_selecionados)
+            try:
+                destino = gerador.reimprimir(job_ids)
+            except LayoutEtiquetaAlteradoError as e:
+                self.label_status.setText("")
+                msg_box = QMessageBox(self)
+                msg_box.setWindowTitle("Layout alterado")
+                msg_box.setText(
+                    f"{len(e.jobs)} job(s) selecionado(s) foram gerados com outro layout de etiqueta "
+                    "(tamanho, deslocamento ou fontes mudaram desde então).\n\n"
+                    "Deseja reimprimir com o layout atual?"
+                )
+                msg_box.setIcon(QMessageBox.Icon.Warning)
+                btn_sim = msg_box.addButton("Reimprimir com layout atual", QMessageBox.ButtonRole.YesRole)
+                msg_box.addButton("Cancelar", QMessageBox.ButtonRole.NoRole)
+                msg_box.exec()
+                if msg_box.clickedButton() != btn_sim:
+                    return
+                self.label_status.setText("Gerando etiquetas...")
+                self.repaint()
+                destino = gerador.reimprimir(job_ids, aceitar_layout_diferente=True)
+            
+            self.label_status.setText("")
+            
+            if gerador.modo == "pdf":
+                os.startfile(destino)
+            else:
+                QMessageBox.information(self, "Sucesso", f"Etiquetas enviadas para:\n{destino}")
+        
+        except Exception as e:
+            self.label_status.setText("")
+            QMessageBox.critical(self, "Erro", f"Erro ao reimprimir etiquetas:\n{str(e)}")
+
+    def _criar_modal_historico_etiquetas(self, jobs):
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Reimprimir Etiquetas")
+        dialog.setMinimumSize(700, 400)
+        dialog.jobs_selecionados = []
+        
+        layout = QVBoxLayout()
+        
+        label_titulo = QLabel("<b>Selecione um ou mais jobs para reimprimir:</b>")
+        label_titulo.setStyleSheet("font-size: 12pt; padding: 10px;")
+        layout.addWidget(label_titulo)
+        
+        table = QTableWidget()
+        table.setColumnCount(4)
+        table.setHorizontalHeaderLabels(["Data", "Hora", "Etiquetas", "Formato"])
+        table.setRowCount(len(jobs))
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        table.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
+        table.verticalHeader().setVisible(False)
+        
+        for i, job in enumerate(jobs):
+            data = job.get("data", "")
+            data_str = "/".join(reversed(data.split("-"))) if data else ""
+            table.setItem(i, 0, QTableWidgetItem(data_str))
+            table.setItem(i, 1, QTableWidgetItem(job.get("hora", "")))
+            table.setItem(i, 2, QTableWidgetItem(str(job.get("quantidade", 0))))
+            table.setItem(i, 3, QTableWidgetItem(job.get("formato", "").upper()))
+        
+        table.setColumnWidth(0, 120)
+        table.setColumnWidth(1, 100)
+        table.setColumnWidth(2, 100)
+        table.setColumnWidth(3, 100)
+        
+        layout.addWidget(table)
+        
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        
+        btn_cancelar = QPushButton("Cancelar")
+        btn_cancelar.setStyleSheet("""
+            QPushButton {
+                padding: 8px 20px;
+                font-size: 10pt;
+                background-color: #f44336;
+                color: white;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #da190b;
+            }
+        """)
+        btn_cancelar.clicked.connect(dialog.reject)
+        btn_layout.addWidget(btn_cancelar)
+        
+        btn_reimprimir = QPushButton("Reimprimir")
+        btn_reimprimir.setStyleSheet("""
+            QPushButton {
+                padding: 8px 20px;
+                font-size: 10pt;
+                font-weight: bold;
+                background-color: #2196F3;
+                color: white;
+                border: none;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #0b7dda;
+            }
+        """)
+        
+        def confirmar():
+            linhas = sorted({item.row() for item in table.selectedItems()})
+            if not linhas:
+                QMessageBox.warning(dialog, "Atenção", "Selecione ao menos um job.")
+                return
+            dialog.jobs_selecionados = [jobs[linha] for linha in linhas]
+            dialog.accept()
+        
+        btn_reimprimir.clicked.connect(confirmar)
+        btn_layout.addWidget(btn_reimprimir)
+        
+        layout.addLayout(btn_layout)
+        
+        dialog.setLayout(layout)
+        return dialog
+
+    @perfilado()
     def _abrir_busca_notas(self):
         try:
             self.label_status.setText("Carregando notas...")
@@ -896,6 +1397,10 @@ class MainWindow(QMainWindow):
             dialog = self._criar_modal_busca_notas(notas)
             
             if dialog.exec() == QDialog.DialogCode.Accepted:
+                if len(dialog.notas_selecionadas) > 1:
+                    self._carregar_notas(dialog.notas_selecionadas)
+                    return
+
                 nota_selecionada = dialog.nota_selecionada
                 if nota_selecionada:
                     self.entry_serie.setText(nota_selecionada['serie'])
@@ -913,6 +1418,7 @@ class MainWindow(QMainWindow):
         dialog.setWindowTitle("Buscar Nota Fiscal de Entrada")
         dialog.setMinimumSize(1000, 600)
         dialog.nota_selecionada = None
+        dialog.notas_selecionadas = []
         
         layout = QVBoxLayout()
         
@@ -926,6 +1432,10 @@ class MainWindow(QMainWindow):
         filter_input.setStyleSheet("font-size: 10pt; padding: 5px;")
         filter_layout.addWidget(filter_input)
         
+        dica_label = QLabel("Ctrl ou Shift para selecionar várias notas")
+        dica_label.setStyleSheet("font-size: 9pt; color: #666;")
+        filter_layout.addWidget(dica_label)
+        
         layout.addLayout(filter_layout)
         
         # Obter ícone nativo de confirmação do Qt
@@ -941,7 +1451,7 @@ class MainWindow(QMainWindow):
         table.setRowCount(len(notas))
         table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
         table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        table.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
         
         table.setStyleSheet("""
             QTableWidget::item:selected {
@@ -1007,6 +1517,7 @@ class MainWindow(QMainWindow):
         def ao_duplo_clique(item):
             row = item.row()
             dialog.nota_selecionada = notas[row]
+            dialog.notas_selecionadas = [notas[row]]
             dialog.accept()
         
         table.itemDoubleClicked.connect(ao_duplo_clique)
@@ -1050,10 +1561,13 @@ class MainWindow(QMainWindow):
         """)
         
         def selecionar_nota():
-            selected_items = table.selectedItems()
-            if selected_items:
-                row = selected_items[0].row()
-                dialog.nota_selecionada = notas[row]
+            linhas = sorted(
+                index.row() for index in table.selectionModel().selectedRows()
+                if not table.isRowHidden(index.row())
+            )
+            if linhas:
+                dialog.nota_selecionada = notas[linhas[0]]
+                dialog.notas_selecionadas = [notas[row] for row in linhas]
                 dialog.accept()
             else:
                 QMessageBox.warning(dialog, "Atenção", "Selecione uma nota fiscal.")
@@ -1075,6 +1589,7 @@ class MainWindow(QMainWindow):
         self.table.setRowCount(0)
 
         self.produtos = []
+        self.notas_carregadas = []
 
         self.label_status.setText("")
 